@@ -1,27 +1,712 @@
+import contextlib
+from dataclasses import dataclass, field
+import datetime
+import itertools
 import logging
 from pathlib import Path
+import signal
 import sys
-from ydata_profiling import ProfileReport
+import threading
+from typing import Dict, Optional, Tuple
 
 # Add the lib directory to Python path if needed
 sys.path.append('lib')
 
 # Imports 
-from lib.logger import setup_logger, CustomLogger
+# The sink modules (supabase_connect, concurrent_upload, incremental_sync,
+# postgres_copy) pull in the Supabase client stack, httpx or psycopg and are
+# imported by the stages that use them, so startup only pays for what runs.
+# ydata-profiling is likewise only imported by lib.profiling when a report
+# is built. `python -m benchmarks.bench_startup` tracks the cold start.
+from lib.logger import (setup_logger, CustomLogger, log_memory_report, shutdown_logging,
+                        RunMetrics, set_run_metrics, get_run_metrics, get_log_file_path)
 from lib import file_load
 from lib import data_transform
-from lib import supabase_connect
+from lib import dimension_history
+from lib import schema
+from lib import profiling
+from lib import rollups
+from lib import transform_cache
+from lib import upload_journal
+from lib import validation
+from lib import watch_folder
+from lib.pipeline_dag import PipelineDAG
 
 
+@dataclass(frozen=True)
+class PipelineConfig:
+    """
+    Settings of a pipeline run, with their defaults.
 
-def main():
-    """Main application function."""
+    main() runs with PipelineConfig() unless it is given one, e.g.
+    main(PipelineConfig(ingest_mode='multi', profile_mode='off')). validate()
+    rejects unknown values and combinations the pipeline cannot run before
+    anything is loaded.
+    """
+
+    # Ingestion: 'latest' reads the newest CSV in data/. 'multi' reads every file
+    # matching ingest_pattern (optionally limited to ingest_start_date..ingest_end_date,
+    # taken from the file names) in ingest_workers parallel processes (None = one per
+    # CPU). Files already recorded in ingest_ledger_path are skipped; the ledger is
+    # updated once a run has succeeded. Delete the ledger to reprocess everything.
+    # A 'multi' run (and every daemon run) only holds the new files, so it is
+    # loaded additively: the remote tables are never cleared, rows are upserted on
+    # their natural keys (incremental_sync.TABLE_KEYS) and keys of earlier files
+    # are kept. build_rollups then needs incremental_sync, which keeps the rollup
+    # state the new rows are added to.
+    ingest_mode: str = 'latest'
+    ingest_pattern: str = '*.csv'
+    ingest_start_date: Optional[datetime.date] = None  # e.g. datetime.date(2024, 5, 1)
+    ingest_end_date: Optional[datetime.date] = None
+    ingest_workers: Optional[int] = None
+    ingest_ledger_path: str = 'state/ingested_files.csv'
+
+    # CSV reader of the batch pipeline: 'parallel' parses the file on every core
+    # (pyarrow's multithreaded CSV reader, or newline-aligned byte ranges in worker
+    # processes without pyarrow), 'pandas' uses the single-threaded pd.read_csv.
+    # Both return the same DataFrame.
+    csv_reader: str = 'parallel'
+
+    # Daemon mode: keep running and watch data/ for new files matching ingest_pattern
+    # (polled every watch_poll_interval seconds) instead of doing one run. A file is
+    # picked up once it has not changed for watch_settle_seconds, so partially
+    # written drops are left alone. Each batch of new files (at most
+    # watch_max_files_per_run) goes through the batch pipeline like an
+    # ingest_mode = 'multi' run, with the logger, Supabase client, HTTP session,
+    # upload journal and caches kept between runs. At most watch_queue_size ready
+    # files wait for the pipeline, the watcher pauses beyond that. Files of a failed
+    # run are retried after watch_retry_seconds. Stop it with Ctrl+C or SIGTERM.
+    daemon_mode: bool = False
+    watch_poll_interval: float = 2.0
+    watch_settle_seconds: float = 5.0
+    watch_queue_size: int = 8
+    watch_max_files_per_run: int = 16
+    watch_retry_seconds: float = 60.0
+
+    # Validation: every raw row is checked against scripts/database_schema.sql
+    # (VARCHAR lengths, INT/DECIMAL ranges, missing keys, ORDERDATE parseability)
+    # before the transform. Offending rows are written to quarantine_folder with the
+    # failed rules and the clean rows go on, instead of failing the upload later.
+    validate_rows: bool = True
+    quarantine_folder: str = 'quarantine'
+
+    # Streaming mode reads the source CSV in chunks instead of loading it whole.
+    # Enable it for extracts that do not fit in memory.
+    streaming_mode: bool = False
+    chunk_size: int = 100_000
+
+    # Concurrent upload: the dimension tables are uploaded in parallel with up to
+    # upload_concurrency batches in flight per table, then the fact table.
+    concurrent_upload: bool = True
+    upload_concurrency: int = 4
+
+    # Sink of the batch pipeline: 'supabase' uploads through the REST API,
+    # 'postgres' connects straight to the database (POSTGRES_DSN environment
+    # variable) and bulk loads the whole star schema with COPY in one transaction.
+    # The 'postgres' sink needs psycopg (pip install "psycopg[binary]").
+    sink: str = 'supabase'
+
+    # Upload journal: every batch accepted by Supabase is checkpointed in
+    # upload_journal_path (SQLite). When an upload fails, the next run with the same
+    # data skips the committed batches instead of clearing the tables and starting
+    # over. Transient HTTP failures are retried with exponential backoff and jitter.
+    # Used by the concurrent uploader (concurrent_upload = True). Retried batches,
+    # with or without the journal, and every batch of a resumed run skip rows whose
+    # natural key already exists, which needs the fact table key from
+    # scripts/Incremental_Sync_Constraints.sql.
+    upload_journal: bool = True
+    upload_journal_path: str = 'state/upload_journal.sqlite'
+
+    # Incremental sync: only rows that changed since the last successful run are
+    # upserted/deleted, based on the hash manifests kept in sync_manifest_folder.
+    # Requires scripts/Incremental_Sync_Constraints.sql to be applied.
+    incremental_sync: bool = False
+    sync_manifest_folder: str = 'state/sync_manifests'
+
+    # Dimension history (SCD Type 2): a change to a customer's or product's
+    # attributes closes its current version and adds a new one in the
+    # cg_dim_*_history tables (scripts/Dimension_History_Tables.sql) instead of
+    # being overwritten. Only the expire/insert deltas against the snapshot of the
+    # current versions kept in dimension_history_folder are sent.
+    dimension_history: bool = False
+    dimension_history_folder: str = 'state/dimension_history'
+
+    # Output formats per table ('csv', 'parquet', 'arrow'), written concurrently
+    # to transformed_data/. CSV is kept for the Fabric pipeline.
+    output_formats: Dict[str, Tuple[str, ...]] = field(default_factory=lambda: {
+        'dim_date': ('csv', 'parquet'),
+        'dim_product': ('csv', 'parquet'),
+        'dim_customer': ('csv', 'parquet'),
+        'dim_order': ('csv', 'parquet'),
+        'fact_sales': ('csv', 'parquet'),
+    })
+
+    # Profiling: 'off', 'minimal' or 'full'. The report is built from a sample of
+    # profile_sample_rows rows (None profiles every row), cached per input file
+    # content, and runs in a background process unless profile_in_background is False.
+    profile_mode: str = 'minimal'
+    profile_sample_rows: Optional[int] = 100_000
+    profile_in_background: bool = True
+    profile_report_path: str = "reports/sales_data_profile_report.html"
+
+    # Logging: with async_logging the log file and console are written by a
+    # background thread (buffered file writes, lazy formatting), per-batch progress
+    # lines are limited to one every progress_log_interval seconds per table, and
+    # with capture_prints the library's print() output goes through the logger.
+    async_logging: bool = True
+    capture_prints: bool = True
+    progress_log_interval: float = 5.0
+
+    # Instrumentation: every stage is timed and a JSON run summary is written next
+    # to the log file. trace_memory adds tracemalloc deltas per stage (slower).
+    # Memory is only reported per stage for stages that did not overlap with
+    # others, set pipeline_workers = 1 to get it for every stage.
+    trace_memory: bool = False
+
+    # Transform cache: the tables built from an input file are cached in
+    # transform_cache_folder (Arrow files, least recently used evicted beyond
+    # transform_cache_max_bytes). A byte-identical input skips the load and transform
+    # stages; for a changed input only the tables whose source columns changed are
+    # rebuilt. Input files are fingerprinted from their size, mtime and sampled
+    # blocks, or from their whole content with transform_cache_full_hash.
+    transform_cache: bool = True
+    transform_cache_folder: str = 'state/transform_cache'
+    transform_cache_max_bytes: int = 2 * 1024**3
+    transform_cache_full_hash: bool = False
+
+    # Rollups: pre-aggregated sales, quantity and order counts by day/month/quarter/year
+    # x product_line x country x territory x deal_size, built after the fact table,
+    # saved and uploaded like the star schema tables (see scripts/Rollup_Tables.sql).
+    # With incremental_sync they are refreshed from only the new fact rows.
+    build_rollups: bool = True
+
+    # Number of pipeline tasks (table builds, uploads, saves...) run at the same time
+    pipeline_workers: int = 8
+
+    def validate(self):
+        """Raises ValueError for unknown values and combinations the pipeline cannot run."""
+        if self.ingest_mode not in ('latest', 'multi'):
+            raise ValueError(f"Unknown ingest_mode '{self.ingest_mode}'. Expected 'latest' or 'multi'")
+        if self.csv_reader not in ('pandas', 'parallel'):
+            raise ValueError(f"Unknown csv_reader '{self.csv_reader}'. Expected 'pandas' or 'parallel'")
+        if self.sink not in ('supabase', 'postgres'):
+            raise ValueError(f"Unknown sink '{self.sink}'. Expected 'supabase' or 'postgres'")
+        if self.profile_mode not in profiling.PROFILE_MODES:
+            raise ValueError(f"Unknown profile_mode '{self.profile_mode}'. "
+                             f"Expected one of {profiling.PROFILE_MODES}")
+        for name in ('chunk_size', 'upload_concurrency', 'pipeline_workers'):
+            if getattr(self, name) < 1:
+                raise ValueError(f"{name} must be at least 1, got {getattr(self, name)}")
+        if self.sink == 'postgres' and self.streaming_mode:
+            raise ValueError("The 'postgres' sink loads whole tables, it cannot be combined with streaming_mode")
+        if self.daemon_mode and self.streaming_mode:
+            raise ValueError("daemon_mode runs the batch pipeline, it cannot be combined with streaming_mode")
+        if self.dimension_history and self.streaming_mode:
+            raise ValueError("dimension_history diffs whole dimensions, it cannot be combined with streaming_mode")
+        if (self.build_rollups and not self.streaming_mode and (self.daemon_mode or self.ingest_mode == 'multi')
+                and not (self.incremental_sync and self.sink == 'supabase')):
+            raise ValueError("build_rollups with new files only (daemon_mode or ingest_mode = 'multi') needs "
+                             "incremental_sync on the 'supabase' sink, the rollups are refreshed from its state")
+        if self.dimension_history and self.sink == 'supabase' and not (self.incremental_sync or self.concurrent_upload):
+            raise ValueError("dimension_history on the 'supabase' sink needs the REST session "
+                             "(concurrent_upload or incremental_sync)")
+
+
+# Table name in Supabase -> output CSV file name, in foreign key order
+TABLE_OUTPUTS = [
+    ('cg_dim_date', 'dim_date'),
+    ('cg_dim_product', 'dim_product'),
+    ('cg_dim_customer', 'dim_customer'),
+    ('cg_dim_order', 'dim_order'),
+    ('cg_fact_sales', 'fact_sales'),  # Fact table must be last
+]
+
+# Rollup tables built with PipelineConfig.build_rollups: Supabase table -> output file name
+ROLLUP_OUTPUTS = [
+    ('cg_rollup_sales_daily', 'rollup_sales_daily'),
+    ('cg_rollup_sales_monthly', 'rollup_sales_monthly'),
+    ('cg_rollup_sales_quarterly', 'rollup_sales_quarterly'),
+    ('cg_rollup_sales_yearly', 'rollup_sales_yearly'),
+]
+
+# Builders of the star schema tables: function(raw_df, tables built so far).
+# Dimensions come first, the fact table needs them. 'key_codes' holds the
+# key columns factorized once (data_transform.factorize_keys), shared by the
+# keyed dimensions and the fact table's foreign keys.
+STAR_SCHEMA_BUILDERS = {
+    'dim_date': lambda raw_df, tables: data_transform.create_dim_date(raw_df),
+    'dim_product': lambda raw_df, tables: data_transform.create_dim_product(raw_df, tables['key_codes']['PRODUCTCODE']),
+    'dim_customer': lambda raw_df, tables: data_transform.create_dim_customer(raw_df, tables['key_codes']['CUSTOMERNAME']),
+    'dim_order': lambda raw_df, tables: data_transform.create_dim_order(raw_df, tables['key_codes']['ORDERNUMBER']),
+    'fact_sales': lambda raw_df, tables: data_transform.create_fact_sales(
+        raw_df, tables['dim_date'], tables['dim_product'], tables['dim_customer'], tables['dim_order'],
+        key_codes=tables['key_codes']
+    ),
+}
+
+
+def select_source_files(config: PipelineConfig, source_folder: str, ledger: file_load.IngestionLedger):
+    """The files of a multi-file ingestion, see the ingest_* settings of `config`."""
+    return file_load.select_csv_files(
+        source_folder, pattern=config.ingest_pattern, start_date=config.ingest_start_date,
+        end_date=config.ingest_end_date, ledger=ledger
+    )
+
+
+def run_streaming_pipeline(config: PipelineConfig, logger: logging.Logger, supabase_client, source_folder: str,
+                           output_folder: str, source_files=None):
+    """
+    Runs load -> transform -> upload -> save chunk by chunk.
+
+    Each chunk's new dimension rows are uploaded before its fact rows, so the
+    foreign key order holds for every chunk. Only one chunk of raw data and
+    its derived rows are in memory at any time. With `source_files` the files
+    are streamed one after the other, otherwise the latest file is read.
+    """
+    from lib import supabase_connect
+
+    logger.info(f"--- Streaming Pipeline (chunk size: {config.chunk_size}) ---")
+
+    # New files only (ingest_mode = 'multi'): upserted on their natural keys, nothing is cleared
+    on_conflict = {}
+    if source_files is not None:
+        from lib.incremental_sync import TABLE_KEYS
+
+        on_conflict = {table_name: ",".join(TABLE_KEYS[table_name]) for table_name, _ in TABLE_OUTPUTS}
+    else:
+        # Clear the tables once up front, fact table first because of the foreign keys
+        for table_name, _ in reversed(TABLE_OUTPUTS):
+            supabase_connect.delete_all_records(supabase_client, table_name)
+
+    # Remove the outputs of a previous run in every format, rollups included: the
+    # chunks are only appended to CSV below, and a stale Parquet/Arrow file would
+    # be preferred over it by star_query.StarSchema.load
+    extensions = [extension for _, extension in data_transform.OUTPUT_WRITERS.values()]
+    for _, output_name in TABLE_OUTPUTS + ROLLUP_OUTPUTS:
+        for extension in extensions:
+            Path(output_folder, f"{output_name}{extension}").unlink(missing_ok=True)
+
+    builder = data_transform.StreamingStarSchemaBuilder()
+    file_names = [f.name for f in source_files] if source_files is not None else [None]
+    chunks = itertools.chain.from_iterable(
+        file_load.read_csv_in_chunks(
+            folder_path=source_folder, file_name=file_name, chunksize=config.chunk_size, encoding="latin1",
+            dtype=schema.SALES_EXTRACT_DTYPES
+        )
+        for file_name in file_names
+    )
+    if config.validate_rows:
+        chunks = (validation.validate_and_quarantine(chunk, config.quarantine_folder) for chunk in chunks)
+    chunks = (schema.downcast_integer_columns(chunk) for chunk in chunks)
+
+    for tables in builder.stream(chunks):
+        for table_name, output_name in TABLE_OUTPUTS:
+            chunk_df = tables[output_name]
+            if chunk_df.empty:
+                continue
+
+            success = supabase_connect.upload_df_to_supabase(
+                client=supabase_client,
+                df=chunk_df,
+                table_name=table_name,
+                clear_table=False,
+                on_conflict=on_conflict.get(table_name)
+            )
+            if not success:
+                raise Exception(f"Supabase upload failed for table '{table_name}'. Halting application.")
+
+            data_transform.save_df_to_csv(chunk_df, output_folder, f"{output_name}.csv", append=True)
+
+    logger.info(
+        f"Streaming pipeline finished: {builder.rows_processed} rows in "
+        f"{builder.chunks_processed} chunks."
+    )
+
+
+def build_batch_pipeline(config: PipelineConfig, logger: logging.Logger, supabase_client, session,
+                         profiler: profiling.BackgroundProfiler, source_folder: str, source_file, source_files,
+                         ledger, output_folder: str,
+                         journal: upload_journal.UploadJournal = None,
+                         cache: transform_cache.TransformCache = None) -> PipelineDAG:
+    """
+    Expresses the batch pipeline as a task graph.
+
+        cache_lookup -> raw_df -> profile
+                                -> table_keys
+                                -> key_codes
+                                -> dim_date, dim_product, dim_customer, dim_order -> fact_sales
+        fact_sales + dimensions -> rollups -> rollup_sales_*
+        dim_product, dim_customer -> history_deltas -> apply_dimension_history
+        all tables -> clear_tables -> upload_cg_dim_* -> upload_cg_fact_sales
+                                   -> upload_cg_rollup_sales_*
+                      (or, with config.sink = 'postgres': all tables -> load_postgres)
+        each table -> save_<table>
+
+    The dimension tables are built, uploaded and saved concurrently, and each
+    table is saved as soon as it is built. The fact table also waits for the
+    non-date dimensions so unmatched keys are still reported. Uploads respect
+    the foreign keys: the fact table starts once every dimension is uploaded.
+    The tables are only cleared once every table was built successfully.
+    With a `journal`, a failed upload of the same tables is resumed instead:
+    the tables are not cleared and committed batches are skipped. With
+    `source_files` (multi-file ingestion, daemon runs) the new files are
+    loaded additively: nothing is cleared or deleted, rows are upserted.
+    A `cache` kept by the caller is reused, otherwise one is opened if
+    config.transform_cache.
+    """
+    dag = PipelineDAG(metrics=get_run_metrics())
+    if cache is None and config.transform_cache:
+        cache = transform_cache.TransformCache(
+            config.transform_cache_folder, max_bytes=config.transform_cache_max_bytes
+        )
+    input_files = source_files if source_files is not None else [source_file]
+    table_names = list(STAR_SCHEMA_BUILDERS)
+    # Only the new files are loaded, the rows of earlier files must stay
+    additive = source_files is not None
+
+    def lookup_cached_tables():
+        # (input fingerprint, cached tables or None)
+        if cache is None:
+            return None, None
+        fingerprint = transform_cache.fingerprint_files(input_files, full_hash=config.transform_cache_full_hash)
+        tables = cache.lookup_file(fingerprint)
+        if tables is not None:
+            logger.info("Input unchanged since a cached run, skipping the load, profile and transform stages.")
+        return fingerprint, tables
+
+    def load(cache_lookup):
+        if cache_lookup[1] is not None:
+            return None
+        logger.info("--- Starting Data Loading Stage ---")
+        if source_file is not None:
+            read_csv = file_load.read_csv_parallel if config.csv_reader == 'parallel' else file_load.read_latest_csv
+            raw_df = read_csv(
+                folder_path=source_folder, file_name=source_file.name,
+                encoding="latin1", dtype=schema.SALES_EXTRACT_DTYPES
+            )
+        else:
+            raw_df = file_load.read_csv_files(
+                source_files, max_workers=config.ingest_workers,
+                encoding="latin1", dtype=schema.SALES_EXTRACT_DTYPES
+            )
+        logger.info("Raw data loaded successfully.")
+        if config.validate_rows:
+            with get_run_metrics().stage("validate", rows=len(raw_df)):
+                source_name = source_file.name if source_file is not None else None
+                raw_df = validation.validate_and_quarantine(raw_df, config.quarantine_folder, source_name)
+        # Only narrowed once the invalid rows are out, so no value wraps
+        raw_df = schema.downcast_integer_columns(raw_df)
+        logger.info(f"Raw DataFrame shape: {raw_df.shape}")
+        log_memory_report(logger, raw_df, "Raw DataFrame", baseline_bytes=schema.estimate_object_memory(raw_df))
+        return raw_df
+
+    def profile(raw_df):
+        if raw_df is None:
+            return None
+        profile_kwargs = dict(
+            output_path=config.profile_report_path,
+            mode=config.profile_mode,
+            sample_rows=config.profile_sample_rows,
+            source_file=str(source_file) if source_file is not None else None,
+        )
+        if config.profile_in_background and config.profile_mode != 'off':
+            profiler.start(raw_df, **profile_kwargs)
+        else:
+            logger.info("Generating profile report")
+            if profiling.generate_profile_report(raw_df, **profile_kwargs):
+                print(f"Profile report generated: {config.profile_report_path}")
+
+    def compute_key_codes(raw_df):
+        if raw_df is None:
+            return None
+        return data_transform.factorize_keys(raw_df, data_transform.DIMENSION_KEYS.values())
+
+    def compute_table_keys(raw_df):
+        if cache is None or raw_df is None:
+            return None
+        return cache.table_keys(raw_df)
+
+    def table_task(table_name):
+        build = STAR_SCHEMA_BUILDERS[table_name]
+
+        def run(cache_lookup, raw_df, table_keys, **dependencies):
+            if raw_df is None:
+                return cache_lookup[1][table_name]
+            if cache is None:
+                return build(raw_df, dependencies)
+            return cache.get_or_build(table_name, table_keys[table_name], lambda: build(raw_df, dependencies))
+        return run
+
+    def record_cache(cache_lookup, table_keys, **tables):
+        if table_keys is not None:
+            cache.record_file(cache_lookup[0], {name: table_keys[name] for name in table_names})
+
+    dag.add('cache_lookup', lookup_cached_tables)
+    dag.add('raw_df', load, depends_on=['cache_lookup'], rows=len)
+    dag.add('profile', profile, depends_on=['raw_df'])
+    dag.add('table_keys', compute_table_keys, depends_on=['raw_df'])
+    dag.add('key_codes', compute_key_codes, depends_on=['raw_df'])
+    for table_name in table_names:
+        if table_name == 'fact_sales':
+            dependencies = ['dim_date', 'dim_product', 'dim_customer', 'dim_order', 'key_codes']
+        else:
+            dependencies = ['key_codes'] if table_name in data_transform.DIMENSION_KEYS else []
+        dag.add(table_name, table_task(table_name),
+                depends_on=['cache_lookup', 'raw_df', 'table_keys'] + dependencies, rows=len)
+    if cache is not None:
+        dag.add('record_transform_cache', record_cache, depends_on=['cache_lookup', 'table_keys'] + table_names)
+
+    # --- Rollups, one task per table so they are saved and uploaded like the others ---
+    upload_outputs = list(TABLE_OUTPUTS)
+    output_names = list(table_names)
+    if config.build_rollups:
+        def build_rollups(fact_sales, dim_product, dim_customer):
+            previous_daily, new_rows = None, None
+            if config.incremental_sync and config.sink == 'supabase':
+                previous_daily, new_rows = rollups.load_rollup_state(fact_sales, dim_product, dim_customer,
+                                                                       config.sync_manifest_folder, additive=additive)
+            return rollups.build_rollups(fact_sales, dim_product, dim_customer, previous_daily=previous_daily,
+                                         new_rows=new_rows, additive=additive)
+
+        dag.add('rollups', build_rollups, depends_on=['fact_sales', 'dim_product', 'dim_customer'])
+        for _, output_name in ROLLUP_OUTPUTS:
+            dag.add(output_name, lambda rollups, _name=output_name: rollups[_name], depends_on=['rollups'], rows=len)
+            output_names.append(output_name)
+        upload_outputs += ROLLUP_OUTPUTS
+
+    # --- Upload to Supabase, the order is important due to foreign key constraints ---
+    upload_tasks = []
+    # The sink modules are imported here, only the one in use is loaded
+    if config.sink == 'postgres':
+        from lib import postgres_copy
+
+        def load_postgres(**tables):
+            load_order = [(table_name, tables[output_name]) for table_name, output_name in upload_outputs]
+            conflict_keys = None
+            if additive:
+                from lib.incremental_sync import TABLE_KEYS as conflict_keys
+            if not postgres_copy.load_star_schema(load_order, full_refresh=not additive,
+                                                  conflict_keys=conflict_keys):
+                raise Exception("Postgres COPY load failed. Halting application.")
+
+        dag.add('load_postgres', load_postgres, depends_on=output_names)
+        upload_tasks.append('load_postgres')
+    elif config.incremental_sync:
+        from lib import concurrent_upload, incremental_sync
+
+        def sync(**tables):
+            uploader = concurrent_upload.ConcurrentUploader(session, max_in_flight=config.upload_concurrency)
+            upload_order = [(supabase_table, tables[output_name]) for supabase_table, output_name in upload_outputs]
+            if not incremental_sync.sync_star_schema(uploader, upload_order, config.sync_manifest_folder,
+                                                     additive=additive):
+                raise Exception("Incremental sync to Supabase failed. Halting application.")
+            if config.build_rollups:
+                # Matches the manifests just saved, the next run refreshes from it
+                rollups.save_rollup_state(tables['rollup_sales_daily'], tables['dim_product'],
+                                          tables['dim_customer'], config.sync_manifest_folder, additive=additive)
+
+        dag.add('sync_supabase', sync, depends_on=output_names)
+        upload_tasks.append('sync_supabase')
+    else:
+        from lib import concurrent_upload, incremental_sync, supabase_connect
+
+        def clear_tables(**tables):
+            # Returns (journal run fingerprint, resumed), (None, False) without a journal
+            fingerprint = None
+            if journal is not None:
+                fingerprint = upload_journal.fingerprint_tables(
+                    [(supabase_table, tables[output_name]) for supabase_table, output_name in upload_outputs]
+                )
+                if journal.begin_run(fingerprint):
+                    logger.info("Resuming the unfinished upload of the same data, the tables are not cleared.")
+                    return fingerprint, True
+
+            if additive:
+                logger.info("Loading new files only, the tables are not cleared and the rows are upserted.")
+                return fingerprint, False
+            # Fact table before the dimensions because of the foreign keys
+            for supabase_table, _ in reversed(upload_outputs):
+                supabase_connect.delete_all_records(supabase_client, supabase_table)
+            return fingerprint, False
+
+        def upload_task(supabase_table, output_name):
+            def run(clear_tables, **inputs):
+                df = inputs[output_name]
+                fingerprint, resumed = clear_tables
+                on_conflict = ",".join(incremental_sync.TABLE_KEYS[supabase_table]) if additive else None
+                if session is not None:
+                    uploader = concurrent_upload.ConcurrentUploader(session, max_in_flight=config.upload_concurrency)
+                    checkpoint = journal.table(fingerprint, supabase_table) if journal is not None else None
+                    # In a resumed run every table may already hold part of its rows
+                    success = uploader.upload(df, supabase_table, on_conflict=on_conflict, checkpoint=checkpoint,
+                                              resumed=resumed)
+                else:
+                    success = supabase_connect.upload_df_to_supabase(
+                        client=supabase_client, df=df, table_name=supabase_table, clear_table=False,
+                        on_conflict=on_conflict
+                    )
+                if not success:
+                    raise Exception(f"Supabase upload failed for table '{supabase_table}'. Halting application.")
+            return run
+
+        dag.add('clear_tables', clear_tables, depends_on=output_names)
+        dimension_uploads = []
+        for supabase_table, output_name in upload_outputs:
+            task_name = f"upload_{supabase_table}"
+            # The fact table needs every dimension uploaded first, the rollups have no foreign keys
+            parents = dimension_uploads if output_name == 'fact_sales' else []
+            dag.add(task_name, upload_task(supabase_table, output_name),
+                    depends_on=['clear_tables', output_name] + parents)
+            if output_name.startswith('dim_'):
+                dimension_uploads.append(task_name)
+            upload_tasks.append(task_name)
+
+        if journal is not None:
+            def finish_upload_journal(clear_tables, **uploads):
+                journal.finish_run(clear_tables[0])
+            dag.add('finish_upload_journal', finish_upload_journal, depends_on=['clear_tables'] + list(upload_tasks))
+            upload_tasks.append('finish_upload_journal')
+
+    # --- Dimension history, its tables have no foreign keys and are never cleared ---
+    if config.dimension_history:
+        def plan_history(**dimensions):
+            return dimension_history.plan_dimension_history(dimensions, config.dimension_history_folder)
+
+        def apply_history(history_deltas):
+            if config.sink == 'postgres':
+                success = dimension_history.apply_history_postgres(history_deltas, config.dimension_history_folder)
+            else:
+                from lib import concurrent_upload
+
+                uploader = concurrent_upload.ConcurrentUploader(session, max_in_flight=config.upload_concurrency)
+                success = dimension_history.apply_history(uploader, history_deltas, config.dimension_history_folder)
+            if not success:
+                raise Exception("Dimension history load failed. Halting application.")
+
+        dag.add('history_deltas', plan_history, depends_on=list(dimension_history.HISTORY_TABLES))
+        dag.add('apply_dimension_history', apply_history, depends_on=['history_deltas'])
+        upload_tasks.append('apply_dimension_history')
+
+    # --- Save each table as soon as it is built ---
+    save_tasks = []
+    for table_name in output_names:
+        def save(_table_name=table_name, **inputs):
+            data_transform.save_tables({_table_name: inputs[_table_name]}, output_folder, formats=config.output_formats)
+        dag.add(f"save_{table_name}", save, depends_on=[table_name])
+        save_tasks.append(f"save_{table_name}")
+
+    if ledger is not None:
+        def record_ingested_files(raw_df, **done):
+            ledger.record(source_files, rows=raw_df.attrs.get('rows_per_file') if raw_df is not None else None)
+        dag.add('record_ingested_files', record_ingested_files, depends_on=['raw_df'] + upload_tasks + save_tasks)
+
+    return dag
+
+
+def open_upload_resources(config: PipelineConfig, resources: contextlib.ExitStack):
+    """Opens the REST session and upload journal of the configured sink (None when unused)."""
+    session = None
+    if config.sink == 'supabase' and (config.incremental_sync or config.concurrent_upload):
+        from lib import concurrent_upload
+
+        session = resources.enter_context(
+            concurrent_upload.get_rest_session(max_connections=config.upload_concurrency * 4)
+        )
+    journal = None
+    if config.upload_journal and session is not None and not config.incremental_sync:
+        journal = resources.enter_context(
+            contextlib.closing(upload_journal.UploadJournal(config.upload_journal_path))
+        )
+    return session, journal
+
+
+def run_daemon(config: PipelineConfig, logger: logging.Logger, supabase_client, session, journal,
+               profiler: profiling.BackgroundProfiler, source_folder: str, output_folder: str):
+    """
+    Watches `source_folder` and runs the batch pipeline on every batch of new
+    files until interrupted (Ctrl+C or SIGTERM).
+
+    The connections, the upload journal, the transform cache and the parsed
+    date cache stay in memory between runs, so a new drop only pays for its
+    own load, transform and upload. Each run gets its own metrics summary
+    (log_<timestamp>_run<n>.json). A failed run is logged and its files are
+    retried later, the daemon keeps going.
+    """
+    ledger = file_load.IngestionLedger(config.ingest_ledger_path)
+    cache = None
+    if config.transform_cache:
+        cache = transform_cache.TransformCache(
+            config.transform_cache_folder, max_bytes=config.transform_cache_max_bytes
+        )
+    watcher = watch_folder.FolderWatcher(
+        source_folder, pattern=config.ingest_pattern, settle_seconds=config.watch_settle_seconds,
+        poll_interval=config.watch_poll_interval, max_queued=config.watch_queue_size,
+        retry_delay=config.watch_retry_seconds, is_new=ledger.filter_new
+    )
+
+    stop = threading.Event()
+    previous_handler = signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+    watcher.start()
+    runs = 0
+    try:
+        while not stop.is_set():
+            source_files = watcher.next_batch(max_files=config.watch_max_files_per_run, timeout=1.0)
+            if not source_files:
+                continue
+
+            runs += 1
+            metrics = RunMetrics(logger, trace_memory=config.trace_memory)
+            set_run_metrics(metrics)
+            logger.info(f"--- Daemon run {runs}: {[f.name for f in source_files]} ---")
+            success = False
+            try:
+                dag = build_batch_pipeline(
+                    config, logger, supabase_client, session, profiler, source_folder, None,
+                    source_files, ledger, output_folder=output_folder, journal=journal, cache=cache
+                )
+                try:
+                    dag.run(max_workers=config.pipeline_workers)
+                finally:
+                    dag.log_critical_path(logger)
+                success = True
+            except Exception as e:
+                logger.error(f"Daemon run {runs} failed, its files are retried in {config.watch_retry_seconds}s: {e}",
+                             exc_info=True)
+            finally:
+                watcher.done(source_files, success)
+                if profiler.wait():
+                    print(f"Profile report generated: {config.profile_report_path}")
+                log_file = get_log_file_path(logger)
+                if log_file is not None:
+                    metrics.write_summary(log_file.with_name(f"{log_file.stem}_run{runs}.json"))
+    except KeyboardInterrupt:
+        logger.info("Interrupted.")
+    finally:
+        logger.info(f"Stopping the daemon after {runs} run(s).")
+        watcher.stop()
+        signal.signal(signal.SIGTERM, previous_handler)
+
+
+def main(config: PipelineConfig = None):
+    """Main application function. Runs with the default PipelineConfig unless `config` is given."""
+    if config is None:
+        config = PipelineConfig()
     
+    # Library loggers report at INFO level (routed to the log file in async mode)
+    logging.basicConfig(level=logging.INFO)
+    # httpx logs every request at INFO, one line per upload batch would bypass
+    # the rate-limited progress logging
+    for name in ("httpx", "httpcore"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
     # Initialize logger
     logger = setup_logger(
         logger_name="SalesDataApp",
         log_folder="logs",
-        log_level=logging.INFO
+        log_level=logging.INFO,
+        async_mode=config.async_logging,
+        capture_prints=config.capture_prints,
+        progress_interval=config.progress_log_interval
     )
     
 
@@ -30,75 +715,68 @@ def main():
     logger.info("APPLICATION STARTED")
     logger.info("="*50)
     
+    metrics = RunMetrics(logger, trace_memory=config.trace_memory)
+    set_run_metrics(metrics)
+    profiler = profiling.BackgroundProfiler()
+    
     try:
+        config.validate()
+
         # --- 0. INITIALIZE SUPABASE CLIENT ---
-        logger.info("--- Initializing Supabase Connection ---")
-        supabase_client = supabase_connect.get_supabase_client()
-        logger.info("Supabase client connected successfully.")
-        
-        # --- 1. DATA LOADING ---
-        logger.info("--- Starting Data Loading Stage ---")
+        supabase_client = None
+        if config.sink == 'supabase':
+            from lib import supabase_connect
+
+            logger.info("--- Initializing Supabase Connection ---")
+            supabase_client = supabase_connect.get_supabase_client()
+            logger.info("Supabase client connected successfully.")
+
         source_folder = 'data'
-        raw_df = file_load.read_latest_csv(folder_path=source_folder, encoding="latin1")
-        logger.info("Raw data loaded successfully.")
-        logger.info(f"Raw DataFrame shape: {raw_df.shape}")
+        if config.daemon_mode:
+            with contextlib.ExitStack() as resources:
+                session, journal = open_upload_resources(config, resources)
+                run_daemon(config, logger, supabase_client, session, journal, profiler, source_folder,
+                           output_folder='transformed_data')
+            return
 
-        # Generate a profile report
-        logger.info("Generating profile report")
-        profile = ProfileReport(raw_df, title="Sales Data Profile Report")
-        profile.to_file("reports/sales_data_profile_report.html")
-        logger.info("Profile report generated successfully")
-        print("Profile report generated: reports/sales_data_profile_report.html")
+        ledger = None
+        source_files = None
+        if config.ingest_mode == 'multi':
+            ledger = file_load.IngestionLedger(config.ingest_ledger_path)
+            source_files = select_source_files(config, source_folder, ledger)
+            if not source_files:
+                logger.info("No new files to ingest.")
+                return
+            logger.info(f"Ingesting {len(source_files)} file(s): {[f.name for f in source_files]}")
 
-        # --- 2. DATA TRANSFORMATION ---
-        logger.info("--- Starting Data Transformation Stage ---")
-        
-        # Create dimension tables
-        dim_date_df = data_transform.create_dim_date(raw_df)
-        dim_product_df = data_transform.create_dim_product(raw_df)
-        dim_customer_df = data_transform.create_dim_customer(raw_df)
-        dim_order_df = data_transform.create_dim_order(raw_df)
+        if config.streaming_mode:
+            # The profile report needs the whole DataFrame, so it is skipped here
+            logger.info("Streaming mode enabled, skipping the profile report.")
+            with metrics.stage("streaming_pipeline"):
+                run_streaming_pipeline(config, logger, supabase_client, source_folder, 'transformed_data',
+                                       source_files=source_files)
+            if ledger is not None:
+                ledger.record(source_files)
+            return
         
-        # Create fact table
-        fact_sales_df = data_transform.create_fact_sales(raw_df, dim_date_df)
-        
-        logger.info("All tables created successfully in memory.")
+        # --- BATCH PIPELINE ---
+        # load -> profile / transform -> upload / save, run as a task graph
+        if source_files is None:
+            source_file = file_load.resolve_csv_file(source_folder)
+        else:
+            # The profile cache is keyed by a single input file
+            source_file = None
 
-        # --- 3. DATA UPLOADING TO SUPABASE ---
-        logger.info("--- Starting Supabase Data Upload Stage ---")
-        
-        # The order is important due to foreign key constraints
-        upload_order = [
-            ('cg_dim_date', dim_date_df),
-            ('cg_dim_product', dim_product_df),
-            ('cg_dim_customer', dim_customer_df),
-            ('cg_dim_order', dim_order_df),
-            ('cg_fact_sales', fact_sales_df)  # Fact table must be last
-        ]
-
-        for table_name, df_to_upload in upload_order:
-            success = supabase_connect.upload_df_to_supabase(
-                client=supabase_client,
-                df=df_to_upload,
-                table_name=table_name
+        with contextlib.ExitStack() as resources:
+            session, journal = open_upload_resources(config, resources)
+            dag = build_batch_pipeline(
+                config, logger, supabase_client, session, profiler, source_folder,
+                source_file, source_files, ledger, output_folder='transformed_data', journal=journal
             )
-            if not success:
-                # If any upload fails, stop the entire process
-                raise Exception(f"Supabase upload failed for table '{table_name}'. Halting application.")
-        
-        logger.info("All data successfully uploaded to Supabase.")
-
-        # --- 4. DATA SAVING ---
-        logger.info("--- Starting Data Saving Stage ---")
-        output_folder = 'transformed_data'
-        
-        data_transform.save_df_to_csv(dim_date_df, output_folder, 'dim_date.csv')
-        data_transform.save_df_to_csv(dim_product_df, output_folder, 'dim_product.csv')
-        data_transform.save_df_to_csv(dim_customer_df, output_folder, 'dim_customer.csv')
-        data_transform.save_df_to_csv(dim_order_df, output_folder, 'dim_order.csv')
-        data_transform.save_df_to_csv(fact_sales_df, output_folder, 'fact_sales.csv')
-        
-        logger.info(f"All transformed data saved to '{output_folder}' directory.")
+            try:
+                dag.run(max_workers=config.pipeline_workers)
+            finally:
+                dag.log_critical_path(logger)
 
     except FileNotFoundError as e:
         logger.error(f"File not found error: {e}")
@@ -111,9 +789,20 @@ def main():
         print(f"Unexpected error: {e}")
     
     finally:
+        # The profile ran alongside the other stages, only collect it here
+        if profiler.wait():
+            print(f"Profile report generated: {config.profile_report_path}")
+        
+        # Machine-readable run summary next to the log file (log_<timestamp>.json)
+        log_file = get_log_file_path(logger)
+        if log_file is not None:
+            metrics.write_summary(log_file.with_suffix('.json'))
+        
         logger.info("="*50)
         logger.info("APPLICATION FINISHED")
         logger.info("="*50)
+        # Writes out the queued log records (async logging)
+        shutdown_logging()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,115 @@
+"""
+Cold-start benchmark: how long `import app` takes in a fresh interpreter.
+
+Every run starts a new Python process with `-X importtime`, so nothing is
+cached in sys.modules. Reports the wall time (minus a bare interpreter
+start), the slowest imports and which heavy optional dependencies were
+loaded at import time (none of them should be, see the imports in app.py):
+
+    python -m benchmarks.bench_startup --repeat 10 --top 15
+
+run_benchmarks.py records the same measurement as the 'import_app'
+benchmark (scale 0), so --compare flags startup regressions too.
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# Dependencies that must only be imported by the stage that needs them
+HEAVY_MODULES = [
+    'supabase', 'postgrest', 'gotrue', 'realtime', 'storage3',
+    'httpx', 'psycopg', 'ydata_profiling', 'matplotlib', 'scipy', 'pyarrow.parquet',
+]
+
+
+def _run_once(module: str) -> Tuple[float, str, List[str]]:
+    """Imports `module` in a fresh interpreter. Returns (wall seconds, importtime log, heavy modules loaded)."""
+    code = (
+        f"import sys, json; import {module}; "
+        f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))"
+    )
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=REPO_ROOT, capture_output=True, text=True, check=True
+    )
+    elapsed = time.perf_counter() - start
+    loaded = json.loads(completed.stdout.strip().splitlines()[-1])
+    return elapsed, completed.stderr, loaded
+
+def _interpreter_start_seconds(repeat: int) -> float:
+    """Fastest start of a bare interpreter, subtracted from the import timings."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', 'pass'], cwd=REPO_ROOT, check=True)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def parse_importtime(log: str) -> List[Tuple[str, int, int, int]]:
+    """Parses `-X importtime` output into (module, nesting depth, self us, cumulative us) tuples."""
+    timings = []
+    for line in log.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        # One space after the separator, then two per nesting level
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        timings.append((name.strip(), depth, int(self_us), int(cumulative_us)))
+    return timings
+
+def measure_cold_start(module: str = 'app', repeat: int = 5) -> Dict:
+    """
+    Imports `module` `repeat` times, each in a new interpreter.
+
+    Returns:
+        {'seconds': fastest import (interpreter start excluded),
+         'seconds_all': every run, 'interpreter_seconds': bare start,
+         'imports': parse_importtime() of the fastest run,
+         'heavy_modules': heavy dependencies loaded by the import}
+    """
+    baseline = _interpreter_start_seconds(repeat)
+    runs = [_run_once(module) for _ in range(repeat)]
+    best_seconds, best_log, heavy = min(runs, key=lambda run: run[0])
+    return {
+        'seconds': max(best_seconds - baseline, 0.0),
+        'seconds_all': [max(seconds - baseline, 0.0) for seconds, _, _ in runs],
+        'interpreter_seconds': baseline,
+        'imports': parse_importtime(best_log),
+        'heavy_modules': heavy,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the cold start of the pipeline")
+    parser.add_argument("--module", default='app', help="Module to import")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="Number of slowest imports listed")
+    args = parser.parse_args()
+
+    result = measure_cold_start(args.module, args.repeat)
+    print(f"import {args.module}: {result['seconds']:.3f}s best, "
+          f"{statistics.median(result['seconds_all']):.3f}s median "
+          f"(interpreter start {result['interpreter_seconds']:.3f}s excluded)")
+
+    # First-level imports, their cumulative time includes their own imports
+    direct = [timing for timing in result['imports'] if timing[1] == 1]
+    print(f"\n{'module':<30}{'cumulative ms':>15}{'self ms':>10}")
+    for name, _, self_us, cumulative_us in sorted(direct, key=lambda timing: -timing[3])[:args.top]:
+        print(f"{name:<30}{cumulative_us / 1000:>15.1f}{self_us / 1000:>10.1f}")
+
+    if result['heavy_modules']:
+        print(f"\nHeavy modules loaded at import time: {', '.join(result['heavy_modules'])}")
+        sys.exit(1)
+    print("\nNo heavy optional dependency loaded at import time.")
+
+
+if __name__ == "__main__":
+    main()
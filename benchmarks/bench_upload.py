@@ -0,0 +1,83 @@
+"""
+Offline upload throughput benchmark against the stub PostgREST server.
+
+Compares the sequential `supabase_connect.upload_df_to_supabase` with the
+`concurrent_upload.ConcurrentUploader` at several concurrency levels:
+
+    python -m benchmarks.bench_upload --rows 200000 --latency-ms 40
+"""
+import argparse
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.stub_postgrest import start_stub_server
+from lib import concurrent_upload, supabase_connect
+
+
+def make_fact_df(rows: int, seed: int = 0) -> pd.DataFrame:
+    """Builds a DataFrame with the columns and value ranges of cg_fact_sales."""
+    rng = np.random.default_rng(seed)
+    quantity = rng.integers(1, 100, rows)
+    price = rng.uniform(25, 100, rows).round(2)
+    return pd.DataFrame({
+        'order_number': 10100 + np.arange(rows) // 10,
+        'product_code': rng.choice([f"S{n}_{m}" for n in range(10, 73) for m in range(1000, 1010)], rows),
+        'customer_name': rng.choice([f"Customer {n}" for n in range(100)], rows),
+        'date_key': rng.choice(pd.date_range('2003-01-01', '2005-12-31').strftime('%Y%m%d').astype(int), rows),
+        'sales': (quantity * price).round(2),
+        'quantity_ordered': quantity,
+        'price_each': price,
+        'deal_size': rng.choice(['Small', 'Medium', 'Large'], rows),
+        'order_line_number': np.arange(rows) % 10 + 1,
+    })
+
+
+def run_benchmark(rows: int, latency_ms: float, concurrency_levels):
+    df = make_fact_df(rows)
+    server = start_stub_server(latency=latency_ms / 1000)
+    url = f"http://127.0.0.1:{server.server_port}"
+    results = []
+
+    try:
+        from supabase import create_client
+        client = create_client(url, supabase_connect.SUPABASE_KEY)
+        server.state.reset()
+        start = time.perf_counter()
+        supabase_connect.upload_df_to_supabase(client, df, 'cg_fact_sales', clear_table=False)
+        results.append(('sequential (supabase client)', time.perf_counter() - start, server.state.rows['cg_fact_sales']))
+
+        for concurrency in concurrency_levels:
+            server.state.reset()
+            with concurrent_upload.get_rest_session(url, supabase_connect.SUPABASE_KEY,
+                                                    max_connections=concurrency) as session:
+                uploader = concurrent_upload.ConcurrentUploader(session, max_in_flight=concurrency)
+                start = time.perf_counter()
+                uploader.upload(df, 'cg_fact_sales')
+                results.append((f"concurrent x{concurrency}", time.perf_counter() - start,
+                                server.state.rows['cg_fact_sales']))
+    finally:
+        server.shutdown()
+
+    print(f"\n{rows} rows, {latency_ms:.0f} ms simulated latency")
+    print(f"{'mode':<30}{'seconds':>10}{'rows/s':>12}{'rows received':>15}")
+    for mode, elapsed, received in results:
+        print(f"{mode:<30}{elapsed:>10.2f}{rows / elapsed:>12.0f}{received:>15}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Supabase uploads against a local stub")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--latency-ms", type=float, default=40.0)
+    parser.add_argument("--concurrency", type=int, nargs='+', default=[1, 4, 8])
+    args = parser.parse_args()
+
+    # Keep the library's per-batch INFO lines out of the timings
+    logging.getLogger().setLevel(logging.WARNING)
+    run_benchmark(args.rows, args.latency_ms, args.concurrency)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+Synthetic sales extract generator.
+
+Writes CSV files with the exact column layout of the sales extract that
+`data_transform` expects, at any scale, with cardinalities close to the real
+data: ~9 lines per order, a few hundred products and customers, three years
+of order dates, 7 product lines, 19 countries in 4 territories.
+
+    python -m benchmarks.generate_sales --rows 1000000 --output data/synthetic_1m.csv
+
+The file is written in chunks, so generating 50M rows needs no more memory
+than generating one chunk.
+"""
+import argparse
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+COLUMNS = [
+    'ORDERNUMBER', 'QUANTITYORDERED', 'PRICEEACH', 'ORDERLINENUMBER', 'SALES',
+    'ORDERDATE', 'STATUS', 'QTR_ID', 'MONTH_ID', 'YEAR_ID', 'PRODUCTLINE', 'MSRP',
+    'PRODUCTCODE', 'CUSTOMERNAME', 'PHONE', 'ADDRESSLINE1', 'ADDRESSLINE2', 'CITY',
+    'STATE', 'POSTALCODE', 'COUNTRY', 'TERRITORY', 'CONTACTLASTNAME',
+    'CONTACTFIRSTNAME', 'DEALSIZE',
+]
+
+PRODUCT_LINES = ['Classic Cars', 'Vintage Cars', 'Motorcycles', 'Trucks and Buses',
+                 'Planes', 'Ships', 'Trains']
+STATUSES = ['Shipped', 'Cancelled', 'Resolved', 'On Hold', 'In Process', 'Disputed']
+STATUS_WEIGHTS = [0.92, 0.02, 0.02, 0.015, 0.015, 0.01]
+
+# (country, territory, cities)
+LOCATIONS = [
+    ('USA', 'NA', ['NYC', 'San Francisco', 'Boston', 'Philadelphia', 'Los Angeles']),
+    ('Canada', 'NA', ['Vancouver', 'Montreal', 'Tsawassen']),
+    ('France', 'EMEA', ['Paris', 'Nantes', 'Lyon', 'Marseille']),
+    ('Spain', 'EMEA', ['Madrid', 'Barcelona']),
+    ('Germany', 'EMEA', ['Frankfurt', 'Munich']),
+    ('UK', 'EMEA', ['London', 'Manchester']),
+    ('Italy', 'EMEA', ['Torino', 'Reggio Emilia']),
+    ('Finland', 'EMEA', ['Helsinki', 'Oulu']),
+    ('Norway', 'EMEA', ['Oslo', 'Stavern']),
+    ('Sweden', 'EMEA', ['Lule', 'Boras']),
+    ('Denmark', 'EMEA', ['Kobenhavn', 'Aaarhus']),
+    ('Belgium', 'EMEA', ['Bruxelles', 'Charleroi']),
+    ('Switzerland', 'EMEA', ['Geneve']),
+    ('Austria', 'EMEA', ['Graz', 'Salzburg']),
+    ('Ireland', 'EMEA', ['Dublin']),
+    ('Australia', 'APAC', ['Melbourne', 'Sydney', 'Chatswood']),
+    ('Singapore', 'APAC', ['Singapore']),
+    ('Philippines', 'Japan', ['Makati City']),
+    ('Japan', 'Japan', ['Tokyo', 'Osaka']),
+]
+
+FIRST_NAMES = ['Jean', 'Peter', 'Janine', 'Jonas', 'Susan', 'Roland', 'Julie', 'Kwai',
+               'Diego', 'Christina', 'Paul', 'Mary', 'Jeff', 'Leslie', 'Elizabeth']
+LAST_NAMES = ['King', 'Ferguson', 'Labrune', 'Bergulfsen', 'Nelson', 'Keitel', 'Murphy',
+              'Lee', 'Freyre', 'Berglund', 'Henriot', 'Saveley', 'Young', 'Brown', 'Devon']
+
+
+def default_cardinalities(rows: int) -> dict:
+    """Distinct products/customers/dates for a given row count (grow slowly with scale)."""
+    return {
+        'products': int(min(20_000, max(109, 109 * (rows / 3_000) ** 0.25))),
+        'customers': int(min(1_000_000, max(92, 92 * (rows / 3_000) ** 0.5))),
+        'start_date': '2003-01-01',
+        'days': int(min(365 * 20, max(1095, rows // 3_000))),
+    }
+
+def _build_products(count: int, rng: np.random.Generator) -> pd.DataFrame:
+    return pd.DataFrame({
+        'PRODUCTCODE': [f"S{10 + i // 10000}_{1000 + i % 10000}" for i in range(count)],
+        'PRODUCTLINE': rng.choice(PRODUCT_LINES, count),
+        'MSRP': rng.integers(33, 215, count),
+    })
+
+def _build_customers(count: int, rng: np.random.Generator) -> pd.DataFrame:
+    location_ids = rng.integers(0, len(LOCATIONS), count)
+    countries = [LOCATIONS[i][0] for i in location_ids]
+    territories = [LOCATIONS[i][1] for i in location_ids]
+    cities = [LOCATIONS[i][2][j % len(LOCATIONS[i][2])] for j, i in enumerate(location_ids)]
+    has_line2 = rng.random(count) < 0.1
+    has_state = rng.random(count) < 0.45
+    return pd.DataFrame({
+        'CUSTOMERNAME': [f"Customer {i:06d} Co." for i in range(count)],
+        'PHONE': [f"+{rng.integers(1, 99)} {rng.integers(100, 999)} 555 {i % 10000:04d}" for i in range(count)],
+        'ADDRESSLINE1': [f"{i % 999 + 1} Main Street" for i in range(count)],
+        'ADDRESSLINE2': np.where(has_line2, [f"Level {i % 20 + 1}" for i in range(count)], None),
+        'CITY': cities,
+        'STATE': np.where(has_state, 'CA', None),
+        'POSTALCODE': [f"{10000 + i % 89999}" for i in range(count)],
+        'COUNTRY': countries,
+        'TERRITORY': territories,
+        'CONTACTLASTNAME': rng.choice(LAST_NAMES, count),
+        'CONTACTFIRSTNAME': rng.choice(FIRST_NAMES, count),
+    })
+
+def generate_chunk(start_row: int, rows: int, products: pd.DataFrame, customers: pd.DataFrame,
+                   cardinalities: dict, seed: int) -> pd.DataFrame:
+    """Generates rows [start_row, start_row + rows) of the extract."""
+    rng = np.random.default_rng(seed + start_row)
+    row_ids = np.arange(start_row, start_row + rows)
+
+    # ~9 lines per order; every order belongs to one customer and one date
+    order_ids = row_ids // 9
+    customer_of_order = (order_ids * 2654435761) % len(customers)
+    day_of_order = (order_ids * 7919) % cardinalities['days']
+
+    product_idx = rng.integers(0, len(products), rows)
+    quantity = rng.integers(6, 98, rows)
+    msrp = products['MSRP'].to_numpy()[product_idx]
+    price = np.round(msrp * rng.uniform(0.8, 1.2, rows), 2)
+    sales = np.round(quantity * price, 2)
+    calendar = pd.date_range(cardinalities['start_date'], periods=cardinalities['days'], freq='D')
+    dates = calendar[day_of_order]
+    # Same layout as the source: month/day/year without zero padding, plus a time
+    date_strings = np.array([f"{d.month}/{d.day}/{d.year} 0:00" for d in calendar], dtype=object)
+
+    chunk = pd.DataFrame({
+        'ORDERNUMBER': 10100 + order_ids,
+        'QUANTITYORDERED': quantity,
+        'PRICEEACH': price,
+        'ORDERLINENUMBER': row_ids % 9 + 1,
+        'SALES': sales,
+        'ORDERDATE': date_strings[day_of_order],
+        'STATUS': rng.choice(STATUSES, rows, p=STATUS_WEIGHTS),
+        'QTR_ID': dates.quarter,
+        'MONTH_ID': dates.month,
+        'YEAR_ID': dates.year,
+        'DEALSIZE': np.select([sales < 3000, sales < 7000], ['Small', 'Medium'], 'Large'),
+    })
+    chunk = pd.concat([
+        chunk,
+        products.iloc[product_idx].reset_index(drop=True),
+        customers.iloc[customer_of_order].reset_index(drop=True),
+    ], axis=1)
+    return chunk[COLUMNS]
+
+def generate_sales_csv(output_path: str, rows: int, seed: int = 42,
+                       chunk_rows: int = 500_000, cardinalities: Optional[dict] = None) -> Path:
+    """
+    Writes a synthetic sales extract.
+
+    Args:
+        output_path: CSV file to write (parent folders are created).
+        rows: Number of rows.
+        seed: Random seed; the same seed and row count give the same file.
+        chunk_rows: Rows generated and written at a time.
+        cardinalities: Overrides for `default_cardinalities(rows)`.
+
+    Returns:
+        The path of the written file.
+    """
+    cardinalities = {**default_cardinalities(rows), **(cardinalities or {})}
+    rng = np.random.default_rng(seed)
+    products = _build_products(cardinalities['products'], rng)
+    customers = _build_customers(cardinalities['customers'], rng)
+
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, 'w', encoding='latin1', newline='') as f:
+        for start in range(0, rows, chunk_rows):
+            chunk = generate_chunk(start, min(chunk_rows, rows - start), products, customers,
+                                   cardinalities, seed)
+            chunk.to_csv(f, index=False, header=(start == 0))
+    return output_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic sales extract")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--output", default="benchmarks/.data/sales_synthetic.csv")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    path = generate_sales_csv(args.output, args.rows, seed=args.seed)
+    print(f"Wrote {args.rows} rows to '{path}' ({path.stat().st_size / 1024**2:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
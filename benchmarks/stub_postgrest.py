@@ -0,0 +1,287 @@
+"""
+Local stub of the Supabase REST (PostgREST) API for offline benchmarks.
+
+The stub accepts the requests the uploaders send (insert, select with limit,
+delete, update), counts the rows it receives per table and can add an
+artificial latency to every request to simulate the round trip to Supabase.
+
+With `store_rows` it also keeps the rows, so tests can check what a sync
+left behind: inserts and upserts (`on_conflict` with the `resolution` of the
+Prefer header) are applied, and GET, PATCH and DELETE honour the
+`eq.`, `in.(...)` and `is.` filters (optionally negated with `not.`).
+
+Run it standalone:
+
+    python -m benchmarks.stub_postgrest --port 54321 --latency-ms 50
+
+and point SUPABASE_URL at http://127.0.0.1:54321, or start it in-process
+with `start_stub_server`.
+"""
+import argparse
+import json
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+from urllib.parse import parse_qsl, urlparse
+
+# Query parameters that are not row filters
+RESERVED_PARAMS = {'select', 'limit', 'offset', 'order', 'on_conflict', 'columns'}
+
+
+class StubState:
+    """Row counters and request statistics shared by all handler threads."""
+
+    def __init__(self, latency: float = 0.0, store_rows: bool = False):
+        self.latency = latency
+        self.store_rows = store_rows
+        self.lock = threading.Lock()
+        self.rows: Dict[str, int] = defaultdict(int)
+        self.sample_rows: Dict[str, dict] = {}
+        # Table -> stored rows (only with store_rows)
+        self.tables: Dict[str, List[dict]] = defaultdict(list)
+        self.requests = 0
+        self.bytes_received = 0
+
+    def reset(self):
+        with self.lock:
+            self.rows.clear()
+            self.sample_rows.clear()
+            self.tables.clear()
+            self.requests = 0
+            self.bytes_received = 0
+
+
+def _split_list(values: str) -> List[str]:
+    """Splits the inside of an in.(...) filter, honouring double-quoted, backslash-escaped values."""
+    items, current, quoted, escaped = [], [], False, False
+    for char in values:
+        if escaped:
+            current.append(char)
+            escaped = False
+        elif char == '\\' and quoted:
+            escaped = True
+        elif char == '"':
+            quoted = not quoted
+        elif char == ',' and not quoted:
+            items.append(''.join(current))
+            current = []
+        else:
+            current.append(char)
+    items.append(''.join(current))
+    return items
+
+def _as_text(value) -> Optional[str]:
+    """A stored value as PostgREST compares it with a filter literal."""
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return str(value)
+
+def parse_filter(column: str, expression: str) -> Callable[[dict], bool]:
+    """Turns one query parameter (e.g. `in.("a","b")`, `is.true`, `not.is.null`) into a row predicate."""
+    if expression.startswith('not.'):
+        positive = parse_filter(column, expression[len('not.'):])
+        return lambda row: not positive(row)
+
+    operator, _, operand = expression.partition('.')
+    if operator == 'eq':
+        return lambda row: _as_text(row.get(column)) == operand
+    if operator == 'in':
+        values = set(_split_list(operand[1:-1]))
+        return lambda row: _as_text(row.get(column)) in values
+    if operator == 'is':
+        expected = {'null': None, 'true': True, 'false': False}[operand]
+        return lambda row: row.get(column) is expected
+    raise ValueError(f"Unsupported filter '{column}={expression}'")
+
+
+class StubPostgRESTHandler(BaseHTTPRequestHandler):
+    # Keep connections alive so clients can reuse them
+    protocol_version = "HTTP/1.1"
+    server_version = "StubPostgREST/1.0"
+
+    @property
+    def state(self) -> StubState:
+        return self.server.state
+
+    def log_message(self, format, *args):
+        # Silence the default per-request logging to stderr
+        pass
+
+    def _table_name(self) -> str:
+        path = urlparse(self.path).path
+        return path.rstrip('/').rsplit('/', 1)[-1]
+
+    def _params(self) -> Dict[str, str]:
+        return dict(parse_qsl(urlparse(self.path).query, keep_blank_values=True))
+
+    def _row_filter(self) -> Callable[[dict], bool]:
+        """The conjunction of the filters in the query string."""
+        predicates = [parse_filter(column, expression) for column, expression in self._params().items()
+                      if column not in RESERVED_PARAMS]
+        return lambda row: all(predicate(row) for predicate in predicates)
+
+    def _store(self, table: str, rows: List[dict]):
+        """Inserts or upserts rows into the stored table (call with the lock held)."""
+        stored = self.state.tables[table]
+        on_conflict = self._params().get('on_conflict')
+        if not on_conflict:
+            stored.extend(rows)
+            return
+        key_columns = on_conflict.split(',')
+        key = lambda row: tuple(_as_text(row.get(column)) for column in key_columns)
+        positions = {key(row): position for position, row in enumerate(stored)}
+        merge = "resolution=merge-duplicates" in self.headers.get("Prefer", "")
+        for row in rows:
+            position = positions.get(key(row))
+            if position is None:
+                positions[key(row)] = len(stored)
+                stored.append(row)
+            elif merge:
+                stored[position] = {**stored[position], **row}
+
+    def _send_json(self, status: int, body) -> None:
+        payload = json.dumps(body).encode('utf-8') if body is not None else b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        if payload:
+            self.wfile.write(payload)
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get("Content-Length", 0))
+        return self.rfile.read(length) if length else b""
+
+    def _simulate_latency(self):
+        if self.state.latency:
+            time.sleep(self.state.latency)
+
+    def do_POST(self):
+        body = self._read_body()
+        self._simulate_latency()
+        table = self._table_name()
+
+        try:
+            rows = json.loads(body) if body else []
+        except json.JSONDecodeError as e:
+            self._send_json(400, {"message": f"Invalid JSON: {e}"})
+            return
+        if isinstance(rows, dict):
+            rows = [rows]
+
+        with self.state.lock:
+            self.state.requests += 1
+            self.state.bytes_received += len(body)
+            self.state.rows[table] += len(rows)
+            if rows:
+                self.state.sample_rows[table] = rows[0]
+            if self.state.store_rows:
+                self._store(table, rows)
+
+        # Echo the rows back only when the client asks for them (supabase-py default)
+        if "return=representation" in self.headers.get("Prefer", "return=representation"):
+            self._send_json(201, rows)
+        else:
+            self._send_json(201, None)
+
+    def do_GET(self):
+        self._read_body()
+        self._simulate_latency()
+        table = self._table_name()
+        with self.state.lock:
+            self.state.requests += 1
+            if self.state.store_rows:
+                matches = list(filter(self._row_filter(), self.state.tables[table]))
+                limit = self._params().get('limit')
+                self._send_json(200, matches[:int(limit)] if limit else matches)
+                return
+            sample = self.state.sample_rows.get(table)
+        self._send_json(200, [sample] if sample else [])
+
+    def do_PATCH(self):
+        body = self._read_body()
+        self._simulate_latency()
+        table = self._table_name()
+        try:
+            changes = json.loads(body) if body else {}
+        except json.JSONDecodeError as e:
+            self._send_json(400, {"message": f"Invalid JSON: {e}"})
+            return
+
+        with self.state.lock:
+            self.state.requests += 1
+            self.state.bytes_received += len(body)
+            updated = []
+            if self.state.store_rows:
+                matches = self._row_filter()
+                for row in self.state.tables[table]:
+                    if matches(row):
+                        row.update(changes)
+                        updated.append(dict(row))
+        if "return=representation" in self.headers.get("Prefer", ""):
+            self._send_json(200, updated)
+        else:
+            self._send_json(204, None)
+
+    def do_DELETE(self):
+        self._read_body()
+        self._simulate_latency()
+        table = self._table_name()
+        with self.state.lock:
+            self.state.requests += 1
+            if self.state.store_rows:
+                matches = self._row_filter()
+                self.state.tables[table] = [row for row in self.state.tables[table] if not matches(row)]
+            else:
+                self.state.rows.pop(table, None)
+                self.state.sample_rows.pop(table, None)
+        self._send_json(200, [])
+
+
+def start_stub_server(host: str = "127.0.0.1", port: int = 0, latency: float = 0.0,
+                      store_rows: bool = False):
+    """
+    Starts the stub server on a background thread.
+
+    Args:
+        host: Interface to bind.
+        port: Port to bind, 0 picks a free port.
+        latency: Artificial latency in seconds added to every request.
+        store_rows: Keep the rows (`server.state.tables`) and apply filters,
+            upserts and updates to them. Off for benchmarks, which only count.
+
+    Returns:
+        The running server. Its URL is `f"http://{host}:{server.server_port}"`,
+        its counters are in `server.state`; call `server.shutdown()` to stop it.
+    """
+    server = ThreadingHTTPServer((host, port), StubPostgRESTHandler)
+    server.daemon_threads = True
+    server.state = StubState(latency=latency, store_rows=store_rows)
+    thread = threading.Thread(target=server.serve_forever, name="stub-postgrest", daemon=True)
+    thread.start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stub of the Supabase REST API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=54321)
+    parser.add_argument("--latency-ms", type=float, default=0.0,
+                        help="Artificial latency added to every request")
+    args = parser.parse_args()
+
+    server = start_stub_server(args.host, args.port, args.latency_ms / 1000)
+    print(f"Stub PostgREST listening on http://{args.host}:{server.server_port}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,352 @@
+import logging
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Dict, Optional, Sequence, Tuple
+
+import httpx
+import numpy as np
+import pandas as pd
+
+from lib.date_parsing import format_iso_dates
+from lib.json_records import encode_json_batch
+from lib.logger import get_run_metrics, progress
+from lib.schema import to_object_dtypes
+from lib.supabase_connect import SUPABASE_KEY, SUPABASE_URL
+
+logger = logging.getLogger(__name__)
+
+
+# --------------------------------------------------------------------------
+# Pooled HTTP session for the PostgREST endpoint
+# --------------------------------------------------------------------------
+def get_rest_session(url: str = SUPABASE_URL,
+                     key: str = SUPABASE_KEY,
+                     max_connections: int = 8,
+                     timeout: float = 60.0,
+                     http2: bool = False) -> httpx.Client:
+    """
+    Creates an httpx client for the Supabase REST (PostgREST) API.
+
+    The client keeps up to `max_connections` keep-alive connections open, so
+    concurrent batches reuse the same TCP/TLS connections instead of opening
+    a new one per request.
+
+    Args:
+        url: The Supabase project URL (the REST API lives under /rest/v1).
+        key: The Supabase API key.
+        max_connections: Size of the connection pool.
+        timeout: Timeout in seconds for each request.
+        http2: Multiplex requests over HTTP/2 (requires the `h2` package).
+
+    Returns:
+        A configured httpx.Client. Close it when the upload is done.
+    """
+    if not url or not key:
+        raise ValueError("Supabase URL or API key not set in environment variables.")
+
+    return httpx.Client(
+        base_url=f"{url.rstrip('/')}/rest/v1",
+        headers={
+            "apikey": key,
+            "Authorization": f"Bearer {key}",
+            "Content-Type": "application/json",
+        },
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections
+        ),
+        timeout=timeout,
+        http2=http2,
+    )
+
+
+# --------------------------------------------------------------------------
+# Adaptive batch sizing
+# --------------------------------------------------------------------------
+class AdaptiveBatchSizer:
+    """
+    Adjusts the number of rows per batch from the observed request latency
+    and payload size.
+
+    Batches that come back well under `target_latency` grow the batch size,
+    batches that take much longer shrink it. The size is also capped so that
+    a batch stays under `max_payload_bytes`, using the average encoded row
+    size observed so far.
+    """
+
+    def __init__(self,
+                 initial_size: int = 1000,
+                 min_size: int = 100,
+                 max_size: int = 10000,
+                 target_latency: float = 1.0,
+                 max_payload_bytes: int = 4 * 1024**2):
+        self.min_size = min_size
+        self.max_size = max_size
+        self.target_latency = target_latency
+        self.max_payload_bytes = max_payload_bytes
+        self._size = max(min_size, min(initial_size, max_size))
+        self._bytes_per_row: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def batch_size(self) -> int:
+        """The number of rows to put in the next batch."""
+        with self._lock:
+            return self._size
+
+    def record(self, rows: int, payload_bytes: int, latency: float):
+        """Feeds back the result of one batch."""
+        if rows <= 0:
+            return
+
+        with self._lock:
+            bytes_per_row = payload_bytes / rows
+            if self._bytes_per_row is None:
+                self._bytes_per_row = bytes_per_row
+            else:
+                # Exponential moving average to smooth out odd batches
+                self._bytes_per_row = 0.8 * self._bytes_per_row + 0.2 * bytes_per_row
+
+            size = self._size
+            if latency > self.target_latency * 1.5:
+                size = size // 2
+            elif latency < self.target_latency * 0.5:
+                size = int(size * 1.25) + 1
+
+            payload_cap = int(self.max_payload_bytes / max(self._bytes_per_row, 1.0))
+            self._size = max(self.min_size, min(size, self.max_size, payload_cap))
+
+
+# --------------------------------------------------------------------------
+# Retries
+# --------------------------------------------------------------------------
+@dataclass
+class RetryPolicy:
+    """
+    Retries of transient batch failures: connection errors, timeouts and the
+    HTTP statuses in `retry_statuses`, with exponential backoff and full
+    jitter (a random delay between 0 and base_delay * 2**attempt, capped at
+    max_delay), so concurrent batches do not retry in lockstep. A
+    Retry-After header from the server takes precedence.
+    """
+    max_attempts: int = 6
+    base_delay: float = 0.5
+    max_delay: float = 30.0
+    retry_statuses: Tuple[int, ...] = (408, 425, 429, 500, 502, 503, 504)
+
+    def delay(self, attempt: int, response: Optional[httpx.Response] = None) -> float:
+        """Seconds to wait before retry number `attempt` (1 for the first retry)."""
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after and retry_after.isdigit():
+                return min(float(retry_after), self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+
+# --------------------------------------------------------------------------
+# Concurrent uploader
+# --------------------------------------------------------------------------
+def prepare_df_for_upload(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Makes a DataFrame JSON-ready: NaN becomes None and `order_date` is
+    formatted as 'YYYY-MM-DD'.
+    """
+    df_clean = to_object_dtypes(df).replace({np.nan: None})
+    if 'order_date' in df_clean.columns:
+        df_clean['order_date'] = format_iso_dates(df['order_date'])
+    return df_clean
+
+class ConcurrentUploader:
+    """
+    Uploads DataFrames to PostgREST with a bounded number of batches in flight.
+
+    Batches are inserted with `Prefer: return=minimal`, so the server does not
+    echo the inserted rows back. A single uploader (and its connection pool)
+    can be shared by several tables uploading at the same time.
+
+    Transient failures are retried according to the RetryPolicy. Batches
+    that may already have reached the server (retries, and every batch of a
+    resumed run) are sent with ON CONFLICT DO NOTHING on the table's natural
+    key, so they can never be inserted twice. With a checkpoint (see
+    `upload_journal`), committed batches are recorded and skipped on a rerun.
+    """
+
+    def __init__(self,
+                 session: httpx.Client,
+                 max_in_flight: int = 4,
+                 sizer: Optional[AdaptiveBatchSizer] = None,
+                 retry: Optional[RetryPolicy] = None):
+        """
+        Args:
+            session: The pooled client returned by `get_rest_session`.
+            max_in_flight: Maximum number of concurrent batch requests per table.
+            sizer: Batch size controller. A default AdaptiveBatchSizer is used if None.
+            retry: Retry policy for transient failures. A default RetryPolicy is used if None.
+        """
+        if max_in_flight < 1:
+            raise ValueError(f"max_in_flight must be at least 1, got {max_in_flight}")
+
+        self.session = session
+        self.max_in_flight = max_in_flight
+        self.sizer = sizer or AdaptiveBatchSizer()
+        self.retry = retry or RetryPolicy()
+
+    def _post_batch(self, table_name: str, payload: bytes, rows: int, first_row: int,
+                    on_conflict: Optional[str] = None, idempotent_key: Optional[str] = None,
+                    idempotent: bool = False) -> Tuple[int, int, float]:
+        """
+        Inserts (or upserts) one encoded batch and returns (rows, payload_bytes, latency).
+
+        Transient failures are retried. Retries of a plain insert, and every
+        attempt when `idempotent` is set, skip rows whose `idempotent_key`
+        already exists, as an earlier attempt may have been committed.
+        """
+        attempt = 0
+        while True:
+            if on_conflict:
+                headers = {"Prefer": "return=minimal,resolution=merge-duplicates"}
+                params = {"on_conflict": on_conflict}
+            elif idempotent_key and (idempotent or attempt > 0):
+                headers = {"Prefer": "return=minimal,resolution=ignore-duplicates"}
+                params = {"on_conflict": idempotent_key}
+            else:
+                headers = {"Prefer": "return=minimal"}
+                params = None
+
+            attempt += 1
+            start = time.perf_counter()
+            try:
+                response = self.session.post(
+                    f"/{table_name}",
+                    content=payload,
+                    headers=headers,
+                    params=params,
+                )
+            except httpx.TransportError as e:
+                response, error, retryable = None, f"{type(e).__name__}: {e}", True
+            else:
+                if response.status_code < 400:
+                    break
+                error = f"HTTP {response.status_code}: {response.text[:500]}"
+                retryable = response.status_code in self.retry.retry_statuses
+            latency = time.perf_counter() - start
+
+            if not retryable or attempt >= self.retry.max_attempts:
+                raise RuntimeError(
+                    f"Batch starting at row {first_row} for table '{table_name}' failed "
+                    f"after {attempt} attempt(s) with {error}"
+                )
+            delay = self.retry.delay(attempt, response)
+            logger.warning(
+                f"Batch starting at row {first_row} for '{table_name}' failed with {error}, "
+                f"retrying in {delay:.1f}s (attempt {attempt + 1}/{self.retry.max_attempts})."
+            )
+            get_run_metrics().add_counter(f"upload.{table_name}.retries", rows=rows, seconds=latency)
+            time.sleep(delay)
+
+        latency = time.perf_counter() - start
+
+        self.sizer.record(rows, len(payload), latency)
+        get_run_metrics().add_counter(f"upload.{table_name}", rows=rows,
+                                      bytes_processed=len(payload), seconds=latency)
+        return rows, len(payload), latency
+
+    def upload(self, df: pd.DataFrame, table_name: str, on_conflict: Optional[str] = None,
+               checkpoint=None, idempotent_key: Optional[str] = None, resumed: bool = False) -> bool:
+        """
+        Inserts all rows of `df` into `table_name` (the table is not cleared first).
+
+        Args:
+            df: The pandas DataFrame to upload.
+            table_name: The name of the destination table in Supabase.
+            on_conflict: Comma-separated key columns. If given, rows are upserted:
+                existing rows with the same key are updated instead of failing.
+            checkpoint: Optional `upload_journal.TableCheckpoint`. Its committed
+                row ranges are skipped and every accepted batch is recorded in it.
+            idempotent_key: Comma-separated natural key used to skip rows that
+                already exist when a batch is retried. Defaults to the table's
+                key in `incremental_sync.TABLE_KEYS`.
+            resumed: The table may already hold rows of `df` from an earlier
+                attempt (a resumed run), so every batch is sent idempotently.
+
+        Returns:
+            True if every batch was inserted, False otherwise.
+        """
+        if df.empty:
+            logger.warning(f"DataFrame for '{table_name}' is empty. Nothing to upload.")
+            return True
+
+        # Each batch is encoded from the column arrays when it is sent, so at most
+        # `max_in_flight` payloads exist at a time and no per-row dicts are built
+        total_rows = len(df)
+        logger.info(
+            f"Starting concurrent upload for table '{table_name}' with {total_rows} rows "
+            f"({self.max_in_flight} batches in flight)."
+        )
+
+        start = time.perf_counter()
+        total_bytes = 0
+        batch_number = 0
+        offset = 0
+        in_flight: Dict[Future, Tuple[int, int]] = {}
+        failed = False
+        if idempotent_key is None:
+            # Imported here, incremental_sync imports this module
+            from lib.incremental_sync import TABLE_KEYS
+            idempotent_key = ",".join(TABLE_KEYS.get(table_name, [])) or None
+        resumed = resumed or (checkpoint is not None and checkpoint.resumed)
+        if idempotent_key is None and resumed:
+            logger.warning(f"No natural key known for '{table_name}', resumed batches may insert duplicates.")
+
+        with ThreadPoolExecutor(max_workers=self.max_in_flight,
+                                thread_name_prefix=f"upload-{table_name}") as executor:
+            while offset < total_rows or in_flight:
+                # Keep the pipeline full as long as there are rows left
+                while not failed and offset < total_rows and len(in_flight) < self.max_in_flight:
+                    size = self.sizer.batch_size
+                    if checkpoint is not None:
+                        offset, pending_rows = checkpoint.next_pending(offset, total_rows)
+                        if pending_rows == 0:
+                            break
+                        rows = min(size, pending_rows)
+                    else:
+                        rows = min(size, total_rows - offset)
+                    payload = encode_json_batch(df, offset, offset + rows)
+                    batch_number += 1
+                    logger.info("Uploading batch %d: rows %d to %d for '%s'.",
+                                batch_number, offset + 1, offset + rows, table_name, extra=progress(table_name))
+                    future = executor.submit(self._post_batch, table_name, payload, rows, offset,
+                                             on_conflict, idempotent_key, resumed)
+                    in_flight[future] = (offset, rows)
+                    offset += rows
+
+                if not in_flight:
+                    break
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    first_row, rows = in_flight.pop(future)
+                    try:
+                        _, payload_bytes, _ = future.result()
+                        total_bytes += payload_bytes
+                        if checkpoint is not None:
+                            checkpoint.record(first_row, rows)
+                    except Exception as e:
+                        logger.error(
+                            f"An exception occurred during batch insert for '{table_name}' "
+                            f"(batch starting at row {first_row}): {e}"
+                        )
+                        failed = True
+
+        if failed:
+            return False
+
+        elapsed = time.perf_counter() - start
+        logger.info(
+            f"Successfully uploaded all {total_rows} rows to '{table_name}' in {elapsed:.2f}s "
+            f"({total_rows / max(elapsed, 1e-9):.0f} rows/s, {total_bytes / 1024**2:.2f} MB)."
+        )
+        return True
@@ -1,12 +1,18 @@
+import numpy as np
 import pandas as pd
 from pathlib import Path
 import logging
-from typing import List, Optional
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+from lib.date_parsing import DateKeyCache, get_date_cache
 
 # Get a logger instance
 logger = logging.getLogger(__name__)
 
-def save_df_to_csv(df: pd.DataFrame, file_path: str, file_name: str):
+def save_df_to_csv(df: pd.DataFrame, file_path: str, file_name: str, append: bool = False):
     """
     Saves a DataFrame to a CSV file.
 
@@ -18,6 +24,9 @@ def save_df_to_csv(df: pd.DataFrame, file_path: str, file_name: str):
         The relative path to the folder where the file will be saved.
     file_name : str
         The name of the output CSV file (e.g., 'dim_customer.csv').
+    append : bool
+        If True, append rows to an existing file (the header is only written
+        when the file does not exist yet). Used by the streaming pipeline.
     """
     try:
         # Create the directory if it doesn't exist
@@ -28,7 +37,13 @@ def save_df_to_csv(df: pd.DataFrame, file_path: str, file_name: str):
         full_path = output_dir / file_name
         
         # Save the DataFrame to CSV
-        df.to_csv(full_path, index=False, encoding='utf-8')
+        if append:
+            write_header = not full_path.exists()
+            df.to_csv(full_path, mode='a', header=write_header, index=False, encoding='utf-8')
+        else:
+            # Write to a temp file and rename, so readers never see a partial file
+            with _atomic_output_path(full_path) as tmp_path:
+                df.to_csv(tmp_path, index=False, encoding='utf-8')
         
         logger.info(f"Successfully saved DataFrame to '{full_path}'")
         print(f"Successfully saved DataFrame to '{full_path}'")
@@ -38,9 +53,229 @@ def save_df_to_csv(df: pd.DataFrame, file_path: str, file_name: str):
         print(f"Error saving DataFrame to '{file_name}': {e}")
         raise
 
+class _atomic_output_path:
+    """
+    Context manager yielding a temporary path next to `full_path`. On success
+    the temporary file is renamed over `full_path` (atomic on the same
+    filesystem); on error it is removed.
+    """
+
+    def __init__(self, full_path: Path):
+        self.full_path = Path(full_path)
+        self.tmp_path = self.full_path.with_name(f".{self.full_path.name}.{uuid.uuid4().hex}.tmp")
+
+    def __enter__(self) -> Path:
+        return self.tmp_path
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            os.replace(self.tmp_path, self.full_path)
+        else:
+            self.tmp_path.unlink(missing_ok=True)
+        return False
+
+# Rows per Parquet row group. The dimensions are small and are written as a
+# single row group; the fact table is split so readers can skip and
+# parallelize over row groups.
+PARQUET_ROW_GROUP_SIZES = {
+    'fact_sales': 250_000,
+}
+DEFAULT_PARQUET_ROW_GROUP_SIZE = 1_000_000
+
+def save_df_to_parquet(df: pd.DataFrame, file_path: str, file_name: str,
+                       row_group_size: Optional[int] = None,
+                       compression: str = 'zstd'):
+    """
+    Saves a DataFrame to a Parquet file (requires pyarrow).
+
+    Text columns are dictionary encoded (categoricals map directly to Arrow
+    dictionary arrays) and the dtypes are stored in the file, so readers
+    don't have to re-infer them. The file is written atomically.
+
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        The DataFrame to save.
+    file_path : str
+        The relative path to the folder where the file will be saved.
+    file_name : str
+        The name of the output file (e.g., 'fact_sales.parquet').
+    row_group_size : int, optional
+        Rows per row group. Defaults to PARQUET_ROW_GROUP_SIZES for the table
+        (looked up by file stem), or DEFAULT_PARQUET_ROW_GROUP_SIZE.
+    compression : str
+        Parquet compression codec ('zstd', 'snappy', 'gzip' or 'none').
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    output_dir = Path(file_path)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    full_path = output_dir / file_name
+    if row_group_size is None:
+        row_group_size = PARQUET_ROW_GROUP_SIZES.get(full_path.stem, DEFAULT_PARQUET_ROW_GROUP_SIZE)
+
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        with _atomic_output_path(full_path) as tmp_path:
+            pq.write_table(
+                table,
+                tmp_path,
+                row_group_size=row_group_size,
+                compression=compression,
+                use_dictionary=True,
+            )
+        logger.info(f"Successfully saved DataFrame to '{full_path}'")
+        print(f"Successfully saved DataFrame to '{full_path}'")
+
+    except Exception as e:
+        logger.error(f"Error saving DataFrame to '{file_name}': {e}", exc_info=True)
+        print(f"Error saving DataFrame to '{file_name}': {e}")
+        raise
+
+def save_df_to_arrow(df: pd.DataFrame, file_path: str, file_name: str):
+    """
+    Saves a DataFrame to an uncompressed Arrow IPC (Feather v2) file (requires pyarrow).
+
+    The columns are stored in Arrow's in-memory layout, so
+    `file_load.read_columnar` can memory-map the file and use the buffers
+    without copying or decoding. The file is written atomically.
+    """
+    import pyarrow as pa
+
+    output_dir = Path(file_path)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    full_path = output_dir / file_name
+
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        with _atomic_output_path(full_path) as tmp_path:
+            with pa.OSFile(str(tmp_path), 'wb') as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+        logger.info(f"Successfully saved DataFrame to '{full_path}'")
+        print(f"Successfully saved DataFrame to '{full_path}'")
+
+    except Exception as e:
+        logger.error(f"Error saving DataFrame to '{file_name}': {e}", exc_info=True)
+        print(f"Error saving DataFrame to '{file_name}': {e}")
+        raise
+
+# Output format -> (writer, file extension)
+OUTPUT_WRITERS = {
+    'csv': (save_df_to_csv, '.csv'),
+    'parquet': (save_df_to_parquet, '.parquet'),
+    'arrow': (save_df_to_arrow, '.arrow'),
+}
+
+def save_tables(tables: Dict[str, pd.DataFrame], output_folder: str,
+                formats: Dict[str, Sequence[str]],
+                default_formats: Sequence[str] = ('csv',),
+                max_workers: Optional[int] = None):
+    """
+    Saves several tables concurrently, each in one or more formats.
+
+    Parameters:
+    -----------
+    tables : Dict[str, pd.DataFrame]
+        Table name (used as the file stem, e.g. 'dim_date') -> DataFrame.
+    output_folder : str
+        Folder where the files will be saved.
+    formats : Dict[str, Sequence[str]]
+        Table name -> output formats ('csv', 'parquet', 'arrow').
+    default_formats : Sequence[str]
+        Formats for tables that are not listed in `formats`.
+    max_workers : int, optional
+        Number of writer threads. Defaults to one per file.
+    """
+    jobs = []
+    for table_name, df in tables.items():
+        for output_format in formats.get(table_name, default_formats):
+            if output_format not in OUTPUT_WRITERS:
+                raise ValueError(
+                    f"Unknown output format '{output_format}' for '{table_name}'. "
+                    f"Expected one of {list(OUTPUT_WRITERS)}"
+                )
+            writer, extension = OUTPUT_WRITERS[output_format]
+            jobs.append((writer, df, f"{table_name}{extension}"))
+
+    if not jobs:
+        return
+
+    with ThreadPoolExecutor(max_workers=max_workers or len(jobs), thread_name_prefix="save") as executor:
+        futures = [executor.submit(writer, df, output_folder, file_name) for writer, df, file_name in jobs]
+        # Surface the first error, after every writer has finished
+        for future in futures:
+            future.result()
+
+# Dimension -> key column of the raw extract. The key columns are factorized
+# once per run (factorize_keys), the dimensions and the fact table share the codes.
+DIMENSION_KEYS = {
+    'dim_product': 'PRODUCTCODE',
+    'dim_customer': 'CUSTOMERNAME',
+    'dim_order': 'ORDERNUMBER',
+}
+
+# Rows per block when scanning codes for first occurrences
+FIRST_ROWS_BLOCK_SIZE = 65_536
+
+def factorize_keys(df: pd.DataFrame, key_columns: Iterable[str],
+                   max_workers: Optional[int] = None) -> Dict[str, Tuple[np.ndarray, pd.Index]]:
+    """
+    Factorizes several key columns, each on its own thread.
+
+    Missing keys get a code of their own (like `drop_duplicates`, which
+    keeps one row for them). The result feeds both the dimensions
+    (first_row_positions) and the fact table's foreign keys
+    (resolve_dimension_codes), so each key column is hashed once per run.
+
+    Returns:
+    --------
+    Dict[str, Tuple[np.ndarray, pd.Index]]
+        Key column -> (codes, uniques), uniques in order of first appearance.
+    """
+    key_columns = list(key_columns)
+    if not key_columns:
+        return {}
+    factorize = lambda column: pd.factorize(df[column], use_na_sentinel=False)
+    with ThreadPoolExecutor(max_workers=max_workers or len(key_columns), thread_name_prefix="factorize") as executor:
+        return dict(zip(key_columns, executor.map(factorize, key_columns)))
+
+def first_row_positions(codes: np.ndarray, n_keys: int) -> np.ndarray:
+    """
+    Positions of the first row of each key, from the codes of factorize_keys.
+
+    The codes number the keys in order of first appearance, so a row holds
+    the first occurrence of its key exactly when its code is greater than
+    every code above it. The scan runs block by block and stops once all
+    `n_keys` keys were seen, which for a low-cardinality key (products,
+    customers) is usually within the first block.
+    """
+    positions = []
+    highest = -1
+    for start in range(0, len(codes), FIRST_ROWS_BLOCK_SIZE):
+        block = codes[start:start + FIRST_ROWS_BLOCK_SIZE]
+        # Highest code up to each row, including the earlier blocks
+        running = np.maximum(np.maximum.accumulate(block), highest)
+        is_first = np.empty(len(block), dtype=bool)
+        is_first[0] = block[0] > highest
+        is_first[1:] = block[1:] > running[:-1]
+        positions.append(np.flatnonzero(is_first) + start)
+        highest = running[-1]
+        if highest >= n_keys - 1:
+            break
+    return np.concatenate(positions) if positions else np.empty(0, dtype=np.intp)
+
+def _key_first_rows(key_codes: Optional[Tuple[np.ndarray, pd.Index]]) -> Optional[np.ndarray]:
+    if key_codes is None:
+        return None
+    codes, uniques = key_codes
+    return first_row_positions(codes, len(uniques))
+
 def transform_and_clean(df: pd.DataFrame, columns: List[str], 
                         rename_map: Optional[dict] = None, 
-                        distinct_subset: Optional[List[str]] = None) -> pd.DataFrame:
+                        distinct_subset: Optional[List[str]] = None,
+                        first_rows: Optional[np.ndarray] = None) -> pd.DataFrame:
     """
     A generic function to select, clean, rename, and find distinct rows.
 
@@ -54,19 +289,26 @@ def transform_and_clean(df: pd.DataFrame, columns: List[str],
         A dictionary to rename columns. {'OLD_NAME': 'new_name'}.
     distinct_subset : List[str], optional
         A list of columns to consider for finding unique rows. If None, all columns are used.
+    first_rows : np.ndarray, optional
+        Positions of the first row of each key (see first_row_positions).
+        Skips the search for distinct rows.
 
     Returns:
     --------
     pd.DataFrame
         The transformed DataFrame.
     """
-    # Select the required columns
-    transformed_df = df[columns].copy()
-    
-    # Get distinct rows
-    if distinct_subset:
-        transformed_df.drop_duplicates(subset=distinct_subset, inplace=True)
+    if first_rows is not None:
+        transformed_df = df.iloc[first_rows, df.columns.get_indexer(columns)]
+    elif distinct_subset:
+        # Only the key columns are hashed (categorical codes for the compact
+        # schema) and only the first row of each key is copied, instead of
+        # copying every selected column of the whole extract first
+        first_rows = ~df.duplicated(subset=distinct_subset, keep='first')
+        transformed_df = df.loc[first_rows, columns]
     else:
+        # Select the required columns and get distinct rows
+        transformed_df = df[columns].copy()
         transformed_df.drop_duplicates(inplace=True)
         
     # Rename columns if a map is provided
@@ -76,27 +318,37 @@ def transform_and_clean(df: pd.DataFrame, columns: List[str],
     logger.info(f"Transformation complete. Shape: {transformed_df.shape}")
     return transformed_df
 
-def create_dim_date(df: pd.DataFrame) -> pd.DataFrame:
-    """Creates the Date Dimension DataFrame."""
+def create_dim_date(df: pd.DataFrame, date_cache: Optional[DateKeyCache] = None) -> pd.DataFrame:
+    """
+    Creates the Date Dimension DataFrame.
+
+    Each distinct ORDERDATE string is parsed once through `date_cache`
+    (the shared cache by default), which the fact table reuses.
+    """
     logger.info("Creating Date Dimension...")
+    date_cache = date_cache or get_date_cache()
     
-    date_df = df[['ORDERDATE']].copy()
-    date_df.drop_duplicates(inplace=True)
-    
-    # Convert to datetime objects
-    date_df['order_date'] = pd.to_datetime(date_df['ORDERDATE'])
+    raw_dates = df['ORDERDATE'].drop_duplicates()
+    order_dates, date_keys = date_cache.lookup(raw_dates)
     
     # Create date components
-    date_df['date_key'] = date_df['order_date'].dt.strftime('%Y%m%d').astype(int)
-    date_df['year'] = date_df['order_date'].dt.year
-    date_df['quarter'] = date_df['order_date'].dt.quarter
-    date_df['month'] = date_df['order_date'].dt.month
-    date_df['day'] = date_df['order_date'].dt.day
+    date_df = pd.DataFrame({
+        'date_key': date_keys.to_numpy(),
+        'order_date': order_dates.to_numpy(),
+    })
+    # Different raw strings can fall on the same day (e.g. different times)
+    date_df.drop_duplicates(subset=['date_key'], inplace=True)
+    
+    dates = pd.DatetimeIndex(date_df['order_date'])
+    date_df['year'] = dates.year
+    date_df['quarter'] = dates.quarter
+    date_df['month'] = dates.month
+    date_df['day'] = dates.day
     
-    return date_df[['date_key', 'order_date', 'year', 'quarter', 'month', 'day']]
+    return date_df.reset_index(drop=True)
 
-def create_dim_product(df: pd.DataFrame) -> pd.DataFrame:
-    """Creates the Product Dimension DataFrame."""
+def create_dim_product(df: pd.DataFrame, key_codes: Optional[Tuple[np.ndarray, pd.Index]] = None) -> pd.DataFrame:
+    """Creates the Product Dimension DataFrame (`key_codes`: the PRODUCTCODE entry of factorize_keys)."""
     logger.info("Creating Product Dimension...")
     
     columns = ['PRODUCTCODE', 'PRODUCTLINE', 'MSRP']
@@ -107,10 +359,11 @@ def create_dim_product(df: pd.DataFrame) -> pd.DataFrame:
     }
     # Note: PRODUCT_NAME is in the schema but not in the source CSV.
     # It can be added later if a source is available.
-    return transform_and_clean(df, columns, rename_map, distinct_subset=['PRODUCTCODE'])
+    return transform_and_clean(df, columns, rename_map, distinct_subset=['PRODUCTCODE'],
+                               first_rows=_key_first_rows(key_codes))
 
-def create_dim_customer(df: pd.DataFrame) -> pd.DataFrame:
-    """Creates the Customer Dimension DataFrame."""
+def create_dim_customer(df: pd.DataFrame, key_codes: Optional[Tuple[np.ndarray, pd.Index]] = None) -> pd.DataFrame:
+    """Creates the Customer Dimension DataFrame (`key_codes`: the CUSTOMERNAME entry of factorize_keys)."""
     logger.info("Creating Customer Dimension...")
     
     columns = [
@@ -131,50 +384,208 @@ def create_dim_customer(df: pd.DataFrame) -> pd.DataFrame:
         'COUNTRY': 'country',
         'TERRITORY': 'territory'
     }
-    return transform_and_clean(df, columns, rename_map, distinct_subset=['CUSTOMERNAME'])
+    return transform_and_clean(df, columns, rename_map, distinct_subset=['CUSTOMERNAME'],
+                               first_rows=_key_first_rows(key_codes))
 
-def create_dim_order(df: pd.DataFrame) -> pd.DataFrame:
-    """Creates the Order Dimension DataFrame."""
+def create_dim_order(df: pd.DataFrame, key_codes: Optional[Tuple[np.ndarray, pd.Index]] = None) -> pd.DataFrame:
+    """Creates the Order Dimension DataFrame (`key_codes`: the ORDERNUMBER entry of factorize_keys)."""
     logger.info("Creating Order Dimension...")
     
     columns = ['ORDERNUMBER', 'STATUS']
     rename_map = {'ORDERNUMBER': 'order_number', 'STATUS': 'status'}
-    return transform_and_clean(df, columns, rename_map, distinct_subset=['ORDERNUMBER'])
+    return transform_and_clean(df, columns, rename_map, distinct_subset=['ORDERNUMBER'],
+                               first_rows=_key_first_rows(key_codes))
+
+def resolve_dimension_codes(values: pd.Series, dim_keys: pd.Series,
+                            key_codes: Optional[Tuple[np.ndarray, pd.Index]] = None) -> np.ndarray:
+    """
+    Codes a raw key column against a dimension's key column.
+
+    The raw column is factorized first, so the lookup against the dimension
+    index runs once per distinct value instead of once per row.
+
+    Parameters:
+    -----------
+    values : pd.Series
+        The raw key values (one per fact row).
+    dim_keys : pd.Series
+        The dimension's primary key column. Must be unique.
+    key_codes : Tuple[np.ndarray, pd.Index], optional
+        The factorized `values` (see factorize_keys), so they are not
+        hashed again.
+
+    Returns:
+    --------
+    np.ndarray
+        For each row, the position of its key in `dim_keys`, or -1 if the key
+        is missing from the dimension.
+    """
+    dim_index = pd.Index(dim_keys)
+    if not dim_index.is_unique:
+        raise ValueError(f"Dimension key '{dim_keys.name}' is not unique")
+
+    codes, uniques = key_codes if key_codes is not None else pd.factorize(values)
+    positions = dim_index.get_indexer(uniques)
+    # Missing raw values never match, even with factorize_keys giving them a code
+    positions[np.asarray(uniques.isna())] = -1
+    # Missing raw values (code -1) stay unmatched
+    return np.where(codes >= 0, positions[codes], -1)
+
+def create_fact_sales(df: pd.DataFrame, dim_date_df: pd.DataFrame,
+                      dim_product_df: Optional[pd.DataFrame] = None,
+                      dim_customer_df: Optional[pd.DataFrame] = None,
+                      dim_order_df: Optional[pd.DataFrame] = None,
+                      date_cache: Optional[DateKeyCache] = None,
+                      key_codes: Optional[Dict[str, Tuple[np.ndarray, pd.Index]]] = None) -> pd.DataFrame:
+    """
+    Creates the Sales Fact Table DataFrame.
 
-def create_fact_sales(df: pd.DataFrame, dim_date_df: pd.DataFrame) -> pd.DataFrame:
-    """Creates the Sales Fact Table DataFrame."""
+    Foreign keys are resolved by coding the raw key columns against each
+    dimension's key index; only the nine fact columns are gathered, so no
+    full-width merged copy of `df` is built. Keys that are missing from a
+    dimension are logged, and the counts are stored in
+    `fact_df.attrs['unmatched_keys']`. Dimensions that are not passed are
+    not checked. The date_key comes from the date cache that built
+    `dim_date_df`, so ORDERDATE is not parsed again, and the key columns
+    are not factorized again when their `key_codes` (factorize_keys) are given.
+    """
     logger.info("Creating Sales Fact Table...")
+    date_cache = date_cache or get_date_cache()
     
-    # Merge with date dimension to get the date_key
-    fact_df = pd.merge(
-        df, 
-        dim_date_df[['order_date', 'date_key']], 
-        left_on=pd.to_datetime(df['ORDERDATE']), 
-        right_on='order_date',
-        how='left'
-    )
+    date_keys = date_cache.date_keys(df['ORDERDATE'])
     
-    # Select and rename columns for the fact table
-    columns = [
-        'ORDERNUMBER', 'PRODUCTCODE', 'CUSTOMERNAME', 'date_key',
-        'SALES', 'QUANTITYORDERED', 'PRICEEACH', 'DEALSIZE', 'ORDERLINENUMBER'
-    ]
-    rename_map = {
-        'ORDERNUMBER': 'order_number',
-        'PRODUCTCODE': 'product_code',
-        'CUSTOMERNAME': 'customer_name',
-        'SALES': 'sales',
-        'QUANTITYORDERED': 'quantity_ordered',
-        'PRICEEACH': 'price_each',
-        'DEALSIZE': 'deal_size',
-        'ORDERLINENUMBER': 'order_line_number'
-    }
+    key_codes = key_codes or {}
+    # (dimension name, raw key values, dimension key column, factorized raw keys)
+    lookups = [('date', date_keys, dim_date_df['date_key'], None)]
+    if dim_product_df is not None:
+        lookups.append(('product', df['PRODUCTCODE'], dim_product_df['product_code'],
+                        key_codes.get('PRODUCTCODE')))
+    if dim_customer_df is not None:
+        lookups.append(('customer', df['CUSTOMERNAME'], dim_customer_df['customer_name'],
+                        key_codes.get('CUSTOMERNAME')))
+    if dim_order_df is not None:
+        lookups.append(('order', df['ORDERNUMBER'], dim_order_df['order_number'],
+                        key_codes.get('ORDERNUMBER')))
+    
+    unmatched_keys = {}
+    for dimension, values, dim_keys, codes in lookups:
+        unmatched = resolve_dimension_codes(values, dim_keys, codes) < 0
+        unmatched_keys[dimension] = int(unmatched.sum())
+        if unmatched_keys[dimension]:
+            examples = pd.unique(values[unmatched])[:5].tolist()
+            logger.warning(
+                f"{unmatched_keys[dimension]} fact rows have no match in the {dimension} dimension "
+                f"(e.g. {examples})"
+            )
     
-    final_fact_df = fact_df[columns].copy()
-    final_fact_df.rename(columns=rename_map, inplace=True)
+    # Gather only the fact columns (.values keeps the compact dtypes, e.g. categoricals)
+    final_fact_df = pd.DataFrame({
+        'order_number': df['ORDERNUMBER'].values,
+        'product_code': df['PRODUCTCODE'].values,
+        'customer_name': df['CUSTOMERNAME'].values,
+        'date_key': date_keys.values,
+        'sales': df['SALES'].values,
+        'quantity_ordered': df['QUANTITYORDERED'].values,
+        'price_each': df['PRICEEACH'].values,
+        'deal_size': df['DEALSIZE'].values,
+        'order_line_number': df['ORDERLINENUMBER'].values,
+    })
+    final_fact_df.attrs['unmatched_keys'] = unmatched_keys
     
     # sales_id is a serial key, so we don't generate it here.
     # The database will handle it upon insertion.
     
     logger.info(f"Sales Fact Table created. Shape: {final_fact_df.shape}")
-    return final_fact_df
\ No newline at end of file
+    return final_fact_df
+
+# --------------------------------------------------------------------------
+# Streaming (chunk-aware) builders
+# --------------------------------------------------------------------------
+def _filter_unseen(df: pd.DataFrame, key_column: str, seen_keys: Set) -> pd.DataFrame:
+    """
+    Keeps the rows of `df` whose `key_column` value has not been seen before
+    and records the new keys in `seen_keys` (modified in place).
+    """
+    if seen_keys:
+        df = df[~df[key_column].isin(seen_keys)]
+    seen_keys.update(df[key_column].tolist())
+    return df
+
+def create_dim_date_chunk(chunk: pd.DataFrame, seen_keys: Set[int]) -> pd.DataFrame:
+    """Creates the Date Dimension rows of a chunk that were not emitted by earlier chunks."""
+    return _filter_unseen(create_dim_date(chunk), 'date_key', seen_keys)
+
+def create_dim_product_chunk(chunk: pd.DataFrame, seen_keys: Set[str],
+                             key_codes: Optional[Tuple[np.ndarray, pd.Index]] = None) -> pd.DataFrame:
+    """Creates the Product Dimension rows of a chunk that were not emitted by earlier chunks."""
+    return _filter_unseen(create_dim_product(chunk, key_codes), 'product_code', seen_keys)
+
+def create_dim_customer_chunk(chunk: pd.DataFrame, seen_keys: Set[str],
+                              key_codes: Optional[Tuple[np.ndarray, pd.Index]] = None) -> pd.DataFrame:
+    """Creates the Customer Dimension rows of a chunk that were not emitted by earlier chunks."""
+    return _filter_unseen(create_dim_customer(chunk, key_codes), 'customer_name', seen_keys)
+
+def create_dim_order_chunk(chunk: pd.DataFrame, seen_keys: Set[int],
+                           key_codes: Optional[Tuple[np.ndarray, pd.Index]] = None) -> pd.DataFrame:
+    """Creates the Order Dimension rows of a chunk that were not emitted by earlier chunks."""
+    return _filter_unseen(create_dim_order(chunk, key_codes), 'order_number', seen_keys)
+
+def create_fact_sales_chunk(chunk: pd.DataFrame,
+                            key_codes: Optional[Dict[str, Tuple[np.ndarray, pd.Index]]] = None) -> pd.DataFrame:
+    """
+    Creates the Sales Fact rows of a chunk.
+
+    The date_key lookup only needs the dates present in the chunk itself,
+    so no state is carried over between chunks.
+    """
+    return create_fact_sales(chunk, create_dim_date(chunk), key_codes=key_codes)
+
+class StreamingStarSchemaBuilder:
+    """
+    Builds the star schema from a stream of raw DataFrame chunks.
+
+    The builder keeps the set of dimension keys already emitted so that each
+    dimension row is produced exactly once across the whole stream (first
+    occurrence wins, matching `drop_duplicates` in the in-memory builders).
+    Fact rows are emitted chunk by chunk. Memory is bounded by the chunk size
+    plus the number of distinct dimension keys, not by the size of the file.
+    """
+
+    def __init__(self):
+        self.seen_dates: Set[int] = set()
+        self.seen_products: Set[str] = set()
+        self.seen_customers: Set[str] = set()
+        self.seen_orders: Set[int] = set()
+        self.rows_processed = 0
+        self.chunks_processed = 0
+
+    def process_chunk(self, chunk: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+        """
+        Transforms one raw chunk.
+
+        Returns:
+        --------
+        Dict[str, pd.DataFrame]
+            The new rows of each table, keyed by table name
+            ('dim_date', 'dim_product', 'dim_customer', 'dim_order', 'fact_sales').
+        """
+        key_codes = factorize_keys(chunk, DIMENSION_KEYS.values())
+        tables = {
+            'dim_date': create_dim_date_chunk(chunk, self.seen_dates),
+            'dim_product': create_dim_product_chunk(chunk, self.seen_products, key_codes['PRODUCTCODE']),
+            'dim_customer': create_dim_customer_chunk(chunk, self.seen_customers, key_codes['CUSTOMERNAME']),
+            'dim_order': create_dim_order_chunk(chunk, self.seen_orders, key_codes['ORDERNUMBER']),
+            'fact_sales': create_fact_sales_chunk(chunk, key_codes),
+        }
+        self.rows_processed += len(chunk)
+        self.chunks_processed += 1
+        logger.info(
+            f"Processed chunk {self.chunks_processed} ({len(chunk)} rows, "
+            f"{self.rows_processed} total)"
+        )
+        return tables
+
+    def stream(self, chunks: Iterable[pd.DataFrame]) -> Iterator[Dict[str, pd.DataFrame]]:
+        """Lazily applies `process_chunk` to every chunk of `chunks`."""
+        for chunk in chunks:
+            yield self.process_chunk(chunk)
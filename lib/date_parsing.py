@@ -0,0 +1,155 @@
+import logging
+import threading
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Format of ORDERDATE in the sales extract, e.g. '2/24/2003 0:00'
+ORDERDATE_FORMAT = '%m/%d/%Y %H:%M'
+
+
+def date_keys_from_datetimes(dates: pd.DatetimeIndex) -> np.ndarray:
+    """
+    Computes YYYYMMDD integer keys arithmetically (no string round trip).
+
+    Parameters:
+    -----------
+    dates : pd.DatetimeIndex
+        The dates to convert. NaT is not allowed.
+
+    Returns:
+    --------
+    np.ndarray
+        int64 array of date keys, e.g. 20030224.
+    """
+    return (dates.year.to_numpy(dtype=np.int64) * 10000
+            + dates.month.to_numpy(dtype=np.int64) * 100
+            + dates.day.to_numpy(dtype=np.int64))
+
+def format_iso_dates(values: pd.Series) -> pd.Series:
+    """
+    Formats dates as 'YYYY-MM-DD' strings, formatting each distinct value once.
+    Missing values become None.
+    """
+    codes, uniques = pd.factorize(values)
+    formatted = pd.to_datetime(uniques).strftime('%Y-%m-%d').to_numpy(dtype=object)
+    result = np.empty(len(codes), dtype=object)
+    valid = codes >= 0
+    result[valid] = formatted[codes[valid]]
+    result[~valid] = None
+    return pd.Series(result, index=values.index, name=values.name)
+
+
+def parse_order_dates(values, date_format: Optional[str] = ORDERDATE_FORMAT,
+                      errors: str = 'raise') -> pd.DatetimeIndex:
+    """
+    Parses raw ORDERDATE strings: with the explicit format first, then the
+    values that don't match it one by one with an inferred format, so an
+    extract mixing two formats parses. Validation and DateKeyCache both
+    use it, so a row that passes validation always parses in the transform.
+
+    Parameters:
+    -----------
+    values : array-like
+        The raw strings.
+    date_format : str, optional
+        strptime format tried first. If None, every value's format is inferred.
+    errors : str
+        'raise' raises a ValueError naming unparseable values, 'coerce'
+        returns NaT for them.
+    """
+    values = pd.Index(values, dtype=object)
+    parsed = pd.DatetimeIndex(pd.to_datetime(values, format=date_format or 'mixed', errors='coerce'))
+    unmatched = parsed.isna() & values.notna()
+    if date_format and unmatched.any():
+        logger.warning(
+            f"{int(unmatched.sum())} ORDERDATE values do not match '{date_format}', inferring their format instead."
+        )
+        parsed = parsed.where(~unmatched, pd.to_datetime(values, format='mixed', errors='coerce'))
+        unmatched = parsed.isna() & values.notna()
+    if errors == 'raise' and unmatched.any():
+        raise ValueError(f"Unparseable ORDERDATE values: {values[unmatched][:5].tolist()}")
+    return parsed
+
+
+class DateKeyCache:
+    """
+    Parses raw ORDERDATE strings into dates and date keys, once per distinct string.
+
+    Every string seen so far is kept with its parsed date and YYYYMMDD key, so
+    the date dimension, the fact table and later chunks of the same extract
+    all reuse the same parse. Parsing is O(distinct dates) instead of
+    O(rows) per call.
+    """
+
+    def __init__(self, date_format: Optional[str] = ORDERDATE_FORMAT):
+        """
+        Parameters:
+        -----------
+        date_format : str, optional
+            strptime format of the raw strings. The format of the strings that
+            don't match it (of every string if it is None) is inferred by
+            pandas instead, see parse_order_dates.
+        """
+        self.date_format = date_format
+        self._dates: Dict[str, pd.Timestamp] = {}
+        self._keys: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _parse(self, raw_values: np.ndarray) -> pd.DatetimeIndex:
+        """Parses distinct strings with the explicit format, falling back to inference per value."""
+        return parse_order_dates(raw_values, self.date_format)
+
+    def _update(self, uniques: np.ndarray):
+        """Parses the values of `uniques` that are not cached yet."""
+        missing = [value for value in uniques if value not in self._keys]
+        if not missing:
+            return
+
+        parsed = self._parse(np.asarray(missing, dtype=object))
+        keys = date_keys_from_datetimes(parsed)
+        with self._lock:
+            self._dates.update(zip(missing, parsed))
+            self._keys.update(zip(missing, keys.tolist()))
+
+    def lookup(self, raw_dates: pd.Series) -> Tuple[pd.Series, pd.Series]:
+        """
+        Resolves a column of raw ORDERDATE strings.
+
+        Returns:
+        --------
+        Tuple[pd.Series, pd.Series]
+            (dates as datetime64, date keys as int64), aligned with `raw_dates`.
+        """
+        codes, uniques = pd.factorize(raw_dates)
+        if (codes < 0).any():
+            raise ValueError(f"{raw_dates.name} contains {(codes < 0).sum()} missing values")
+
+        uniques = np.asarray(uniques, dtype=object)
+        self._update(uniques)
+
+        unique_dates = pd.DatetimeIndex([self._dates[value] for value in uniques])
+        unique_keys = np.fromiter((self._keys[value] for value in uniques), dtype=np.int64, count=len(uniques))
+
+        dates = pd.Series(unique_dates.take(codes), index=raw_dates.index, name='order_date')
+        keys = pd.Series(unique_keys[codes], index=raw_dates.index, name='date_key')
+        return dates, keys
+
+    def date_keys(self, raw_dates: pd.Series) -> pd.Series:
+        """Resolves a column of raw ORDERDATE strings to int64 date keys."""
+        return self.lookup(raw_dates)[1]
+
+
+# Shared cache so the date dimension, the fact table and every chunk of a
+# streamed extract parse each distinct ORDERDATE string only once.
+_default_cache = DateKeyCache()
+
+def get_date_cache() -> DateKeyCache:
+    """Returns the process-wide DateKeyCache."""
+    return _default_cache
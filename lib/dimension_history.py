@@ -0,0 +1,298 @@
+import logging
+import os
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Dimension (output name) -> (history table, business key). Every other
+# column of the dimension is a tracked attribute: a change in any of them
+# closes the current version and opens a new one (see
+# scripts/Dimension_History_Tables.sql).
+HISTORY_TABLES: Dict[str, Tuple[str, str]] = {
+    'dim_product': ('cg_dim_product_history', 'product_code'),
+    'dim_customer': ('cg_dim_customer_history', 'customer_name'),
+}
+
+HASH_COLUMN = 'attr_hash'
+KEY_HASH_COLUMN = '_key_hash'
+VALID_FROM_COLUMN = 'valid_from'
+VALID_TO_COLUMN = 'valid_to'
+CURRENT_COLUMN = 'is_current'
+
+# Hash of a missing attribute value
+MISSING_HASH = np.uint64(0)
+
+# Keys per PATCH request when current versions are expired over PostgREST
+EXPIRE_BATCH_SIZE = 200
+
+
+@dataclass
+class HistoryDelta:
+    """The changes that bring one history table in line with the incoming dimension."""
+    table_name: str
+    key_column: str
+    inserts: pd.DataFrame
+    expired_keys: pd.DataFrame
+    state: pd.DataFrame
+    valid_from: str
+    inserted: int = 0
+    changed: int = 0
+
+    def summary(self) -> str:
+        return (
+            f"'{self.table_name}': {self.inserted} new, {self.changed} changed, "
+            f"{len(self.state) - self.inserted - self.changed} unchanged or absent"
+        )
+
+
+# --------------------------------------------------------------------------
+# Attribute hashing
+# --------------------------------------------------------------------------
+def value_hashes(values: pd.Series) -> np.ndarray:
+    """
+    64-bit hash of every value of a column. The column is factorized and only
+    its distinct values are hashed, as text, so a categorical, a string and
+    an object column holding the same values hash alike.
+    """
+    codes, uniques = pd.factorize(values)
+    hashes = pd.util.hash_array(np.asarray(uniques.astype(str), dtype=object), categorize=False)
+    # Missing values (code -1) take the last slot
+    return np.append(hashes, MISSING_HASH)[codes]
+
+def attribute_hashes(df: pd.DataFrame, columns: Sequence[str]) -> np.ndarray:
+    """
+    64-bit hash of the tracked attributes of every row: the value_hashes of
+    each column, combined row-wise.
+
+    Returns:
+        A uint64 array aligned with the rows of `df`.
+    """
+    column_hashes = pd.DataFrame({column: value_hashes(df[column]) for column in columns})
+    return pd.util.hash_pandas_object(column_hashes, index=False).to_numpy()
+
+
+# --------------------------------------------------------------------------
+# Snapshots of the current versions
+# --------------------------------------------------------------------------
+def _state_path(state_dir: str, table_name: str) -> Path:
+    return Path(state_dir) / f"{table_name}.csv"
+
+def _pending_path(state_dir: str, table_name: str) -> Path:
+    return Path(state_dir) / f"{table_name}.pending"
+
+def load_state(state_dir: str, table_name: str) -> pd.DataFrame:
+    """
+    Loads the snapshot of the current versions as of the last successful
+    run: the hash of every key and of its current attributes. Empty when the
+    table was never loaded.
+    """
+    state_path = _state_path(state_dir, table_name)
+    if not state_path.exists():
+        return pd.DataFrame({
+            KEY_HASH_COLUMN: pd.Series(dtype='uint64'),
+            HASH_COLUMN: pd.Series(dtype='uint64'),
+        })
+    return pd.read_csv(state_path, dtype={KEY_HASH_COLUMN: 'uint64', HASH_COLUMN: 'uint64'})
+
+def save_state(state: pd.DataFrame, state_dir: str, table_name: str):
+    """Writes a snapshot atomically (temp file, then rename)."""
+    output_dir = Path(state_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    state_path = _state_path(state_dir, table_name)
+    tmp_path = state_path.with_suffix('.csv.tmp')
+    state.to_csv(tmp_path, index=False, encoding='utf-8')
+    os.replace(tmp_path, state_path)
+
+def _mark_pending(deltas: Sequence[HistoryDelta], state_dir: str):
+    """
+    Records that the deltas are being applied. If the run fails before the
+    snapshots are saved, the next run also expires the current version of
+    the new keys, which may have been inserted by the failed run.
+    """
+    Path(state_dir).mkdir(parents=True, exist_ok=True)
+    for delta in deltas:
+        _pending_path(state_dir, delta.table_name).write_text(delta.valid_from, encoding='utf-8')
+
+def _commit(deltas: Sequence[HistoryDelta], state_dir: str):
+    for delta in deltas:
+        save_state(delta.state, state_dir, delta.table_name)
+        _pending_path(state_dir, delta.table_name).unlink(missing_ok=True)
+
+
+# --------------------------------------------------------------------------
+# Diffing
+# --------------------------------------------------------------------------
+def plan_history(dim_df: pd.DataFrame, table_name: str, key_column: str, state_dir: str,
+                 valid_from: Optional[str] = None) -> HistoryDelta:
+    """
+    Compares a freshly built dimension with the current versions of the
+    last successful run, vectorized over the whole frame: the key hashes
+    are looked up in the snapshot in one pass and the attribute hashes are
+    compared as arrays. Only the distinct values of each column are hashed.
+
+    Keys that are absent from the dimension are left as they are (an
+    extract only holds the customers and products it mentions).
+
+    Args:
+        dim_df: The dimension, one row per key.
+        table_name: The history table.
+        key_column: The business key of the dimension.
+        state_dir: Folder holding the snapshots.
+        valid_from: Start of the new versions (ISO 8601). Defaults to now (UTC).
+
+    Returns:
+        A HistoryDelta with the new versions to insert, the keys whose
+        current version must be expired, and the snapshot after the delta.
+    """
+    valid_from = valid_from or datetime.now(timezone.utc).isoformat()
+    dim_df = dim_df[dim_df[key_column].notna()]
+    attributes = [column for column in dim_df.columns if column != key_column]
+    key_hashes = value_hashes(dim_df[key_column])
+    hashes = attribute_hashes(dim_df, attributes)
+
+    state = load_state(state_dir, table_name)
+    positions = pd.Index(state[KEY_HASH_COLUMN]).get_indexer(key_hashes)
+    is_new = positions < 0
+    previous_hashes = state[HASH_COLUMN].to_numpy()
+    changed = ~is_new
+    if len(state):
+        changed &= previous_hashes[np.maximum(positions, 0)] != hashes
+    versioned = is_new | changed
+
+    inserts = dim_df[versioned].reset_index(drop=True)
+    inserts[HASH_COLUMN] = hashes[versioned].view(np.int64)  # BIGINT is signed
+    inserts[VALID_FROM_COLUMN] = valid_from
+    inserts[VALID_TO_COLUMN] = None
+    inserts[CURRENT_COLUMN] = True
+
+    recovering = _pending_path(state_dir, table_name).exists()
+    if recovering:
+        logger.warning(f"The last history load of '{table_name}' did not finish, "
+                       f"expiring the current version of every key that gets a new one.")
+    expired_keys = dim_df.loc[versioned if recovering else changed, [key_column]].reset_index(drop=True)
+
+    next_state = state.copy()
+    changed_positions = positions[changed]
+    next_state.iloc[changed_positions, next_state.columns.get_loc(HASH_COLUMN)] = hashes[changed]
+    next_state = pd.concat([next_state, pd.DataFrame({
+        KEY_HASH_COLUMN: key_hashes[is_new],
+        HASH_COLUMN: hashes[is_new],
+    })], ignore_index=True)
+
+    return HistoryDelta(table_name, key_column, inserts, expired_keys, next_state, valid_from,
+                        inserted=int(is_new.sum()), changed=int(changed.sum()))
+
+def plan_dimension_history(tables: Dict[str, pd.DataFrame], state_dir: str) -> List[HistoryDelta]:
+    """Plans the history of every dimension of HISTORY_TABLES, with one valid_from for the run."""
+    valid_from = datetime.now(timezone.utc).isoformat()
+    deltas = []
+    for output_name, (table_name, key_column) in HISTORY_TABLES.items():
+        delta = plan_history(tables[output_name], table_name, key_column, state_dir, valid_from)
+        logger.info(f"History plan for {delta.summary()}")
+        deltas.append(delta)
+    return deltas
+
+
+# --------------------------------------------------------------------------
+# Applying the deltas
+# --------------------------------------------------------------------------
+def expire_current(session, table_name: str, key_column: str, keys: pd.DataFrame, valid_to: str) -> bool:
+    """
+    Closes the current version of the given keys (valid_to, is_current = false),
+    EXPIRE_BATCH_SIZE keys per PATCH request.
+    """
+    from lib.incremental_sync import _format_filter_value
+
+    values = keys[key_column].tolist()
+    for start in range(0, len(values), EXPIRE_BATCH_SIZE):
+        batch = ",".join(_format_filter_value(v) for v in values[start:start + EXPIRE_BATCH_SIZE])
+        response = session.patch(
+            f"/{table_name}",
+            params={key_column: f"in.({batch})", CURRENT_COLUMN: "is.true"},
+            json={VALID_TO_COLUMN: valid_to, CURRENT_COLUMN: False},
+            headers={"Prefer": "return=minimal"},
+        )
+        if response.status_code >= 400:
+            logger.error(
+                f"Expiring versions failed for '{table_name}' with HTTP {response.status_code}: "
+                f"{response.text[:500]}"
+            )
+            return False
+    return True
+
+def apply_history(uploader, deltas: Sequence[HistoryDelta], state_dir: str) -> bool:
+    """
+    Applies the deltas over PostgREST: the changed keys' current versions
+    are expired, then the new versions are upserted on (key, valid_from), so
+    a retried batch does not duplicate them. The snapshots only advance once
+    every table is done.
+
+    Args:
+        uploader: The shared ConcurrentUploader (its session is used for the PATCH requests).
+        deltas: The output of plan_dimension_history.
+        state_dir: Folder holding the snapshots.
+
+    Returns:
+        True if every delta was applied, False otherwise.
+    """
+    _mark_pending(deltas, state_dir)
+    for delta in deltas:
+        if not expire_current(uploader.session, delta.table_name, delta.key_column,
+                              delta.expired_keys, delta.valid_from):
+            return False
+        if not delta.inserts.empty and not uploader.upload(
+                delta.inserts, delta.table_name, on_conflict=f"{delta.key_column},{VALID_FROM_COLUMN}"):
+            return False
+    _commit(deltas, state_dir)
+    logger.info(f"Dimension history applied. Snapshots saved to '{state_dir}'.")
+    return True
+
+def apply_history_postgres(deltas: Sequence[HistoryDelta], state_dir: str, dsn: Optional[str] = None) -> bool:
+    """
+    Applies the deltas in one Postgres transaction: the expired keys are
+    copied into a temporary table and their current versions closed with a
+    single UPDATE ... FROM, then the new versions are loaded with COPY.
+    """
+    from psycopg import sql
+
+    from lib.postgres_copy import copy_df, get_postgres_connection
+
+    _mark_pending(deltas, state_dir)
+    try:
+        with get_postgres_connection(dsn) as conn:
+            with conn.transaction(), conn.cursor() as cursor:
+                for delta in deltas:
+                    if not delta.expired_keys.empty:
+                        expired_table = f"_expired_{delta.table_name}"
+                        cursor.execute(sql.SQL("CREATE TEMP TABLE {} ({} TEXT) ON COMMIT DROP").format(
+                            sql.Identifier(expired_table), sql.Identifier(delta.key_column)
+                        ))
+                        copy_df(cursor, delta.expired_keys, expired_table)
+                        cursor.execute(
+                            sql.SQL(
+                                "UPDATE {table} AS h SET {valid_to} = %s, {current} = FALSE "
+                                "FROM {expired} AS e WHERE h.{key} = e.{key} AND h.{current}"
+                            ).format(
+                                table=sql.Identifier(delta.table_name),
+                                valid_to=sql.Identifier(VALID_TO_COLUMN),
+                                current=sql.Identifier(CURRENT_COLUMN),
+                                expired=sql.Identifier(expired_table),
+                                key=sql.Identifier(delta.key_column),
+                            ),
+                            (delta.valid_from,)
+                        )
+                    copy_df(cursor, delta.inserts, delta.table_name)
+
+    except Exception as e:
+        logger.error(f"Dimension history load failed, transaction rolled back: {e}", exc_info=True)
+        return False
+
+    _commit(deltas, state_dir)
+    logger.info(f"Dimension history loaded into Postgres. Snapshots saved to '{state_dir}'.")
+    return True
@@ -1,8 +1,30 @@
 import pandas as pd
+import io
+import mmap
 import os
+import re
 import glob
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Iterator, List, Sequence, Tuple
+
+# Dates embedded in drop file names, e.g. 'sales_2024-05-31.csv' or 'sales_20240531.csv'
+FILE_DATE_PATTERN = re.compile(r'(\d{4})-?(\d{2})-?(\d{2})')
+
+# read_csv keyword arguments `read_csv_parallel` understands, any other one
+# falls back to a plain pd.read_csv
+PARALLEL_CSV_KWARGS = {'encoding', 'dtype', 'usecols', 'sep', 'delimiter'}
+
+# Strings pd.read_csv reads as missing by default, used by the Arrow reader too
+PANDAS_NA_VALUES = [
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+    '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null',
+]
+
+# Without pyarrow, files are split into byte ranges of at least this size
+MIN_RANGE_BYTES = 16 * 1024**2
 
 def read_latest_csv(folder_path: str,
                    file_name: Optional[str] = None,
@@ -33,41 +55,72 @@ def read_latest_csv(folder_path: str,
         If the specified file_name doesn't exist or folder path is invalid
     """
 
-    # Convert to Path object for better path handling
-    folder_path = Path(folder_path)
+    try:
+        csv_file = resolve_csv_file(folder_path, file_name)
 
-    # Check if folder exists
-    if not folder_path.exists():
-        raise ValueError(f"Folder path '{folder_path}' does not exist")
+        # Read the CSV file into DataFrame
+        df = pd.read_csv(csv_file, **csv_kwargs)
 
-    if not folder_path.is_dir():
-        raise ValueError(f"'{folder_path}' is not a directory")
+        print(f"Successfully loaded data from '{csv_file.name}'")
+        print(f"DataFrame shape: {df.shape}")
+        print(f"Columns: {list(df.columns)}")
 
-    try:
-        if file_name:
-            # If specific file name is provided
-            file_path = folder_path / file_name
-            if not file_path.exists():
-                raise ValueError(f"File '{file_name}' not found in '{folder_path}'")
+        return df
 
-            # Check if it's a CSV file
-            if not file_path.suffix.lower() == '.csv':
-                raise ValueError(f"'{file_name}' is not a CSV file")
+    except Exception as e:
+        print(f"Error reading CSV file: {str(e)}")
+        raise
 
-            csv_file = file_path
-        else:
-            # Find all CSV files in the folder
-            csv_files = list(folder_path.glob('*.csv'))
+def read_csv_parallel(folder_path: str,
+                      file_name: Optional[str] = None,
+                      max_workers: Optional[int] = None,
+                      **csv_kwargs: Any) -> pd.DataFrame:
+    """
+    Read the latest CSV file from a given folder on every core.
 
-            if not csv_files:
-                raise FileNotFoundError(f"No CSV files found in '{folder_path}'")
+    Same arguments and result as `read_latest_csv`. With pyarrow, the file is
+    parsed by Arrow's multithreaded CSV reader straight into typed column
+    buffers (categoricals as dictionary arrays) and converted to pandas once.
+    Without pyarrow, the memory-mapped file is split into newline-aligned
+    byte ranges that are parsed in `max_workers` processes and concatenated.
+    Both assume that no quoted value contains a line break, which holds for
+    the sales extracts.
 
-            # Get the latest file based on modification time
-            csv_file = max(csv_files, key=lambda x: x.stat().st_mtime)
-            print(f"Reading latest CSV file: {csv_file.name}")
+    Only `encoding`, `dtype`, `usecols` and `sep`/`delimiter` are supported;
+    other `csv_kwargs` fall back to `read_latest_csv`. Categories are sorted
+    like pd.read_csv sorts them, so both readers return the same DataFrame.
 
-        # Read the CSV file into DataFrame
-        df = pd.read_csv(csv_file, **csv_kwargs)
+    Parameters:
+    -----------
+    folder_path : str
+        Relative or absolute path to the folder containing CSV files
+    file_name : str, optional
+        Specific file name to read. If None, reads the latest CSV file in the folder
+    max_workers : int, optional
+        Number of worker processes without pyarrow. Defaults to the number
+        of CPUs. Arrow uses its own thread pool (pyarrow.set_cpu_count).
+    **csv_kwargs : Any
+        Additional keyword arguments, see above
+
+    Returns:
+    --------
+    pd.DataFrame
+        DataFrame containing the data from the CSV file
+    """
+    unsupported = set(csv_kwargs) - PARALLEL_CSV_KWARGS
+    if unsupported:
+        print(f"Parallel CSV reader does not support {sorted(unsupported)}, using pd.read_csv")
+        return read_latest_csv(folder_path, file_name, **csv_kwargs)
+
+    try:
+        csv_file = resolve_csv_file(folder_path, file_name)
+        try:
+            import pyarrow.csv  # noqa: F401
+        except ImportError:
+            df = _read_csv_ranges(csv_file, max_workers, csv_kwargs)
+        else:
+            df = _read_csv_arrow(csv_file, csv_kwargs)
+        df = _sort_categories(df)
 
         print(f"Successfully loaded data from '{csv_file.name}'")
         print(f"DataFrame shape: {df.shape}")
@@ -79,6 +132,474 @@ def read_latest_csv(folder_path: str,
         print(f"Error reading CSV file: {str(e)}")
         raise
 
+def _arrow_column_type(dtype):
+    """Arrow type read for a pandas dtype: dictionary for categoricals, else the numpy type."""
+    import numpy as np
+    import pyarrow as pa
+
+    if isinstance(dtype, pd.CategoricalDtype) or dtype == 'category':
+        return pa.dictionary(pa.int32(), pa.string())
+    if dtype in (str, object, 'str', 'object', 'string'):
+        return pa.string()
+    return pa.from_numpy_dtype(np.dtype(dtype))
+
+def _read_csv_arrow(csv_file: Path, csv_kwargs: Dict[str, Any]) -> pd.DataFrame:
+    """Parses a file with Arrow's multithreaded CSV reader."""
+    import pyarrow.csv as pa_csv
+
+    dtype = csv_kwargs.get('dtype') or {}
+    usecols = csv_kwargs.get('usecols')
+    read_options = pa_csv.ReadOptions(use_threads=True, encoding=csv_kwargs.get('encoding') or 'utf8')
+    parse_options = pa_csv.ParseOptions(delimiter=csv_kwargs.get('sep') or csv_kwargs.get('delimiter') or ',')
+    convert_options = pa_csv.ConvertOptions(
+        column_types={column: _arrow_column_type(column_dtype) for column, column_dtype in dtype.items()},
+        include_columns=list(usecols) if usecols is not None else None,
+        null_values=PANDAS_NA_VALUES,
+        strings_can_be_null=True,
+    )
+    table = pa_csv.read_csv(csv_file, read_options=read_options, parse_options=parse_options,
+                            convert_options=convert_options)
+    return table.to_pandas()
+
+def _newline_aligned_ranges(csv_file: Path, parts: int) -> Tuple[int, List[Tuple[int, int]]]:
+    """
+    Returns (end of the header line, [(start, end), ...]): `parts` byte
+    ranges of the data rows, each ending right after a newline.
+    """
+    with open(csv_file, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        size = len(mm)
+        header_end = mm.find(b'\n') + 1 or size
+        bounds = [header_end]
+        for part in range(1, parts):
+            target = max(header_end + (size - header_end) * part // parts, bounds[-1])
+            newline = mm.find(b'\n', target)
+            if newline == -1:
+                break
+            bounds.append(newline + 1)
+        bounds.append(size)
+    ranges = [(start, end) for start, end in zip(bounds, bounds[1:]) if end > start]
+    return header_end, ranges
+
+def _read_csv_range(csv_file: Path, header_end: int, start: int, end: int,
+                    csv_kwargs: Dict[str, Any]) -> pd.DataFrame:
+    """Parses the header plus one byte range. Module level so it can run in a worker process."""
+    with open(csv_file, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        data = mm[:header_end] + mm[start:end]
+    return pd.read_csv(io.BytesIO(data), **csv_kwargs)
+
+def _read_csv_ranges(csv_file: Path, max_workers: Optional[int], csv_kwargs: Dict[str, Any]) -> pd.DataFrame:
+    """Parses a file in newline-aligned byte ranges, one worker process per range."""
+    max_workers = max_workers or os.cpu_count() or 1
+    parts = min(max_workers, max(1, csv_file.stat().st_size // MIN_RANGE_BYTES))
+    if parts == 1:
+        return pd.read_csv(csv_file, **csv_kwargs)
+
+    header_end, ranges = _newline_aligned_ranges(csv_file, parts)
+    with ProcessPoolExecutor(max_workers=len(ranges)) as executor:
+        futures = [executor.submit(_read_csv_range, csv_file, header_end, start, end, csv_kwargs)
+                   for start, end in ranges]
+        frames = [future.result() for future in futures]
+    return concat_with_consistent_dtypes(frames)
+
+def _sort_categories(df: pd.DataFrame) -> pd.DataFrame:
+    """Sorts the categories of every categorical column, as pd.read_csv infers them."""
+    for column in df.columns:
+        if isinstance(df[column].dtype, pd.CategoricalDtype):
+            categories = df[column].cat.categories
+            if not categories.is_monotonic_increasing:
+                df[column] = df[column].cat.reorder_categories(categories.sort_values())
+    return df
+
+def read_csv_in_chunks(folder_path: str,
+                       file_name: Optional[str] = None,
+                       chunksize: int = 100_000,
+                       **csv_kwargs: Any) -> Iterator[pd.DataFrame]:
+    """
+    Stream the latest CSV file from a given folder as a sequence of DataFrames.
+
+    Only one chunk is held in memory at a time, so peak memory is bounded by
+    `chunksize` rather than by the size of the file.
+
+    Parameters:
+    -----------
+    folder_path : str
+        Relative or absolute path to the folder containing CSV files
+    file_name : str, optional
+        Specific file name to read. If None, reads the latest CSV file in the folder
+    chunksize : int
+        Number of rows per yielded DataFrame
+    **csv_kwargs : Any
+        Additional keyword arguments to pass to pd.read_csv()
+
+    Yields:
+    -------
+    pd.DataFrame
+        Consecutive chunks of the CSV file
+
+    Raises:
+    -------
+    FileNotFoundError
+        If no CSV files are found in the specified folder
+    ValueError
+        If the specified file_name doesn't exist, the folder path is invalid
+        or chunksize is not positive
+    """
+    if chunksize <= 0:
+        raise ValueError(f"chunksize must be a positive integer, got {chunksize}")
+
+    csv_file = resolve_csv_file(folder_path, file_name)
+    print(f"Streaming '{csv_file.name}' in chunks of {chunksize} rows")
+
+    total_rows = 0
+    with pd.read_csv(csv_file, chunksize=chunksize, **csv_kwargs) as reader:
+        for chunk in reader:
+            total_rows += len(chunk)
+            yield chunk
+
+    print(f"Finished streaming '{csv_file.name}': {total_rows} rows")
+
+def resolve_csv_file(folder_path: str, file_name: Optional[str] = None) -> Path:
+    """
+    Resolve the CSV file to read: either `file_name` inside `folder_path`,
+    or the most recently modified CSV file in the folder.
+    """
+    # Convert to Path object for better path handling
+    folder_path = Path(folder_path)
+
+    # Check if folder exists
+    if not folder_path.exists():
+        raise ValueError(f"Folder path '{folder_path}' does not exist")
+
+    if not folder_path.is_dir():
+        raise ValueError(f"'{folder_path}' is not a directory")
+
+    if file_name:
+        # If specific file name is provided
+        file_path = folder_path / file_name
+        if not file_path.exists():
+            raise ValueError(f"File '{file_name}' not found in '{folder_path}'")
+
+        # Check if it's a CSV file
+        if not file_path.suffix.lower() == '.csv':
+            raise ValueError(f"'{file_name}' is not a CSV file")
+
+        return file_path
+
+    # Find all CSV files in the folder
+    csv_files = list(folder_path.glob('*.csv'))
+
+    if not csv_files:
+        raise FileNotFoundError(f"No CSV files found in '{folder_path}'")
+
+    # Get the latest file based on modification time
+    csv_file = max(csv_files, key=lambda x: x.stat().st_mtime)
+    print(f"Reading latest CSV file: {csv_file.name}")
+    return csv_file
+
+def read_columnar(folder_path: str,
+                  file_name: str,
+                  columns: Optional[List[str]] = None,
+                  as_arrow: bool = False):
+    """
+    Read a table written by `data_transform.save_df_to_parquet` or
+    `data_transform.save_df_to_arrow` (requires pyarrow).
+
+    Arrow IPC files ('.arrow' / '.feather') are memory-mapped and read
+    without copying: the returned Arrow table points straight into the
+    mapped file. Parquet files are memory-mapped and decoded with pyarrow's
+    multithreaded reader. The dtypes stored in the file (including
+    categoricals) are restored, nothing is re-inferred.
+
+    Parameters:
+    -----------
+    folder_path : str
+        Folder containing the file
+    file_name : str
+        Name of the file, e.g. 'fact_sales.parquet' or 'fact_sales.arrow'
+    columns : List[str], optional
+        Only read these columns
+    as_arrow : bool
+        Return the pyarrow.Table instead of converting it to pandas. Use this
+        to keep the zero-copy view of an Arrow IPC file.
+
+    Returns:
+    --------
+    pd.DataFrame or pyarrow.Table
+        The table
+
+    Raises:
+    -------
+    ValueError
+        If the file doesn't exist or has an unsupported extension
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    file_path = Path(folder_path) / file_name
+    if not file_path.exists():
+        raise ValueError(f"File '{file_name}' not found in '{folder_path}'")
+
+    suffix = file_path.suffix.lower()
+    if suffix == '.parquet':
+        table = pq.read_table(file_path, columns=columns, memory_map=True)
+    elif suffix in ('.arrow', '.feather'):
+        source = pa.memory_map(str(file_path), 'r')
+        table = pa.ipc.open_file(source).read_all()
+        if columns is not None:
+            table = table.select(columns)
+    else:
+        raise ValueError(f"'{file_name}' is not a Parquet or Arrow file")
+
+    print(f"Successfully loaded data from '{file_path.name}'")
+    print(f"Table shape: ({table.num_rows}, {table.num_columns})")
+
+    if as_arrow:
+        return table
+    return table.to_pandas()
+
+def file_date(file_path: Path) -> date:
+    """
+    Date of a drop file: the first YYYY-MM-DD / YYYYMMDD date in its name,
+    or its modification date if the name has none.
+    """
+    match = FILE_DATE_PATTERN.search(file_path.name)
+    if match:
+        try:
+            return date(*(int(part) for part in match.groups()))
+        except ValueError:
+            pass
+    return datetime.fromtimestamp(file_path.stat().st_mtime).date()
+
+def select_csv_files(folder_path: str,
+                     pattern: str = '*.csv',
+                     start_date: Optional[date] = None,
+                     end_date: Optional[date] = None,
+                     ledger: Optional['IngestionLedger'] = None) -> List[Path]:
+    """
+    Select the CSV files of a multi-file ingestion.
+
+    Parameters:
+    -----------
+    folder_path : str
+        Folder containing the CSV files
+    pattern : str
+        Glob pattern relative to the folder, e.g. 'sales_2024-05-*.csv'
+    start_date, end_date : date, optional
+        Only keep files whose `file_date` falls in this range (inclusive)
+    ledger : IngestionLedger, optional
+        Skip files the ledger has already recorded ("all since last run")
+
+    Returns:
+    --------
+    List[Path]
+        The selected files, oldest first
+
+    Raises:
+    -------
+    ValueError
+        If the folder path is invalid
+    """
+    folder_path = Path(folder_path)
+    if not folder_path.is_dir():
+        raise ValueError(f"Folder path '{folder_path}' does not exist or is not a directory")
+
+    files = [f for f in folder_path.glob(pattern) if f.is_file() and f.suffix.lower() == '.csv']
+    if start_date is not None:
+        files = [f for f in files if file_date(f) >= start_date]
+    if end_date is not None:
+        files = [f for f in files if file_date(f) <= end_date]
+
+    skipped = 0
+    if ledger is not None:
+        new_files = ledger.filter_new(files)
+        skipped = len(files) - len(new_files)
+        files = new_files
+
+    files.sort(key=lambda f: (file_date(f), f.name))
+    print(f"Selected {len(files)} CSV file(s) in '{folder_path}' ({skipped} already ingested)")
+    return files
+
+def _read_csv_file(file_path: Path, csv_kwargs: Dict[str, Any]) -> pd.DataFrame:
+    """Reads one file. Module level so it can run in a worker process."""
+    return pd.read_csv(file_path, **csv_kwargs)
+
+def iter_csv_files(files: Sequence[Path],
+                   max_workers: Optional[int] = None,
+                   **csv_kwargs: Any) -> Iterator[Tuple[Path, pd.DataFrame]]:
+    """
+    Read several CSV files in parallel worker processes and yield them in
+    the order of `files`.
+
+    At most `max_workers` files are being read (or waiting to be consumed)
+    at any time, so the transform stage can consume the files as they
+    arrive without the whole backfill being held in memory.
+
+    Parameters:
+    -----------
+    files : Sequence[Path]
+        The files to read, e.g. from `select_csv_files`
+    max_workers : int, optional
+        Number of worker processes. Defaults to the number of CPUs.
+    **csv_kwargs : Any
+        Additional keyword arguments to pass to pd.read_csv()
+
+    Yields:
+    -------
+    Tuple[Path, pd.DataFrame]
+        Each file with its data
+    """
+    files = [Path(f) for f in files]
+    if not files:
+        return
+    max_workers = min(max_workers or os.cpu_count() or 1, len(files))
+
+    # A single file doesn't pay for a process pool
+    if max_workers == 1:
+        for file_path in files:
+            yield file_path, _read_csv_file(file_path, csv_kwargs)
+        return
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        pending = deque()
+        remaining = iter(files)
+        for file_path in remaining:
+            pending.append((file_path, executor.submit(_read_csv_file, file_path, csv_kwargs)))
+            if len(pending) >= max_workers:
+                break
+        while pending:
+            file_path, future = pending.popleft()
+            df = future.result()
+            next_file = next(remaining, None)
+            if next_file is not None:
+                pending.append((next_file, executor.submit(_read_csv_file, next_file, csv_kwargs)))
+            yield file_path, df
+
+def concat_with_consistent_dtypes(frames: Sequence[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Concatenate DataFrames read from different files.
+
+    pd.concat turns a categorical column into object when the frames have
+    different categories, which is the normal case for files read
+    separately. The categories are unified first so categoricals survive.
+    """
+    frames = list(frames)
+    if not frames:
+        return pd.DataFrame()
+    if len(frames) == 1:
+        return frames[0]
+
+    first = frames[0]
+    categorical = [column for column in first.columns
+                   if isinstance(first[column].dtype, pd.CategoricalDtype)]
+    unified = {}
+    for column in categorical:
+        categories = pd.Index([])
+        for df in frames:
+            categories = categories.union(df[column].cat.categories, sort=False)
+        unified[column] = pd.CategoricalDtype(categories)
+
+    if unified:
+        frames = [df.astype(unified) for df in frames]
+    return pd.concat(frames, ignore_index=True)
+
+def read_csv_files(files: Sequence[Path],
+                   max_workers: Optional[int] = None,
+                   **csv_kwargs: Any) -> pd.DataFrame:
+    """
+    Read several CSV files in parallel worker processes into one DataFrame.
+
+    Parameters:
+    -----------
+    files : Sequence[Path]
+        The files to read, e.g. from `select_csv_files`
+    max_workers : int, optional
+        Number of worker processes. Defaults to the number of CPUs.
+    **csv_kwargs : Any
+        Additional keyword arguments to pass to pd.read_csv(). Pass
+        `dtype=schema.SALES_EXTRACT_DTYPES` so every file gets the same dtypes.
+
+    Returns:
+    --------
+    pd.DataFrame
+        The rows of all files, in the order of `files`. `df.attrs['rows_per_file']`
+        holds the row count of every file.
+
+    Raises:
+    -------
+    FileNotFoundError
+        If `files` is empty
+    """
+    if not files:
+        raise FileNotFoundError("No CSV files to read")
+
+    frames = []
+    rows_per_file = {}
+    for file_path, df in iter_csv_files(files, max_workers=max_workers, **csv_kwargs):
+        print(f"Loaded '{file_path.name}': {len(df)} rows")
+        frames.append(df)
+        rows_per_file[file_path.name] = len(df)
+
+    df = concat_with_consistent_dtypes(frames)
+    # Row count per file, for IngestionLedger.record
+    df.attrs['rows_per_file'] = rows_per_file
+    print(f"Successfully loaded {len(frames)} file(s)")
+    print(f"DataFrame shape: {df.shape}")
+    return df
+
+
+class IngestionLedger:
+    """
+    Record of the files that have already been ingested, kept as a CSV file.
+
+    A file is identified by its name, size and modification time, so a file
+    that is dropped again with new content is ingested again.
+    """
+
+    COLUMNS = ['file_name', 'size', 'mtime_ns', 'rows', 'ingested_at']
+
+    def __init__(self, ledger_path: str):
+        self.ledger_path = Path(ledger_path)
+        if self.ledger_path.exists():
+            self.entries = pd.read_csv(self.ledger_path, dtype={'file_name': str})
+        else:
+            self.entries = pd.DataFrame(columns=self.COLUMNS)
+
+    @staticmethod
+    def _identity(file_path: Path) -> Tuple[str, int, int]:
+        stat = file_path.stat()
+        return file_path.name, int(stat.st_size), int(stat.st_mtime_ns)
+
+    def filter_new(self, files: Sequence[Path]) -> List[Path]:
+        """Returns the files that are not in the ledger."""
+        ingested = set(zip(self.entries['file_name'],
+                           self.entries['size'].astype('int64'),
+                           self.entries['mtime_ns'].astype('int64')))
+        return [Path(f) for f in files if self._identity(Path(f)) not in ingested]
+
+    def record(self, files: Sequence[Path], rows: Optional[Dict[str, int]] = None):
+        """
+        Adds `files` to the ledger and saves it. Call this only after the
+        run that ingested them has succeeded.
+        """
+        if not files:
+            return
+        rows = rows or {}
+        ingested_at = datetime.now().isoformat(timespec='seconds')
+        new_entries = pd.DataFrame(
+            [(*self._identity(Path(f)), rows.get(Path(f).name), ingested_at) for f in files],
+            columns=self.COLUMNS
+        )
+        entries = new_entries if self.entries.empty else pd.concat([self.entries, new_entries], ignore_index=True)
+        self.entries = entries.drop_duplicates(subset=['file_name', 'size', 'mtime_ns'], keep='last')
+
+        # Write to a temporary file first so a crash never leaves a truncated ledger
+        self.ledger_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.ledger_path.with_suffix('.csv.tmp')
+        self.entries.to_csv(tmp_path, index=False, encoding='utf-8')
+        os.replace(tmp_path, self.ledger_path)
+        print(f"Recorded {len(files)} ingested file(s) in '{self.ledger_path}'")
+
+
 def list_csv_files(folder_path: str) -> list:
     """
     List all CSV files in a given folder with their modification times.
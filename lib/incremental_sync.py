@@ -0,0 +1,285 @@
+import logging
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import httpx
+import numpy as np
+import pandas as pd
+
+from lib.concurrent_upload import ConcurrentUploader
+
+logger = logging.getLogger(__name__)
+
+# Natural key of every table in the star schema. The fact table's key needs
+# the unique constraint from scripts/Incremental_Sync_Constraints.sql.
+TABLE_KEYS: Dict[str, List[str]] = {
+    'cg_dim_date': ['date_key'],
+    'cg_dim_product': ['product_code'],
+    'cg_dim_customer': ['customer_name'],
+    'cg_dim_order': ['order_number'],
+    'cg_fact_sales': ['order_number', 'order_line_number'],
+    # Rollups: their grain (see lib/rollups.py and scripts/Rollup_Tables.sql)
+    'cg_rollup_sales_daily': ['date_key', 'product_line', 'country', 'territory', 'deal_size'],
+    'cg_rollup_sales_monthly': ['year', 'month', 'product_line', 'country', 'territory', 'deal_size'],
+    'cg_rollup_sales_quarterly': ['year', 'quarter', 'product_line', 'country', 'territory', 'deal_size'],
+    'cg_rollup_sales_yearly': ['year', 'product_line', 'country', 'territory', 'deal_size'],
+}
+
+KEY_HASH_COLUMN = '_key_hash'
+ROW_HASH_COLUMN = '_row_hash'
+
+# Keys per DELETE request, keeps the filter in the query string short
+DELETE_BATCH_SIZE = 200
+
+
+@dataclass
+class SyncPlan:
+    """The changes needed to bring one remote table in line with a DataFrame."""
+    table_name: str
+    key_columns: List[str]
+    upserts: pd.DataFrame
+    deleted_keys: pd.DataFrame
+    manifest: pd.DataFrame
+    full_refresh: bool
+    inserted: int = 0
+    changed: int = 0
+    # Rows of the DataFrame whose key was not in the previous manifest
+    new_rows: Optional[np.ndarray] = None
+
+    @property
+    def deleted(self) -> int:
+        return len(self.deleted_keys)
+
+    def summary(self) -> str:
+        if self.full_refresh:
+            return f"'{self.table_name}': no manifest, full refresh of {len(self.upserts)} rows"
+        return (
+            f"'{self.table_name}': {self.inserted} inserted, {self.changed} changed, "
+            f"{self.deleted} deleted, {len(self.manifest) - self.inserted - self.changed} unchanged"
+        )
+
+
+# --------------------------------------------------------------------------
+# Row hashing and manifests
+# --------------------------------------------------------------------------
+def compute_row_hashes(df: pd.DataFrame, key_columns: Sequence[str]) -> pd.DataFrame:
+    """
+    Computes a 64-bit hash of each row's key and of its full content.
+
+    Hashes are taken column by column straight from the arrays of `df`, no
+    JSON-ready copy of the table is made for them.
+
+    Returns:
+        A DataFrame with the key columns plus `_key_hash` and `_row_hash`,
+        aligned with the rows of `df`.
+    """
+    key_columns = list(key_columns)
+    hashes = df[key_columns].copy()
+    hashes[KEY_HASH_COLUMN] = pd.util.hash_pandas_object(df[key_columns], index=False).to_numpy()
+    hashes[ROW_HASH_COLUMN] = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    return hashes
+
+def load_manifest(manifest_dir: str, table_name: str) -> Optional[pd.DataFrame]:
+    """Loads the hash manifest of the last successful sync, or None if there is none."""
+    manifest_path = Path(manifest_dir) / f"{table_name}.csv"
+    if not manifest_path.exists():
+        return None
+    return pd.read_csv(
+        manifest_path,
+        dtype={KEY_HASH_COLUMN: 'uint64', ROW_HASH_COLUMN: 'uint64'},
+        keep_default_na=False
+    )
+
+def save_manifest(manifest: pd.DataFrame, manifest_dir: str, table_name: str):
+    """Writes a manifest atomically (temp file, then rename)."""
+    output_dir = Path(manifest_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = output_dir / f"{table_name}.csv"
+    tmp_path = manifest_path.with_suffix('.csv.tmp')
+    manifest.to_csv(tmp_path, index=False, encoding='utf-8')
+    os.replace(tmp_path, manifest_path)
+
+
+# --------------------------------------------------------------------------
+# Diffing
+# --------------------------------------------------------------------------
+def plan_table_sync(df: pd.DataFrame, table_name: str, manifest_dir: str,
+                    additive: bool = False) -> SyncPlan:
+    """
+    Diffs a DataFrame against the manifest of the last successful sync.
+
+    Args:
+        df: The freshly transformed table.
+        table_name: The destination table, must be one of TABLE_KEYS.
+        manifest_dir: Folder holding the manifests.
+        additive: The DataFrame only holds a new drop of data (multi-file
+            ingestion, daemon mode). Keys absent from it are kept, not
+            deleted, and the new manifest is the previous one plus the drop.
+
+    Returns:
+        A SyncPlan with the rows to upsert and the keys to delete. Without a
+        previous manifest the plan is a full refresh of the table (in
+        additive mode, an upsert of every row).
+
+    Raises:
+        ValueError: If several rows of `df` share a natural key.
+    """
+    if table_name not in TABLE_KEYS:
+        raise ValueError(f"No natural key defined for table '{table_name}'")
+
+    key_columns = TABLE_KEYS[table_name]
+    manifest = compute_row_hashes(df, key_columns)
+    # One upsert statement cannot update the same row twice, a duplicated key
+    # would fail the whole batch on the server
+    duplicated = manifest[KEY_HASH_COLUMN].duplicated(keep=False).to_numpy()
+    if duplicated.any():
+        examples = manifest.loc[duplicated, key_columns].drop_duplicates().head(5)
+        raise ValueError(
+            f"'{table_name}' has {int(duplicated.sum())} rows sharing a natural key "
+            f"({', '.join(key_columns)}), e.g. {examples.to_dict('records')}. "
+            f"Remove the duplicates from the extract before syncing."
+        )
+    previous = load_manifest(manifest_dir, table_name)
+
+    if previous is None:
+        if not additive:
+            return SyncPlan(table_name, key_columns, upserts=df, deleted_keys=manifest.iloc[0:0][key_columns],
+                            manifest=manifest, full_refresh=True, inserted=len(df),
+                            new_rows=np.ones(len(df), dtype=bool))
+        previous = manifest.iloc[0:0]
+
+    current_rows = pd.MultiIndex.from_arrays([manifest[KEY_HASH_COLUMN], manifest[ROW_HASH_COLUMN]])
+    previous_rows = pd.MultiIndex.from_arrays([previous[KEY_HASH_COLUMN], previous[ROW_HASH_COLUMN]])
+
+    upsert_mask = ~current_rows.isin(previous_rows)
+    new_key_mask = ~manifest[KEY_HASH_COLUMN].isin(previous[KEY_HASH_COLUMN]).to_numpy()
+    deleted_mask = ~previous[KEY_HASH_COLUMN].isin(manifest[KEY_HASH_COLUMN]).to_numpy()
+    if additive:
+        # The absent keys belong to earlier drops and stay in the manifest
+        manifest = pd.concat([previous[deleted_mask], manifest], ignore_index=True)
+        deleted_mask[:] = False
+
+    inserted = int(new_key_mask.sum())
+    return SyncPlan(
+        table_name,
+        key_columns,
+        upserts=df[upsert_mask],
+        deleted_keys=previous.loc[deleted_mask, key_columns],
+        manifest=manifest,
+        full_refresh=False,
+        inserted=inserted,
+        changed=int(upsert_mask.sum()) - inserted,
+        new_rows=new_key_mask,
+    )
+
+
+# --------------------------------------------------------------------------
+# Applying a plan
+# --------------------------------------------------------------------------
+def _format_filter_value(value) -> str:
+    """Formats a key value for a PostgREST filter, quoting strings."""
+    if isinstance(value, str):
+        escaped = value.replace('\\', '\\\\').replace('"', '\\"')
+        return f'"{escaped}"'
+    return str(value)
+
+def _delete_filter_params(keys: pd.DataFrame, key_columns: Sequence[str]) -> Dict[str, str]:
+    """Builds the query parameters selecting exactly the given keys."""
+    if len(key_columns) == 1:
+        column = key_columns[0]
+        values = ",".join(_format_filter_value(v) for v in keys[column].tolist())
+        return {column: f"in.({values})"}
+
+    # Composite key: or=(and(a.eq.1,b.eq.2),and(...))
+    conditions = []
+    for row in keys.itertuples(index=False):
+        parts = ",".join(
+            f"{column}.eq.{_format_filter_value(value)}"
+            for column, value in zip(key_columns, row)
+        )
+        conditions.append(f"and({parts})")
+    return {"or": f"({','.join(conditions)})"}
+
+def delete_keys(session: httpx.Client, table_name: str, keys: pd.DataFrame,
+                key_columns: Sequence[str]) -> bool:
+    """
+    Deletes the rows with the given keys, DELETE_BATCH_SIZE keys per request.
+    The deleted rows are not returned over the wire.
+    """
+    for start in range(0, len(keys), DELETE_BATCH_SIZE):
+        batch = keys.iloc[start:start + DELETE_BATCH_SIZE]
+        response = session.delete(
+            f"/{table_name}",
+            params=_delete_filter_params(batch, key_columns),
+            headers={"Prefer": "return=minimal"},
+        )
+        if response.status_code >= 400:
+            logger.error(
+                f"Delete failed for '{table_name}' with HTTP {response.status_code}: {response.text[:500]}"
+            )
+            return False
+    return True
+
+def clear_table(session: httpx.Client, table_name: str) -> bool:
+    """Deletes every row of a table without returning them."""
+    key_column = TABLE_KEYS[table_name][0]
+    response = session.delete(
+        f"/{table_name}",
+        params={key_column: "not.is.null"},
+        headers={"Prefer": "return=minimal"},
+    )
+    if response.status_code >= 400:
+        logger.error(f"Could not clear '{table_name}': HTTP {response.status_code}: {response.text[:500]}")
+        return False
+    return True
+
+def sync_star_schema(uploader: ConcurrentUploader,
+                     tables: Sequence[Tuple[str, pd.DataFrame]],
+                     manifest_dir: str, additive: bool = False) -> bool:
+    """
+    Synchronizes the star schema incrementally.
+
+    `tables` must be in foreign key order (dimensions first, fact table last).
+    Deletes run in reverse order and upserts in forward order, so no row ever
+    references a missing parent. Manifests are only written once every table
+    has been synchronized, so a failed run is retried in full on the next run.
+
+    Args:
+        uploader: The shared ConcurrentUploader (its session is used for deletes).
+        tables: (table_name, DataFrame) pairs in foreign key order.
+        manifest_dir: Folder holding the manifests of the last successful run.
+        additive: The tables only hold a new drop of data: nothing is cleared
+            or deleted, see plan_table_sync.
+
+    Returns:
+        True if every table was synchronized, False otherwise.
+    """
+    plans = [plan_table_sync(df, table_name, manifest_dir, additive) for table_name, df in tables]
+    for plan in plans:
+        logger.info(f"Sync plan for {plan.summary()}")
+
+    # 1. Deletes, children before parents
+    for plan in reversed(plans):
+        if plan.full_refresh:
+            success = clear_table(uploader.session, plan.table_name)
+        else:
+            success = delete_keys(uploader.session, plan.table_name, plan.deleted_keys, plan.key_columns)
+        if not success:
+            return False
+
+    # 2. Upserts, parents before children
+    for plan in plans:
+        if plan.upserts.empty:
+            continue
+        on_conflict = None if plan.full_refresh else ",".join(plan.key_columns)
+        if not uploader.upload(plan.upserts, plan.table_name, on_conflict=on_conflict):
+            return False
+
+    # 3. Only a fully successful run becomes the new baseline
+    for plan in plans:
+        save_manifest(plan.manifest, manifest_dir, plan.table_name)
+
+    logger.info(f"Incremental sync complete. Manifests saved to '{manifest_dir}'.")
+    return True
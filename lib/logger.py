@@ -1,8 +1,221 @@
+import atexit
+import functools
+import json
 import logging
+import logging.handlers
 import os
+import queue
+import sys
+import threading
+import time
+import tracemalloc
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    import psutil
+except ImportError:  # psutil is optional, fall back to the resource module
+    psutil = None
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+# --------------------------------------------------------------------------
+# Asynchronous logging
+# --------------------------------------------------------------------------
+# Pass as `extra=PROGRESS` on per-batch/per-chunk lines, so they are rate-limited
+# in async mode:  logger.info("Uploading batch %d", n, extra=PROGRESS)
+PROGRESS = {'progress': True}
+
+def progress(kind: str) -> Dict[str, Any]:
+    """
+    Like PROGRESS, for lines rate-limited separately per `kind`, e.g. one
+    "Uploading batch" line per table:  extra=progress(table_name)
+    """
+    return {'progress': kind}
+
+# Set while the current thread is inside a logging call of LoggerWriter or
+# handles records on the listener thread. print() output produced there goes
+# to the original stdout instead of back into the logger.
+_in_logging = threading.local()
+
+class BufferedFileHandler(logging.FileHandler):
+    """
+    FileHandler that does not flush after every record. The file is flushed
+    at most every `flush_interval` seconds, for records at WARNING or above,
+    and on close.
+    """
+
+    def __init__(self, filename, mode: str = 'a', encoding: Optional[str] = None,
+                 flush_interval: float = 1.0, buffer_size: int = 256 * 1024):
+        self.flush_interval = flush_interval
+        self.buffer_size = buffer_size
+        self._last_flush = time.monotonic()
+        super().__init__(filename, mode=mode, encoding=encoding)
+
+    def _open(self):
+        return open(self.baseFilename, self.mode, buffering=self.buffer_size, encoding=self.encoding)
+
+    def emit(self, record: logging.LogRecord):
+        if self.stream is None:
+            self.stream = self._open()
+        try:
+            self.stream.write(self.format(record) + self.terminator)
+        except Exception:
+            self.handleError(record)
+            return
+        now = time.monotonic()
+        if record.levelno >= logging.WARNING or now - self._last_flush >= self.flush_interval:
+            self.flush()
+            self._last_flush = now
+
+class ProgressRateLimitFilter(logging.Filter):
+    """
+    Drops progress records (logged with `extra=PROGRESS` or `progress(kind)`)
+    that come less than `interval` seconds after the last one of the same
+    message template, logger and kind, e.g. one "Uploading batch %d ..."
+    line per table every few seconds instead of one per batch. The number of dropped lines is appended to the next
+    line that gets through. Other records always pass.
+    """
+
+    def __init__(self, interval: float = 5.0):
+        super().__init__()
+        self.interval = interval
+        self._last: Dict[tuple, float] = {}
+        self._suppressed: Dict[tuple, int] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not getattr(record, 'progress', False):
+            return True
+        key = (record.name, record.msg, record.progress)
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last.get(key, float('-inf')) < self.interval:
+                self._suppressed[key] = self._suppressed.get(key, 0) + 1
+                return False
+            self._last[key] = now
+            suppressed = self._suppressed.pop(key, 0)
+        if suppressed:
+            record.msg = f"{record.msg} (+{suppressed} similar lines suppressed)"
+        return True
+
+class AsyncQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that hands the record over as is: the message is %-formatted
+    by the listener thread, not by the logging call.
+
+    In a forked child process (e.g. a worker of a process pool) the listener
+    thread does not exist, so records are handled synchronously there.
+    """
+
+    def __init__(self, log_queue: queue.Queue, listener: logging.handlers.QueueListener):
+        super().__init__(log_queue)
+        self.listener = listener
+        self._pid = os.getpid()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def emit(self, record: logging.LogRecord):
+        if os.getpid() != self._pid:
+            self.listener.handle(record)
+            # The child may exit without closing the handlers
+            for handler in self.listener.handlers:
+                handler.flush()
+        else:
+            super().emit(record)
+
+class CaptureSafeQueueListener(logging.handlers.QueueListener):
+    """QueueListener whose handlers' own print() output bypasses LoggerWriter."""
+
+    def handle(self, record: logging.LogRecord):
+        _in_logging.active = True
+        try:
+            super().handle(record)
+        finally:
+            _in_logging.active = False
+
+class LoggerWriter:
+    """
+    File-like object that sends every line written to it to a logger (used to
+    capture print()). Text written from inside logging itself (a handler or
+    filter that prints) goes to `stream`, the original stdout, so it cannot
+    feed back into the logger.
+    """
+
+    def __init__(self, logger: logging.Logger, level: int = logging.INFO, stream=None):
+        self.logger = logger
+        self.level = level
+        self.stream = stream if stream is not None else sys.__stdout__
+        self._buffer = ''
+        self._lock = threading.Lock()
+
+    def _log(self, line: str):
+        _in_logging.active = True
+        try:
+            self.logger.log(self.level, line)
+        finally:
+            _in_logging.active = False
+
+    def write(self, text: str) -> int:
+        if getattr(_in_logging, 'active', False):
+            return self.stream.write(text)
+        with self._lock:
+            self._buffer += text
+            *lines, self._buffer = self._buffer.split('\n')
+        for line in lines:
+            if line:
+                self._log(line)
+        return len(text)
+
+    def flush(self):
+        if getattr(_in_logging, 'active', False):
+            self.stream.flush()
+            return
+        with self._lock:
+            line, self._buffer = self._buffer, ''
+        if line:
+            self._log(line)
+
+    def isatty(self) -> bool:
+        return False
+
+# Listeners started by CustomLogger in async mode, stopped by shutdown_logging()
+_active_loggers: List["CustomLogger"] = []
+
+def shutdown_logging():
+    """
+    Stops the background logging threads: the queued records are written,
+    the log files flushed and closed, and print() goes to stdout again.
+    """
+    while _active_loggers:
+        _active_loggers[-1].stop()
+
+atexit.register(shutdown_logging)
+
+def _flush_before_fork():
+    """
+    Flushes the log files of the running listeners before os.fork(), so a
+    forked child does not inherit, and write again, their unflushed buffers.
+    """
+    for custom_logger in list(_active_loggers):
+        listener = custom_logger.listener
+        if listener is None:
+            continue
+        for handler in listener.handlers:
+            # Not while the listener thread is in the middle of a write
+            handler.acquire()
+            try:
+                handler.flush()
+            finally:
+                handler.release()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(before=_flush_before_fork)
 
 class CustomLogger:
     """
@@ -12,7 +225,10 @@ class CustomLogger:
     def __init__(self, 
                  logger_name: str = "AppLogger",
                  log_folder: str = "logs",
-                 log_level: int = logging.INFO):
+                 log_level: int = logging.INFO,
+                 async_mode: bool = False,
+                 capture_prints: bool = False,
+                 progress_interval: Optional[float] = 5.0):
         """
         Initialize the custom logger.
         
@@ -24,11 +240,30 @@ class CustomLogger:
             Folder where log files will be stored
         log_level : int
             Logging level (DEBUG, INFO, WARNING, ERROR, CRITICAL)
+        async_mode : bool
+            Write the log file and the console from a background thread
+            (QueueHandler/QueueListener). Logging calls only enqueue the
+            record; formatting and buffered file writes happen on the
+            listener thread. The library loggers (root handlers) are routed
+            through the same queue. Call `stop()` or `shutdown_logging()` at
+            the end of the run.
+        capture_prints : bool
+            In async mode, redirect print() (sys.stdout) to the 'stdout' logger.
+        progress_interval : float, optional
+            In async mode, minimum seconds between two progress lines
+            (`extra=PROGRESS`) of the same kind. None disables the limit.
         """
         self.logger_name = logger_name
         self.log_folder = Path(log_folder)
         self.log_level = log_level
+        self.async_mode = async_mode
+        self.capture_prints = capture_prints
+        self.progress_interval = progress_interval
         self.logger = None
+        self.log_filepath = None
+        self.listener: Optional[logging.handlers.QueueListener] = None
+        self._queue_handler: Optional[AsyncQueueHandler] = None
+        self._stdout = None
         
         # Create the logger
         self._setup_logger()
@@ -73,24 +308,72 @@ class CustomLogger:
         # Create file handler
         log_filename = self._generate_log_filename()
         log_filepath = self.log_folder / log_filename
+        self.log_filepath = log_filepath
         
-        file_handler = logging.FileHandler(log_filepath, mode='w', encoding='utf-8')
+        if self.async_mode:
+            file_handler = BufferedFileHandler(log_filepath, mode='w', encoding='utf-8')
+        else:
+            file_handler = logging.FileHandler(log_filepath, mode='w', encoding='utf-8')
         file_handler.setLevel(self.log_level)
         file_handler.setFormatter(detailed_formatter)
         
-        # Create console handler
-        console_handler = logging.StreamHandler()
+        # Create console handler, bound to the real stderr: never to a captured
+        # sys.stdout, which would feed the log lines back into the logger
+        console_handler = logging.StreamHandler(sys.stderr)
         console_handler.setLevel(self.log_level)
         console_handler.setFormatter(console_formatter)
         
         # Add handlers to logger
-        self.logger.addHandler(file_handler)
-        self.logger.addHandler(console_handler)
+        if self.async_mode:
+            self._start_listener(file_handler, console_handler)
+        else:
+            self.logger.addHandler(file_handler)
+            self.logger.addHandler(console_handler)
         
         # Log the initialization
         self.logger.info(f"Logger initialized - Log file: {log_filepath}")
         self.logger.info(f"Log level set to: {logging.getLevelName(self.log_level)}")
     
+    def _start_listener(self, *handlers: logging.Handler):
+        """Moves `handlers` to a background QueueListener and routes the app and root loggers to it."""
+        log_queue: queue.Queue = queue.Queue(-1)
+        self.listener = CaptureSafeQueueListener(log_queue, *handlers, respect_handler_level=True)
+        self._queue_handler = AsyncQueueHandler(log_queue, self.listener)
+        if self.progress_interval:
+            self._queue_handler.addFilter(ProgressRateLimitFilter(self.progress_interval))
+
+        # The app logger would otherwise reach the queue twice, through the root logger
+        self.logger.addHandler(self._queue_handler)
+        self.logger.propagate = False
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(self._queue_handler)
+
+        self.listener.start()
+        _active_loggers.append(self)
+
+        if self.capture_prints:
+            self._stdout = sys.stdout
+            sys.stdout = LoggerWriter(logging.getLogger('stdout'), stream=self._stdout)
+
+    def stop(self):
+        """Stops the background listener (async mode): drains the queue and closes the handlers."""
+        if self in _active_loggers:
+            _active_loggers.remove(self)
+        if self._stdout is not None:
+            sys.stdout.flush()
+            sys.stdout = self._stdout
+            self._stdout = None
+        if self.listener is None:
+            return
+        self.listener.stop()
+        for handler in self.listener.handlers:
+            handler.close()
+        logging.getLogger().removeHandler(self._queue_handler)
+        self.logger.removeHandler(self._queue_handler)
+        self.listener = None
+
     def get_logger(self) -> logging.Logger:
         """Return the configured logger instance."""
         return self.logger
@@ -112,10 +395,46 @@ class CustomLogger:
         self.logger.info(f"{df_name} shape: {df.shape}")
         self.logger.info(f"{df_name} columns: {list(df.columns)}")
         self.logger.info(f"{df_name} memory usage: {df.memory_usage(deep=True).sum() / 1024**2:.2f} MB")
+    
+    def log_memory_report(self, df, df_name: str = "DataFrame", baseline_bytes: Optional[int] = None):
+        """Log DataFrame memory usage per dtype, compared to a baseline if given."""
+        log_memory_report(self.logger, df, df_name, baseline_bytes)
+
+def log_memory_report(logger: logging.Logger, df, df_name: str = "DataFrame",
+                      baseline_bytes: Optional[int] = None):
+    """
+    Log the memory usage of a DataFrame, broken down by dtype.
+    
+    Parameters:
+    -----------
+    logger : logging.Logger
+        Logger to write to
+    df : pd.DataFrame
+        The DataFrame to measure
+    df_name : str
+        Name used in the log lines
+    baseline_bytes : int, optional
+        Memory usage to compare against (e.g. the same data with default dtypes)
+    """
+    usage = df.memory_usage(deep=True, index=False)
+    total_bytes = int(usage.sum()) + int(df.index.memory_usage())
+    
+    by_dtype = usage.groupby(df.dtypes.astype(str)).sum().sort_values(ascending=False)
+    breakdown = ", ".join(f"{dtype}: {size / 1024**2:.2f} MB" for dtype, size in by_dtype.items())
+    
+    logger.info(f"{df_name} memory usage: {total_bytes / 1024**2:.2f} MB ({breakdown})")
+    if baseline_bytes:
+        logger.info(
+            f"{df_name} memory before/after: {baseline_bytes / 1024**2:.2f} MB -> "
+            f"{total_bytes / 1024**2:.2f} MB ({baseline_bytes / max(total_bytes, 1):.1f}x smaller)"
+        )
 
 def setup_logger(logger_name: str = "AppLogger", 
                 log_folder: str = "logs", 
-                log_level: int = logging.INFO) -> logging.Logger:
+                log_level: int = logging.INFO,
+                async_mode: bool = False,
+                capture_prints: bool = False,
+                progress_interval: Optional[float] = 5.0) -> logging.Logger:
     """
     Convenience function to set up and return a logger.
     
@@ -127,15 +446,265 @@ def setup_logger(logger_name: str = "AppLogger",
         Folder where log files will be stored
     log_level : int
         Logging level
+    async_mode, capture_prints, progress_interval
+        See CustomLogger
     
     Returns:
     --------
     logging.Logger
         Configured logger instance
     """
-    custom_logger = CustomLogger(logger_name, log_folder, log_level)
+    custom_logger = CustomLogger(logger_name, log_folder, log_level, async_mode=async_mode,
+                                 capture_prints=capture_prints, progress_interval=progress_interval)
     return custom_logger.get_logger()
 
+def get_log_file_path(logger: logging.Logger) -> Optional[Path]:
+    """Return the path of the first file handler attached to a logger (or to its async listener), if any."""
+    for handler in logger.handlers:
+        listener = getattr(handler, 'listener', None)
+        candidates = listener.handlers if listener is not None else (handler,)
+        for candidate in candidates:
+            if isinstance(candidate, logging.FileHandler):
+                return Path(candidate.baseFilename)
+    return None
+
+# --------------------------------------------------------------------------
+# Stage instrumentation
+# --------------------------------------------------------------------------
+def get_rss_bytes() -> Optional[int]:
+    """Return the current resident set size of the process, if it can be measured."""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+def get_peak_rss_bytes() -> Optional[int]:
+    """Return the peak resident set size of the process so far, if it can be measured."""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+        return peak if sys.platform == 'darwin' else peak * 1024
+    if psutil is not None:
+        memory_info = psutil.Process().memory_info()
+        # peak_wset is the Windows peak working set
+        return getattr(memory_info, 'peak_wset', memory_info.rss)
+    return None
+
+def _mb(value: Optional[int]) -> Optional[float]:
+    return None if value is None else round(value / 1024**2, 2)
+
+class StageTimer:
+    """
+    Context manager that measures one pipeline stage: wall time, RSS before
+    and after, the process peak RSS and (if tracemalloc is tracing) the
+    Python allocation delta and peak during the stage.
+
+    Rows and bytes processed can be passed up front or added while the stage
+    runs with `add()`; they are turned into rows/s and bytes/s on exit.
+
+    RSS and tracemalloc are process-wide. When stages overlap on other
+    threads (e.g. PipelineDAG tasks), a stage cannot tell its allocations
+    from theirs: its record is marked 'concurrent' and only carries the
+    process peak RSS, the memory figures are then only meaningful for the
+    whole run (see RunMetrics.summary).
+    """
+
+    def __init__(self, metrics: "RunMetrics", name: str,
+                 rows: Optional[int] = None, bytes_processed: Optional[int] = None):
+        self.metrics = metrics
+        self.name = name
+        self.rows = rows
+        self.bytes_processed = bytes_processed
+        self.result: Dict[str, Any] = {}
+
+    def add(self, rows: int = 0, bytes_processed: int = 0):
+        """Count rows/bytes processed by this stage."""
+        self.rows = (self.rows or 0) + rows
+        self.bytes_processed = (self.bytes_processed or 0) + bytes_processed
+
+    def __enter__(self) -> "StageTimer":
+        self._thread = threading.get_ident()
+        with self.metrics._lock:
+            active = self.metrics._active_stages
+            self.concurrent = False
+            for other in active:
+                if other._thread != self._thread:
+                    other.concurrent = self.concurrent = True
+            # A nested stage must not reset the peak of the stage around it
+            self._owns_peak = not active
+            active.add(self)
+        self._rss_start = get_rss_bytes()
+        self._tracing = tracemalloc.is_tracing()
+        if self._tracing:
+            if self._owns_peak:
+                tracemalloc.reset_peak()
+            self._traced_start = tracemalloc.get_traced_memory()[0]
+        self._start = time.perf_counter()
+        self.metrics.logger.info(f"STAGE START: {self.name}")
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        seconds = time.perf_counter() - self._start
+        rss_end = get_rss_bytes()
+        with self.metrics._lock:
+            self.metrics._active_stages.discard(self)
+
+        result: Dict[str, Any] = {
+            'stage': self.name,
+            'status': 'ok' if exc_type is None else 'failed',
+            'seconds': round(seconds, 4),
+            'peak_rss_mb': _mb(get_peak_rss_bytes()),
+        }
+        if self.concurrent:
+            result['concurrent'] = True
+        else:
+            result['rss_start_mb'] = _mb(self._rss_start)
+            result['rss_end_mb'] = _mb(rss_end)
+            if self._tracing:
+                traced_end, traced_peak = tracemalloc.get_traced_memory()
+                result['tracemalloc_delta_mb'] = _mb(traced_end - self._traced_start)
+                if self._owns_peak:
+                    result['tracemalloc_peak_mb'] = _mb(traced_peak - self._traced_start)
+        if self.rows is not None:
+            result['rows'] = self.rows
+            result['rows_per_sec'] = round(self.rows / seconds, 1) if seconds > 0 else None
+        if self.bytes_processed is not None:
+            result['bytes'] = self.bytes_processed
+            result['bytes_per_sec'] = round(self.bytes_processed / seconds, 1) if seconds > 0 else None
+
+        self.result = result
+        self.metrics._record_stage(result)
+        return False
+
+class RunMetrics:
+    """
+    Collects stage timings and throughput counters for one pipeline run and
+    writes them as a JSON summary, e.g. next to the run's log file.
+
+    Usage:
+        metrics = RunMetrics(logger)
+        with metrics.stage("load", bytes_processed=file_size) as stage:
+            df = load()
+            stage.add(rows=len(df))
+
+        @metrics.track("transform")
+        def transform(...): ...
+
+        metrics.add_counter("upload.cg_fact_sales", rows=1000, bytes_processed=150_000, seconds=0.2)
+        metrics.write_summary(path)
+    """
+
+    def __init__(self, logger: Optional[logging.Logger] = None, trace_memory: bool = False):
+        """
+        Parameters:
+        -----------
+        logger : logging.Logger, optional
+            Logger for the per-stage lines. Defaults to this module's logger.
+        trace_memory : bool
+            Start tracemalloc to report Python allocation deltas per stage.
+            This slows allocation-heavy code down noticeably.
+        """
+        self.logger = logger or logging.getLogger(__name__)
+        self.started_at = datetime.now()
+        self._start = time.perf_counter()
+        self.stages: List[Dict[str, Any]] = []
+        self.counters: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+        # Stages currently running, on any thread
+        self._active_stages = set()
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def stage(self, name: str, rows: Optional[int] = None,
+              bytes_processed: Optional[int] = None) -> StageTimer:
+        """Return a context manager measuring the stage `name`."""
+        return StageTimer(self, name, rows=rows, bytes_processed=bytes_processed)
+
+    def track(self, name: Optional[str] = None) -> Callable:
+        """Decorator measuring every call of a function as a stage."""
+        def decorator(func: Callable) -> Callable:
+            stage_name = name or func.__name__
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.stage(stage_name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def add_counter(self, name: str, rows: int = 0, bytes_processed: int = 0, seconds: float = 0.0):
+        """Accumulate a throughput counter (e.g. one per Supabase batch). Thread-safe."""
+        with self._lock:
+            counter = self.counters.setdefault(name, {'events': 0, 'rows': 0, 'bytes': 0, 'seconds': 0.0})
+            counter['events'] += 1
+            counter['rows'] += rows
+            counter['bytes'] += bytes_processed
+            counter['seconds'] += seconds
+
+    def _record_stage(self, result: Dict[str, Any]):
+        with self._lock:
+            self.stages.append(result)
+
+        parts = [f"{result['seconds']:.2f}s"]
+        if result.get('rows_per_sec'):
+            parts.append(f"{result['rows']} rows, {result['rows_per_sec']:.0f} rows/s")
+        if result.get('bytes_per_sec'):
+            parts.append(f"{result['bytes_per_sec'] / 1024**2:.2f} MB/s")
+        if result.get('concurrent'):
+            parts.append(f"ran concurrently, process peak RSS {result['peak_rss_mb']} MB")
+        elif result['rss_end_mb'] is not None:
+            parts.append(f"RSS {result['rss_end_mb']:.1f} MB (peak {result['peak_rss_mb']} MB)")
+        if 'tracemalloc_delta_mb' in result:
+            traced = f"traced {result['tracemalloc_delta_mb']:+.1f} MB"
+            if 'tracemalloc_peak_mb' in result:
+                traced += f" (peak +{result['tracemalloc_peak_mb']:.1f} MB)"
+            parts.append(traced)
+        self.logger.info(f"STAGE {result['status'].upper()}: {result['stage']} | " + " | ".join(parts))
+
+    def summary(self) -> Dict[str, Any]:
+        """Return the machine-readable run summary."""
+        with self._lock:
+            counters = {}
+            for name, counter in self.counters.items():
+                counters[name] = dict(counter)
+                if counter['seconds'] > 0:
+                    counters[name]['rows_per_sec'] = round(counter['rows'] / counter['seconds'], 1)
+                    counters[name]['bytes_per_sec'] = round(counter['bytes'] / counter['seconds'], 1)
+            return {
+                'started_at': self.started_at.isoformat(timespec='seconds'),
+                'total_seconds': round(time.perf_counter() - self._start, 4),
+                'peak_rss_mb': _mb(get_peak_rss_bytes()),
+                'stages': list(self.stages),
+                'counters': counters,
+            }
+
+    def write_summary(self, file_path: str) -> Path:
+        """Write the run summary as JSON and return its path."""
+        file_path = Path(file_path)
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(file_path, 'w', encoding='utf-8') as f:
+            json.dump(self.summary(), f, indent=2)
+        self.logger.info(f"Run summary written to: {file_path}")
+        return file_path
+
+# Run metrics shared by the library modules (e.g. per-batch upload counters)
+_run_metrics = None
+
+def get_run_metrics() -> RunMetrics:
+    """Get or create the RunMetrics instance of the current run."""
+    global _run_metrics
+    if _run_metrics is None:
+        _run_metrics = RunMetrics()
+    return _run_metrics
+
+def set_run_metrics(metrics: RunMetrics):
+    """Make `metrics` the RunMetrics instance returned by get_run_metrics()."""
+    global _run_metrics
+    _run_metrics = metrics
+
 # Global logger instance (optional - for simple usage)
 _global_logger = None
 
@@ -0,0 +1,215 @@
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from lib.logger import RunMetrics
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Task:
+    """One node of the pipeline graph."""
+    name: str
+    func: Callable[..., Any]
+    depends_on: List[str] = field(default_factory=list)
+    rows: Optional[Callable[[Any], int]] = None
+    # Filled in by the run
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    status: str = 'pending'
+
+    @property
+    def seconds(self) -> float:
+        if self.started is None or self.finished is None:
+            return 0.0
+        return self.finished - self.started
+
+
+class PipelineDAG:
+    """
+    Runs tasks with declared dependencies on a thread pool.
+
+    A task starts as soon as all of its dependencies have finished, so
+    independent tasks (e.g. the four dimension tables, or the uploads and
+    saves of different tables) overlap and the wall time approaches the
+    longest dependency chain instead of the sum of all tasks. Each task is
+    called with the results of its dependencies as keyword arguments.
+
+    Usage:
+        dag = PipelineDAG(metrics=metrics)
+        dag.add("raw_df", load)
+        dag.add("dim_date", lambda raw_df: create_dim_date(raw_df), depends_on=["raw_df"])
+        results = dag.run(max_workers=8)
+        dag.log_critical_path()
+
+    The first failing task stops the run: tasks that have not started are
+    skipped, running ones are waited for, and the error is re-raised.
+    """
+
+    def __init__(self, metrics: Optional[RunMetrics] = None):
+        self.tasks: Dict[str, Task] = {}
+        self.metrics = metrics
+        self.results: Dict[str, Any] = {}
+        self.wall_seconds = 0.0
+
+    def add(self, name: str, func: Callable[..., Any], depends_on: Sequence[str] = (),
+            rows: Optional[Callable[[Any], int]] = None) -> Task:
+        """
+        Adds a task.
+
+        Args:
+            name: Unique task name, also the keyword its result is passed as
+                to dependent tasks.
+            func: Called with one keyword argument per dependency.
+            depends_on: Names of the tasks that must finish first. They can
+                be added later, but must exist when the graph is run.
+            rows: Optional function of the result returning the rows processed,
+                reported in the task's stage metrics.
+        """
+        if name in self.tasks:
+            raise ValueError(f"Task '{name}' is already defined")
+        task = Task(name, func, list(depends_on), rows=rows)
+        self.tasks[name] = task
+        return task
+
+    def topological_order(self) -> List[str]:
+        """Returns the task names in dependency order. Raises ValueError on cycles or unknown tasks."""
+        for task in self.tasks.values():
+            missing = [dep for dep in task.depends_on if dep not in self.tasks]
+            if missing:
+                raise ValueError(f"Task '{task.name}' depends on unknown task(s) {missing}")
+
+        order: List[str] = []
+        state: Dict[str, str] = {}
+
+        def visit(name: str, path: List[str]):
+            if state.get(name) == 'done':
+                return
+            if state.get(name) == 'visiting':
+                raise ValueError(f"Dependency cycle: {' -> '.join(path + [name])}")
+            state[name] = 'visiting'
+            for dep in self.tasks[name].depends_on:
+                visit(dep, path + [name])
+            state[name] = 'done'
+            order.append(name)
+
+        for name in self.tasks:
+            visit(name, [])
+        return order
+
+    def _run_task(self, task: Task) -> Any:
+        inputs = {dep: self.results[dep] for dep in task.depends_on}
+        task.started = time.perf_counter()
+        task.status = 'running'
+        try:
+            if self.metrics is not None:
+                with self.metrics.stage(task.name) as stage:
+                    result = task.func(**inputs)
+                    if task.rows is not None and result is not None:
+                        stage.add(rows=task.rows(result))
+            else:
+                result = task.func(**inputs)
+            task.status = 'ok'
+            return result
+        except Exception:
+            task.status = 'failed'
+            raise
+        finally:
+            task.finished = time.perf_counter()
+
+    def run(self, max_workers: int = 8) -> Dict[str, Any]:
+        """
+        Runs every task and returns their results by name.
+
+        Args:
+            max_workers: Number of tasks running at the same time.
+        """
+        self.topological_order()  # validates the graph
+        remaining = {name: set(task.depends_on) for name, task in self.tasks.items()}
+        running: Dict[Future, str] = {}
+        error: Optional[BaseException] = None
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="dag") as executor:
+            while True:
+                if error is None:
+                    ready = [name for name, deps in remaining.items() if not deps]
+                    for name in ready:
+                        del remaining[name]
+                        running[executor.submit(self._run_task, self.tasks[name])] = name
+                if not running:
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        logger.error(f"Task '{name}' failed: {e}")
+                        if error is None:
+                            error = e
+                        continue
+                    self.results[name] = result
+                    for deps in remaining.values():
+                        deps.discard(name)
+        self.wall_seconds = time.perf_counter() - start
+
+        if error is not None:
+            skipped = sorted(remaining)
+            for name in skipped:
+                self.tasks[name].status = 'skipped'
+            if skipped:
+                logger.error(f"Skipped {len(skipped)} task(s) after the failure: {skipped}")
+            raise error
+        return self.results
+
+    def critical_path(self) -> List[str]:
+        """
+        Returns the chain of dependent tasks with the longest total run time
+        (the lower bound of the wall time for this graph).
+        """
+        chain_seconds: Dict[str, float] = {}
+        previous: Dict[str, Optional[str]] = {}
+        for name in self.topological_order():
+            task = self.tasks[name]
+            longest_dep = max(task.depends_on, key=lambda dep: chain_seconds[dep], default=None)
+            chain_seconds[name] = task.seconds + (chain_seconds[longest_dep] if longest_dep else 0.0)
+            previous[name] = longest_dep
+
+        if not chain_seconds:
+            return []
+        name = max(chain_seconds, key=chain_seconds.get)
+        path = []
+        while name is not None:
+            path.append(name)
+            name = previous[name]
+        return list(reversed(path))
+
+    def report(self) -> Dict[str, Any]:
+        """Timing summary of the last run: wall time, summed task time and the critical path."""
+        path = self.critical_path()
+        return {
+            'wall_seconds': round(self.wall_seconds, 4),
+            'task_seconds': round(sum(task.seconds for task in self.tasks.values()), 4),
+            'critical_path': path,
+            'critical_path_seconds': round(sum(self.tasks[name].seconds for name in path), 4),
+            'tasks': {
+                name: {'status': task.status, 'seconds': round(task.seconds, 4), 'depends_on': task.depends_on}
+                for name, task in self.tasks.items()
+            },
+        }
+
+    def log_critical_path(self, log: Optional[logging.Logger] = None):
+        """Logs the critical path of the last run, task by task."""
+        log = log or logger
+        report = self.report()
+        log.info(
+            f"Pipeline wall time {report['wall_seconds']:.2f}s, summed task time "
+            f"{report['task_seconds']:.2f}s, critical path {report['critical_path_seconds']:.2f}s:"
+        )
+        for name in report['critical_path']:
+            log.info(f"  {name:<28} {self.tasks[name].seconds:>8.2f}s")
@@ -0,0 +1,171 @@
+import hashlib
+import logging
+import shutil
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import Optional
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+PROFILE_MODES = ('off', 'minimal', 'full')
+
+# Number of cached reports kept in the cache folder
+MAX_CACHED_REPORTS = 10
+
+
+def file_content_hash(file_path: str, block_size: int = 1024**2) -> str:
+    """Returns the SHA-256 hex digest of a file, read in blocks."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def sample_for_profile(df: pd.DataFrame, sample_rows: Optional[int], seed: int = 0) -> pd.DataFrame:
+    """Returns a reproducible random sample of at most `sample_rows` rows (all rows if None)."""
+    if sample_rows is None or len(df) <= sample_rows:
+        return df
+    return df.sample(n=sample_rows, random_state=seed)
+
+def _cache_path(cache_dir: str, content_hash: str, mode: str, sample_rows: Optional[int]) -> Path:
+    """Cache file name for a given input and profile settings."""
+    sample_tag = f"sample{sample_rows}" if sample_rows else "all"
+    return Path(cache_dir) / f"{content_hash[:32]}_{mode}_{sample_tag}.html"
+
+def _prune_cache(cache_dir: str, keep: int = MAX_CACHED_REPORTS):
+    """Removes the least recently used reports beyond `keep`."""
+    reports = sorted(Path(cache_dir).glob('*.html'), key=lambda p: p.stat().st_mtime, reverse=True)
+    for report in reports[keep:]:
+        report.unlink(missing_ok=True)
+
+def _build_report(df: pd.DataFrame, output_path: str, title: str, minimal: bool) -> str:
+    """
+    Builds the ydata-profiling report and writes it to `output_path`.
+
+    Kept at module level so it can run in a worker process. ydata-profiling
+    is imported here, so processes that don't profile never load it.
+    """
+    from ydata_profiling import ProfileReport
+
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = output_path.with_name(f".{output_path.name}.tmp.html")
+
+    profile = ProfileReport(df, title=title, minimal=minimal)
+    profile.to_file(tmp_path)
+    tmp_path.replace(output_path)
+    return str(output_path)
+
+def generate_profile_report(df: pd.DataFrame,
+                            output_path: str,
+                            title: str = "Sales Data Profile Report",
+                            mode: str = 'minimal',
+                            sample_rows: Optional[int] = None,
+                            source_file: Optional[str] = None,
+                            cache_dir: str = 'reports/.profile_cache') -> Optional[str]:
+    """
+    Generates a profile report, reusing a cached one for an unchanged input file.
+
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        The raw data to profile.
+    output_path : str
+        Where the HTML report is written.
+    title : str
+        Report title.
+    mode : str
+        'full' (all ydata-profiling analyses), 'minimal' (skips correlations,
+        interactions and other expensive analyses) or 'off'.
+    sample_rows : int, optional
+        Profile a random sample of this many rows instead of the whole frame.
+    source_file : str, optional
+        The file `df` was loaded from. If given, the report is cached under the
+        file's content hash and reused when the same file is profiled again
+        with the same settings.
+    cache_dir : str
+        Folder holding the cached reports.
+
+    Returns:
+    --------
+    str or None
+        The path of the report, or None if profiling is off.
+    """
+    if mode not in PROFILE_MODES:
+        raise ValueError(f"Unknown profile mode '{mode}'. Expected one of {PROFILE_MODES}")
+    if mode == 'off':
+        logger.info("Profiling is turned off.")
+        return None
+
+    cached_report = None
+    if source_file:
+        cached_report = _cache_path(cache_dir, file_content_hash(source_file), mode, sample_rows)
+        if cached_report.exists():
+            Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(cached_report, output_path)
+            cached_report.touch()
+            logger.info(f"Input file unchanged, reused cached profile report '{cached_report}'")
+            return str(output_path)
+
+    sample = sample_for_profile(df, sample_rows)
+    logger.info(f"Profiling {len(sample)} of {len(df)} rows ({mode} mode)...")
+    _build_report(sample, output_path, title, minimal=(mode == 'minimal'))
+
+    if cached_report is not None:
+        cached_report.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(output_path, cached_report)
+        _prune_cache(cache_dir)
+
+    logger.info(f"Profile report generated: {output_path}")
+    return str(output_path)
+
+
+class BackgroundProfiler:
+    """
+    Runs `generate_profile_report` in a separate process so the pipeline can
+    continue with transformation and upload in the meantime.
+
+    Only the (sampled) DataFrame is sent to the worker process.
+    """
+
+    def __init__(self):
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._future: Optional[Future] = None
+
+    def start(self, df: pd.DataFrame, output_path: str, mode: str = 'minimal',
+              sample_rows: Optional[int] = None, **kwargs) -> Future:
+        """
+        Starts profiling in the background. Accepts the same arguments as
+        `generate_profile_report`.
+        """
+        # Sample in this process, so only the sample is pickled to the worker
+        sample = sample_for_profile(df, sample_rows)
+        self._executor = ProcessPoolExecutor(max_workers=1)
+        self._future = self._executor.submit(
+            generate_profile_report, sample, output_path, mode=mode, sample_rows=sample_rows, **kwargs
+        )
+        logger.info("Profile report started in a background process.")
+        return self._future
+
+    def wait(self) -> Optional[str]:
+        """
+        Waits for the background report and returns its path. Errors in the
+        worker are logged, not raised: a failed profile does not fail the run.
+        """
+        if self._future is None:
+            return None
+        try:
+            if not self._future.done():
+                logger.info("Waiting for the background profile report to finish...")
+            report_path = self._future.result()
+            if report_path:
+                logger.info(f"Background profile report finished: {report_path}")
+            return report_path
+        except Exception as e:
+            logger.error(f"Background profile report failed: {e}", exc_info=True)
+            return None
+        finally:
+            self._executor.shutdown(wait=True)
+            self._future = None
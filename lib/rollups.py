@@ -0,0 +1,277 @@
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from lib.data_transform import resolve_dimension_codes
+
+logger = logging.getLogger(__name__)
+
+# Attributes every rollup is broken down by
+ROLLUP_DIMENSIONS: List[str] = ['product_line', 'country', 'territory', 'deal_size']
+
+# Rollup table (output name) -> time columns of its grain. The daily rollup is
+# built from the fact rows, the others from the daily rollup.
+ROLLUP_GRAINS: Dict[str, List[str]] = {
+    'rollup_sales_daily': ['date_key'],
+    'rollup_sales_monthly': ['year', 'month'],
+    'rollup_sales_quarterly': ['year', 'quarter'],
+    'rollup_sales_yearly': ['year'],
+}
+
+MEASURES: List[str] = ['sales', 'quantity_ordered', 'order_count', 'order_line_count']
+
+# Dimension -> (key, attributes the rollups take from it). A change to one of
+# them moves existing fact rows to another rollup row.
+DIMENSION_ATTRIBUTES: Dict[str, Tuple[str, List[str]]] = {
+    'dim_product': ('product_code', ['product_line']),
+    'dim_customer': ('customer_name', ['country', 'territory']),
+}
+
+# Missing attribute values are stored as this label, so the rollup keys stay
+# usable as primary keys (NULLs never conflict in an upsert)
+UNKNOWN = 'Unknown'
+
+STATE_FILE = 'rollup_sales_daily.csv'
+STATE_META_FILE = 'rollup_state.json'
+STATE_ATTRIBUTES_FILE = 'rollup_attributes.csv'
+FACT_MANIFEST_FILE = 'cg_fact_sales.csv'
+
+
+def _fact_attributes(fact_df: pd.DataFrame, dim_product_df: pd.DataFrame,
+                     dim_customer_df: pd.DataFrame) -> pd.DataFrame:
+    """The fact rows with the rollup attributes gathered from the dimensions (no merge)."""
+    product_codes = resolve_dimension_codes(fact_df['product_code'], dim_product_df['product_code'])
+    customer_codes = resolve_dimension_codes(fact_df['customer_name'], dim_customer_df['customer_name'])
+
+    def gather(dim_column: pd.Series, codes: np.ndarray) -> np.ndarray:
+        values = dim_column.to_numpy(dtype=object)
+        # Unmatched keys (-1) become missing
+        return np.where(codes >= 0, values[np.maximum(codes, 0)], None)
+
+    attributes = pd.DataFrame({
+        'date_key': fact_df['date_key'].to_numpy(),
+        'product_line': gather(dim_product_df['product_line'], product_codes),
+        'country': gather(dim_customer_df['country'], customer_codes),
+        'territory': gather(dim_customer_df['territory'], customer_codes),
+        'deal_size': fact_df['deal_size'].to_numpy(dtype=object),
+        'order_number': fact_df['order_number'].to_numpy(),
+        'sales': fact_df['sales'].to_numpy(),
+        'quantity_ordered': fact_df['quantity_ordered'].to_numpy(),
+    })
+    attributes[ROLLUP_DIMENSIONS] = attributes[ROLLUP_DIMENSIONS].fillna(UNKNOWN)
+    return attributes
+
+def build_daily_rollup(fact_df: pd.DataFrame, dim_product_df: pd.DataFrame,
+                       dim_customer_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Aggregates fact rows by date_key x product_line x country x territory x
+    deal_size in one grouped pass: sales, quantity, distinct orders and order lines.
+    """
+    keys = ['date_key'] + ROLLUP_DIMENSIONS
+    attributes = _fact_attributes(fact_df, dim_product_df, dim_customer_df)
+    daily = attributes.groupby(keys, sort=True).agg(
+        sales=('sales', 'sum'),
+        quantity_ordered=('quantity_ordered', 'sum'),
+        order_count=('order_number', 'nunique'),
+        order_line_count=('order_number', 'size'),
+    ).reset_index()
+    daily['sales'] = daily['sales'].round(2)
+    return daily
+
+def roll_up(daily: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    """
+    Derives every rollup from the daily one.
+
+    All measures are additive over days: an order has a single order date,
+    so it is counted in exactly one day of each group and the distinct order
+    counts can be summed like the other measures. The year, quarter and
+    month come from the YYYYMMDD date_key, so days of earlier drops (see
+    merge_daily) need no dim_date rows.
+    """
+    rollups = {'rollup_sales_daily': daily}
+    date_keys = daily['date_key'].to_numpy(dtype=np.int64)
+    months = date_keys // 100 % 100
+    with_calendar = daily.assign(year=date_keys // 10000, quarter=(months - 1) // 3 + 1, month=months)
+    for table_name, grain in ROLLUP_GRAINS.items():
+        if table_name == 'rollup_sales_daily':
+            continue
+        rollup = with_calendar.groupby(grain + ROLLUP_DIMENSIONS, sort=True)[MEASURES].sum().reset_index()
+        rollup['sales'] = rollup['sales'].round(2)
+        rollups[table_name] = rollup
+    return rollups
+
+def merge_daily(previous_daily: pd.DataFrame, delta_daily: pd.DataFrame) -> pd.DataFrame:
+    """Adds the daily rollup of new fact rows to the previous daily rollup."""
+    keys = ['date_key'] + ROLLUP_DIMENSIONS
+    merged = pd.concat([previous_daily, delta_daily], ignore_index=True)
+    merged = merged.groupby(keys, sort=True)[MEASURES].sum().reset_index()
+    merged['sales'] = merged['sales'].round(2)
+    return merged
+
+def build_rollups(fact_df: pd.DataFrame, dim_product_df: pd.DataFrame, dim_customer_df: pd.DataFrame,
+                  previous_daily: Optional[pd.DataFrame] = None, new_rows: Optional[np.ndarray] = None,
+                  additive: bool = False) -> Dict[str, pd.DataFrame]:
+    """
+    Builds the rollup tables (see ROLLUP_GRAINS) from the fact table.
+
+    With `previous_daily` (the daily rollup of the fact rows that are not
+    new) and `new_rows` (boolean mask of the new fact rows), only the new
+    rows are aggregated and added to it. That is only exact when the new rows
+    belong to orders that had no rows before; otherwise, the order counts
+    would be double counted, and everything is rebuilt.
+
+    With `additive` (the fact table only holds a new drop of data, see
+    load_rollup_state) the new rows are always added, as the earlier rows
+    are not there to rebuild from.
+
+    Returns:
+        Output name -> rollup DataFrame.
+    """
+    daily = None
+    if previous_daily is not None and new_rows is not None:
+        old_orders = fact_df['order_number'].to_numpy()[~new_rows]
+        new_orders = fact_df['order_number'].to_numpy()[new_rows]
+        if not additive and np.isin(new_orders, old_orders).any():
+            logger.info("New fact rows extend existing orders, rebuilding the rollups in full.")
+        else:
+            delta = build_daily_rollup(fact_df[new_rows], dim_product_df, dim_customer_df)
+            daily = merge_daily(previous_daily, delta)
+            logger.info(f"Rollups refreshed from {int(new_rows.sum())} new fact rows.")
+
+    if daily is None:
+        daily = build_daily_rollup(fact_df, dim_product_df, dim_customer_df)
+
+    rollups = roll_up(daily)
+    logger.info("Rollups built: " + ", ".join(f"{name} {len(df)} rows" for name, df in rollups.items()))
+    return rollups
+
+
+# --------------------------------------------------------------------------
+# State for incremental refreshes (kept next to the sync manifests)
+# --------------------------------------------------------------------------
+def _manifest_digest(manifest_dir: str) -> Optional[str]:
+    manifest_path = Path(manifest_dir) / FACT_MANIFEST_FILE
+    if not manifest_path.exists():
+        return None
+    return hashlib.sha256(manifest_path.read_bytes()).hexdigest()
+
+def _attribute_hashes(dim_product_df: pd.DataFrame, dim_customer_df: pd.DataFrame) -> pd.DataFrame:
+    """(dimension, key, hash of the DIMENSION_ATTRIBUTES) of every dimension row."""
+    frames = []
+    for dimension, dim_df in (('dim_product', dim_product_df), ('dim_customer', dim_customer_df)):
+        key_column, attributes = DIMENSION_ATTRIBUTES[dimension]
+        frames.append(pd.DataFrame({
+            'dimension': dimension,
+            'key': dim_df[key_column].astype(str).to_numpy(),
+            'attr_hash': pd.util.hash_pandas_object(dim_df[attributes].astype(str), index=False).to_numpy(),
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+def _changed_attributes(previous: pd.DataFrame, current: pd.DataFrame) -> int:
+    """Number of keys present in both snapshots whose attributes differ."""
+    both = previous.merge(current, on=['dimension', 'key'], suffixes=('_previous', ''))
+    return int((both['attr_hash_previous'] != both['attr_hash']).sum())
+
+def _read_attributes(path: Path) -> pd.DataFrame:
+    return pd.read_csv(path, dtype={'key': str, 'attr_hash': 'uint64'}, keep_default_na=False)
+
+def _write_csv(df: pd.DataFrame, path: Path):
+    tmp_path = path.with_suffix('.csv.tmp')
+    df.to_csv(tmp_path, index=False, encoding='utf-8')
+    os.replace(tmp_path, path)
+
+def save_rollup_state(daily: pd.DataFrame, dim_product_df: pd.DataFrame, dim_customer_df: pd.DataFrame,
+                      manifest_dir: str, additive: bool = False):
+    """
+    Stores the daily rollup of a successful incremental sync and the
+    dimension attributes it was built with, tagged with the digest of the
+    fact manifest written by the same sync. Call it after the manifests have
+    been saved. With `additive` the attributes of the products and customers
+    absent from the drop are kept.
+    """
+    state_dir = Path(manifest_dir)
+    state_dir.mkdir(parents=True, exist_ok=True)
+    attributes = _attribute_hashes(dim_product_df, dim_customer_df)
+    attributes_path = state_dir / STATE_ATTRIBUTES_FILE
+    if additive and attributes_path.exists():
+        previous = _read_attributes(attributes_path)
+        absent = ~previous.set_index(['dimension', 'key']).index.isin(
+            pd.MultiIndex.from_frame(attributes[['dimension', 'key']])
+        )
+        attributes = pd.concat([previous[absent], attributes], ignore_index=True)
+    _write_csv(daily, state_dir / STATE_FILE)
+    _write_csv(attributes, attributes_path)
+
+    meta_path = state_dir / STATE_META_FILE
+    with open(meta_path.with_suffix('.json.tmp'), 'w', encoding='utf-8') as f:
+        json.dump({'fact_manifest_sha256': _manifest_digest(manifest_dir)}, f)
+    os.replace(meta_path.with_suffix('.json.tmp'), meta_path)
+
+def load_rollup_state(fact_df: pd.DataFrame, dim_product_df: pd.DataFrame, dim_customer_df: pd.DataFrame,
+                      manifest_dir: str, additive: bool = False) -> Tuple[Optional[pd.DataFrame], Optional[np.ndarray]]:
+    """
+    Returns (previous daily rollup, mask of the new fact rows) for an
+    incremental refresh, or (None, None) when the rollups must be rebuilt:
+    no state, a state that does not match the fact manifest, fact rows
+    that were changed or deleted since the last sync, or a product line,
+    country or territory of an existing product or customer that changed
+    (its existing fact rows belong to other rollup rows now).
+
+    With `additive` (`fact_df` only holds a new drop of data) the rollups
+    cannot be rebuilt from it: the rows with new keys are added to the
+    previous rollup, and the changes listed above are logged as not
+    reflected. An order spread over several drops is counted once per drop
+    in order_count. A state that is missing or does not match the fact
+    manifest is an error once earlier drops have been synced.
+    """
+    from lib.incremental_sync import plan_table_sync
+
+    state_path = Path(manifest_dir) / STATE_FILE
+    meta_path = Path(manifest_dir) / STATE_META_FILE
+    attributes_path = Path(manifest_dir) / STATE_ATTRIBUTES_FILE
+    if not state_path.exists() or not meta_path.exists() or not attributes_path.exists():
+        if additive and (Path(manifest_dir) / FACT_MANIFEST_FILE).exists():
+            raise RuntimeError(
+                "Earlier drops were synced but the rollup state is missing, and the rollups cannot be "
+                "rebuilt from a single drop. Delete the sync manifests and the ingest ledger to reload every file."
+            )
+        return None, None
+    with open(meta_path, encoding='utf-8') as f:
+        meta = json.load(f)
+    if meta.get('fact_manifest_sha256') != _manifest_digest(manifest_dir):
+        if additive:
+            raise RuntimeError(
+                "The rollup state does not match the fact manifest and the rollups cannot be rebuilt "
+                "from a single drop. Delete the sync manifests and the ingest ledger to reload every file."
+            )
+        logger.info("Rollup state does not match the fact manifest, rebuilding the rollups in full.")
+        return None, None
+
+    previous_attributes = _read_attributes(attributes_path)
+    changed = _changed_attributes(previous_attributes, _attribute_hashes(dim_product_df, dim_customer_df))
+    if changed and additive:
+        logger.warning(f"Rollup attributes of {changed} products/customers changed, their earlier fact rows "
+                       f"stay in the rollup rows of the old attributes.")
+    elif changed:
+        logger.info(f"Rollup attributes of {changed} products/customers changed, rebuilding the rollups in full.")
+        return None, None
+
+    plan = plan_table_sync(fact_df, 'cg_fact_sales', manifest_dir, additive)
+    if additive:
+        if plan.changed:
+            logger.warning(f"{plan.changed} fact rows of earlier drops were changed, "
+                           f"the rollups keep their previous values.")
+        previous_daily = pd.read_csv(state_path, keep_default_na=False)
+        return previous_daily, plan.new_rows
+    if plan.full_refresh or plan.changed or plan.deleted:
+        return None, None
+
+    previous_daily = pd.read_csv(state_path, keep_default_na=False)
+    new_rows = fact_df.index.isin(plan.upserts.index)
+    return previous_daily, new_rows
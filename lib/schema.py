@@ -0,0 +1,134 @@
+import sys
+import logging
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Compact dtypes for the columns of the sales extract, passed to `read_csv`.
+# - Low-cardinality text (and the per-customer / per-product attributes,
+#   which repeat on every order line) is stored as 'category'.
+# - Money columns stay float64: the values have two decimals and must
+#   round-trip exactly to DECIMAL(10,2)/DECIMAL(12,2), which float32 can't do.
+# - Integer columns are not listed: a fixed-width read wraps out-of-range
+#   values silently and fails on a blank or non-numeric field, so they are
+#   read as inferred and narrowed by `downcast_integer_columns` afterwards.
+SALES_EXTRACT_DTYPES: Dict[str, str] = {
+    'PRICEEACH': 'float64',
+    'SALES': 'float64',
+    'ORDERDATE': 'category',
+    'STATUS': 'category',
+    'PRODUCTLINE': 'category',
+    'MSRP': 'float64',
+    'PRODUCTCODE': 'category',
+    'CUSTOMERNAME': 'category',
+    'PHONE': 'category',
+    'ADDRESSLINE1': 'category',
+    'ADDRESSLINE2': 'category',
+    'CITY': 'category',
+    'STATE': 'category',
+    'POSTALCODE': 'category',
+    'COUNTRY': 'category',
+    'TERRITORY': 'category',
+    'CONTACTLASTNAME': 'category',
+    'CONTACTFIRSTNAME': 'category',
+    'DEALSIZE': 'category',
+}
+
+# Target dtypes of the integer columns. Columns loaded into an INT database
+# column are never narrower than int32.
+SALES_EXTRACT_INT_DTYPES: Dict[str, str] = {
+    'ORDERNUMBER': 'int32',
+    'QUANTITYORDERED': 'int32',
+    'ORDERLINENUMBER': 'int32',
+    'QTR_ID': 'int8',
+    'MONTH_ID': 'int8',
+    'YEAR_ID': 'int16',
+}
+
+
+def downcast_integer_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Narrows the integer columns of a loaded extract to SALES_EXTRACT_INT_DTYPES.
+
+    A column is only narrowed when every value is present, integral and in
+    range for the target dtype. Otherwise it becomes nullable 'Int64' (blank
+    and non-numeric values are NA), so nothing wraps; run the validation
+    first to quarantine those rows instead.
+    """
+    dtypes = {}
+    nullable = {}
+    for column, dtype in SALES_EXTRACT_INT_DTYPES.items():
+        if column not in df.columns or df[column].dtype == dtype:
+            continue
+        numbers = pd.to_numeric(df[column], errors='coerce')
+        values = numbers.to_numpy(dtype=np.float64, na_value=np.nan)
+        limits = np.iinfo(dtype)
+        with np.errstate(invalid='ignore'):
+            fits = (values >= limits.min) & (values <= limits.max) & (np.floor(values) == values)
+        if fits.all():
+            dtypes[column] = dtype
+            continue
+        logger.warning(
+            f"{int((~fits).sum())} values of '{column}' are missing, not integers or do not fit "
+            f"{dtype}, keeping it as nullable Int64"
+        )
+        if pd.api.types.is_integer_dtype(numbers.dtype):
+            nullable[column] = numbers.astype('Int64')
+        else:
+            with np.errstate(invalid='ignore'):
+                integral = np.isfinite(values) & (np.floor(values) == values) & (np.abs(values) < 2**63)
+            nullable[column] = pd.arrays.IntegerArray(np.where(integral, values, 0).astype(np.int64), ~integral)
+    if nullable:
+        df = df.assign(**nullable)
+    return df.astype(dtypes) if dtypes else df
+
+def apply_sales_schema(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Converts an already loaded sales extract to the compact dtypes.
+
+    Columns that are not part of the schema are left untouched. Prefer
+    passing `dtype=SALES_EXTRACT_DTYPES` to `read_csv` instead, which avoids
+    building the object columns in the first place.
+    """
+    dtypes = {column: dtype for column, dtype in SALES_EXTRACT_DTYPES.items() if column in df.columns}
+    return downcast_integer_columns(df.astype(dtypes))
+
+def estimate_object_memory(df: pd.DataFrame) -> int:
+    """
+    Estimates the deep memory usage `df` would have with pandas' default
+    dtypes (object for text, int64/float64 for numbers).
+
+    Used to report the saving of the compact schema without loading the
+    data a second time. Categorical columns are costed as one pointer per row
+    plus the size of the string object each row would hold.
+    """
+    total = 0
+    for column in df.columns:
+        series = df[column]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            categories = series.cat.categories
+            codes = series.cat.codes.to_numpy()
+            sizes = np.fromiter((sys.getsizeof(value) for value in categories), dtype=np.int64,
+                                count=len(categories))
+            counts = np.bincount(codes[codes >= 0], minlength=len(categories))
+            # Missing values are a shared float NaN object
+            total += int((sizes * counts).sum()) + (codes < 0).sum() * sys.getsizeof(np.nan)
+            total += 8 * len(series)
+        elif pd.api.types.is_numeric_dtype(series.dtype):
+            total += 8 * len(series)
+        else:
+            total += int(series.memory_usage(deep=True, index=False))
+    return total + int(df.index.memory_usage())
+
+def to_object_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Returns `df` with categorical columns converted back to plain object
+    columns, e.g. before building JSON records.
+    """
+    categorical = [column for column in df.columns if isinstance(df[column].dtype, pd.CategoricalDtype)]
+    if not categorical:
+        return df
+    return df.astype({column: object for column in categorical})
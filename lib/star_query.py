@@ -0,0 +1,353 @@
+import logging
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from lib.data_transform import resolve_dimension_codes
+
+logger = logging.getLogger(__name__)
+
+# Dimension name -> (output file name, key column in the dimension, key column in the fact table)
+DIMENSIONS: Dict[str, Tuple[str, str, str]] = {
+    'date': ('dim_date', 'date_key', 'date_key'),
+    'product': ('dim_product', 'product_code', 'product_code'),
+    'customer': ('dim_customer', 'customer_name', 'customer_name'),
+    'order': ('dim_order', 'order_number', 'order_number'),
+}
+
+# Measures of vw_sales_analysis-style queries when none are given
+DEFAULT_AGGREGATES: Dict[str, Tuple[str, str]] = {
+    'sales': ('sales', 'sum'),
+    'quantity_ordered': ('quantity_ordered', 'sum'),
+    'orders': ('order_number', 'nunique'),
+    'order_lines': ('order_number', 'count'),
+}
+
+AGGREGATIONS = ('sum', 'mean', 'min', 'max', 'count', 'nunique')
+
+# Above this many possible groups, group ids are compacted with np.unique first
+DENSE_GROUP_LIMIT = 5_000_000
+
+FilterValue = Union[Any, Sequence[Any], slice]
+
+
+@dataclass
+class _Column:
+    """A queryable column: integer codes into `categories`, plus the numeric values for measures."""
+    name: str
+    # None for columns of the fact table itself
+    dimension: Optional[str]
+    # One code per dimension row (or per fact row for fact columns). Nulls
+    # have the code len(categories) - 1 when `has_null` is set.
+    codes: np.ndarray
+    categories: np.ndarray
+    values: Optional[np.ndarray]
+    has_null: bool
+
+
+def _encode(values: pd.Series) -> Tuple[np.ndarray, np.ndarray, bool]:
+    """Codes a column against its sorted distinct values. Nulls get their own trailing code."""
+    codes, categories = pd.factorize(values, sort=True)
+    categories = np.asarray(categories)
+    codes = codes.astype(np.int32)
+    has_null = bool((codes < 0).any())
+    if has_null:
+        codes[codes < 0] = len(categories)
+        categories = np.append(categories.astype(object), None)
+    return codes, categories, has_null
+
+def _numeric_values(values: pd.Series) -> Optional[np.ndarray]:
+    if isinstance(values.dtype, pd.CategoricalDtype) or not pd.api.types.is_numeric_dtype(values.dtype):
+        return None
+    return values.to_numpy(dtype='float64', na_value=np.nan)
+
+
+class StarSchema:
+    """
+    The star schema held in memory as NumPy arrays, for ad-hoc aggregates
+    without a round trip to the database.
+
+    Every dimension row gets an integer surrogate key (its position), and the
+    fact table is stored as one surrogate-key array per dimension plus its
+    measure arrays, sorted by date. Every attribute is dictionary-encoded
+    into integer codes, so a query is a handful of vectorized gathers,
+    boolean masks and bincounts:
+
+    - date range filters are a binary search on the sorted date keys;
+    - other filters test a per-category lookup table indexed by the codes;
+    - group-by combines the codes of the group columns into one integer
+      group id and aggregates with np.bincount (sort + reduceat for
+      min/max/nunique).
+
+    Fact rows whose keys are missing from a dimension are dropped, like the
+    inner joins of vw_sales_analysis.
+
+    Usage:
+        star = StarSchema.load('transformed_data')
+        star.query(group_by=['year', 'product_line'], filters={'country': ['USA', 'France']})
+        star.query(group_by=['month'], date_range=(20040101, 20041231),
+                   aggregates={'revenue': ('sales', 'sum'), 'avg_price': ('price_each', 'mean')})
+    """
+
+    def __init__(self, tables: Dict[str, pd.DataFrame]):
+        """
+        Args:
+            tables: The five tables built by data_transform, keyed by their
+                output name ('dim_date', 'dim_product', 'dim_customer',
+                'dim_order', 'fact_sales').
+        """
+        start = time.perf_counter()
+        fact = tables['fact_sales']
+        self._columns: Dict[str, _Column] = {}
+        # Surrogate key of every fact row in each dimension
+        self._fact_keys: Dict[str, np.ndarray] = {}
+        self._gathered: Dict[str, np.ndarray] = {}
+
+        matched = np.ones(len(fact), dtype=bool)
+        dim_frames = {}
+        for dimension, (table_name, dim_key, fact_key) in DIMENSIONS.items():
+            dim_df = tables[table_name]
+            if dimension == 'date':
+                # Surrogate order = chronological order, so the fact table can be range-searched by date
+                dim_df = dim_df.sort_values('date_key', kind='stable')
+            dim_df = dim_df.reset_index(drop=True)
+            dim_frames[dimension] = dim_df
+            surrogates = resolve_dimension_codes(fact[fact_key], dim_df[dim_key]).astype(np.int32)
+            matched &= surrogates >= 0
+            self._fact_keys[dimension] = surrogates
+
+        unmatched = int((~matched).sum())
+        if unmatched:
+            logger.warning(f"{unmatched} fact rows have no match in a dimension and are left out")
+
+        # Pre-sort the fact rows by date
+        order = np.flatnonzero(matched)
+        order = order[np.argsort(self._fact_keys['date'][order], kind='stable')]
+        for dimension in DIMENSIONS:
+            self._fact_keys[dimension] = self._fact_keys[dimension][order]
+        self.num_rows = len(order)
+
+        for dimension, dim_df in dim_frames.items():
+            for column in dim_df.columns:
+                self._add_column(column, dimension, dim_df[column])
+        for column in fact.columns:
+            if column not in self._columns:
+                self._add_column(column, None, fact[column].iloc[order])
+
+        # Sorted date_key of every fact row, for the binary search of date ranges
+        date_keys = dim_frames['date']['date_key'].to_numpy()
+        self._fact_date_keys = date_keys[self._fact_keys['date']]
+
+        logger.info(
+            f"Star schema loaded: {self.num_rows} fact rows, {len(self._columns)} columns "
+            f"in {time.perf_counter() - start:.2f}s"
+        )
+
+    def _add_column(self, name: str, dimension: Optional[str], values: pd.Series):
+        codes, categories, has_null = _encode(values)
+        self._columns[name] = _Column(name, dimension, codes, categories, _numeric_values(values), has_null)
+
+    @classmethod
+    def load(cls, folder: str = 'transformed_data') -> 'StarSchema':
+        """
+        Loads the tables saved by `data_transform.save_tables`, preferring the
+        Arrow file, then Parquet, then CSV of each table.
+        """
+        from lib.file_load import read_columnar
+
+        tables = {}
+        for table_name in ['dim_date', 'dim_product', 'dim_customer', 'dim_order', 'fact_sales']:
+            for suffix in ('.arrow', '.parquet', '.csv'):
+                path = Path(folder) / f"{table_name}{suffix}"
+                if not path.exists():
+                    continue
+                if suffix == '.csv':
+                    tables[table_name] = pd.read_csv(path, parse_dates=['order_date'] if table_name == 'dim_date' else None)
+                else:
+                    tables[table_name] = read_columnar(folder, path.name)
+                break
+            else:
+                raise ValueError(f"No saved '{table_name}' table found in '{folder}'")
+        return cls(tables)
+
+    @property
+    def columns(self) -> List[str]:
+        """The columns that can be used in group_by, filters and aggregates."""
+        return list(self._columns)
+
+    def _column(self, name: str) -> _Column:
+        if name not in self._columns:
+            raise ValueError(f"Unknown column '{name}'. Available: {self.columns}")
+        return self._columns[name]
+
+    def _fact_codes(self, name: str) -> np.ndarray:
+        """The codes of a column for every (sorted) fact row, gathered once and cached."""
+        column = self._column(name)
+        if column.dimension is None:
+            return column.codes
+        if name not in self._gathered:
+            self._gathered[name] = column.codes[self._fact_keys[column.dimension]]
+        return self._gathered[name]
+
+    def _fact_values(self, name: str) -> np.ndarray:
+        column = self._column(name)
+        if column.values is None:
+            raise ValueError(f"Column '{name}' is not numeric")
+        if column.dimension is None:
+            return column.values
+        return column.values[self._fact_keys[column.dimension]]
+
+    def _filter_table(self, column: _Column, condition: FilterValue) -> np.ndarray:
+        """Boolean lookup table over the categories of `column`: True where the filter matches."""
+        categories = column.categories
+        if isinstance(condition, slice):
+            known = categories[:-1] if column.has_null else categories
+            table = np.zeros(len(categories), dtype=bool)
+            inside = np.ones(len(known), dtype=bool)
+            if condition.start is not None:
+                inside &= known >= condition.start
+            if condition.stop is not None:
+                inside &= known <= condition.stop
+            table[:len(known)] = inside
+            return table
+        if isinstance(condition, (list, tuple, set, frozenset, np.ndarray, pd.Index)):
+            wanted = list(condition)
+        else:
+            wanted = [condition]
+        table = pd.Index(categories).isin([value for value in wanted if value is not None])
+        if column.has_null and any(value is None for value in wanted):
+            table[-1] = True
+        return np.asarray(table)
+
+    def query(self,
+              group_by: Sequence[str] = (),
+              aggregates: Optional[Dict[str, Tuple[str, str]]] = None,
+              filters: Optional[Dict[str, FilterValue]] = None,
+              date_range: Optional[Tuple[Optional[int], Optional[int]]] = None) -> pd.DataFrame:
+        """
+        Group-by/filter aggregate over the fact table joined to its dimensions.
+
+        Args:
+            group_by: Columns to group by, e.g. ['year', 'month', 'country'].
+                Any column of the fact table or of a dimension can be used.
+            aggregates: Output column -> (column, aggregation), with the
+                aggregation one of AGGREGATIONS. Defaults to DEFAULT_AGGREGATES.
+            filters: Column -> a value, a list of values, or a slice for an
+                inclusive range (e.g. {'year': slice(2004, 2005)}). None
+                matches nulls.
+            date_range: Inclusive (first, last) date_key range, e.g.
+                (20040101, 20041231). Either bound can be None.
+
+        Returns:
+            One row per group (sorted by the group columns) with the group
+            columns and the aggregates. Without group_by, a single row.
+        """
+        start = time.perf_counter()
+        aggregates = aggregates or DEFAULT_AGGREGATES
+        group_by = list(group_by)
+        for output, (column, aggregation) in aggregates.items():
+            self._column(column)
+            if aggregation not in AGGREGATIONS:
+                raise ValueError(f"Unknown aggregation '{aggregation}' for '{output}'. Expected one of {AGGREGATIONS}")
+
+        # 1. Date range: a contiguous slice of the date-sorted fact rows
+        lo, hi = 0, self.num_rows
+        if date_range is not None:
+            first, last = date_range
+            if first is not None:
+                lo = int(np.searchsorted(self._fact_date_keys, first, side='left'))
+            if last is not None:
+                hi = int(np.searchsorted(self._fact_date_keys, last, side='right'))
+        rows = slice(lo, hi)
+
+        # 2. Other filters
+        mask = None
+        for name, condition in (filters or {}).items():
+            table = self._filter_table(self._column(name), condition)
+            matches = table[self._fact_codes(name)[rows]]
+            mask = matches if mask is None else mask & matches
+        selection = np.flatnonzero(mask) + lo if mask is not None else None
+
+        def take(array: np.ndarray) -> np.ndarray:
+            return array[rows] if selection is None else array[selection]
+
+        # 3. Group ids: mixed-radix combination of the group column codes
+        group_codes = [take(self._fact_codes(name)) for name in group_by]
+        sizes = [len(self._column(name).categories) for name in group_by]
+        num_rows = (hi - lo) if selection is None else len(selection)
+        group_ids = np.zeros(num_rows, dtype=np.int64)
+        for codes, size in zip(group_codes, sizes):
+            group_ids = group_ids * size + codes
+
+        possible_groups = int(np.prod(sizes, dtype=np.float64)) if sizes else 1
+        if possible_groups <= DENSE_GROUP_LIMIT:
+            counts = np.bincount(group_ids, minlength=possible_groups)
+            present = np.flatnonzero(counts)
+            # Dense id -> compact group number
+            compact = np.full(possible_groups, -1, dtype=np.int64)
+            compact[present] = np.arange(len(present))
+            inverse = compact[group_ids]
+            group_keys = present
+        else:
+            group_keys, inverse = np.unique(group_ids, return_inverse=True)
+        num_groups = len(group_keys)
+
+        # 4. Decode the group columns from the group ids
+        result: Dict[str, Any] = {}
+        remainder = group_keys.copy()
+        decoded = []
+        for name, size in reversed(list(zip(group_by, sizes))):
+            decoded.append((name, self._column(name).categories[remainder % size]))
+            remainder //= size
+        for name, values in reversed(decoded):
+            result[name] = values
+
+        # 5. Aggregates
+        counts = np.bincount(inverse, minlength=num_groups)
+        order = None
+        for output, (column, aggregation) in aggregates.items():
+            if aggregation == 'count':
+                result[output] = counts
+            elif aggregation == 'nunique':
+                pairs = np.unique(inverse * len(self._column(column).categories) + take(self._fact_codes(column)))
+                result[output] = np.bincount(pairs // len(self._column(column).categories), minlength=num_groups)
+            else:
+                values = take(self._fact_values(column))
+                if aggregation in ('sum', 'mean'):
+                    sums = np.bincount(inverse, weights=np.nan_to_num(values), minlength=num_groups)
+                    if aggregation == 'sum':
+                        result[output] = sums
+                    else:
+                        valid = np.bincount(inverse, weights=(~np.isnan(values)).astype(np.float64), minlength=num_groups)
+                        with np.errstate(invalid='ignore', divide='ignore'):
+                            result[output] = sums / valid
+                else:
+                    if order is None:
+                        order = np.argsort(inverse, kind='stable')
+                        boundaries = np.flatnonzero(np.r_[True, np.diff(inverse[order]) != 0])
+                    reduce = np.fmin if aggregation == 'min' else np.fmax
+                    result[output] = reduce.reduceat(values[order], boundaries) if num_rows else values[:0]
+
+        df = pd.DataFrame(result)
+        if not group_by and df.empty:
+            df = pd.DataFrame({output: [0 if aggregation in ('count', 'nunique', 'sum') else np.nan]
+                               for output, (_, aggregation) in aggregates.items()})
+        logger.info(
+            f"Star query group_by={group_by} filters={list((filters or {}).keys())}: "
+            f"{num_rows} rows -> {len(df)} groups in {(time.perf_counter() - start) * 1000:.1f} ms"
+        )
+        return df
+
+    def sales_analysis(self, filters: Optional[Dict[str, FilterValue]] = None) -> pd.DataFrame:
+        """
+        The vw_sales_analysis aggregates: sales, quantity and order counts by
+        year, month, product_line, country, status and deal_size.
+        """
+        return self.query(
+            group_by=['year', 'month', 'product_line', 'country', 'status', 'deal_size'],
+            filters=filters,
+        )
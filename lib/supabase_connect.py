@@ -1,11 +1,22 @@
+from __future__ import annotations
+
 import os
-from supabase import create_client, Client
-from postgrest import APIResponse
 import pandas as pd
 import numpy as np
 import logging
+import time
+from typing import TYPE_CHECKING, Optional
+
+from lib.date_parsing import format_iso_dates
+from lib.schema import to_object_dtypes
+from lib.logger import get_run_metrics, progress
+
+# The supabase client stack (gotrue, postgrest, realtime, storage, httpx...)
+# takes a while to import, it is only loaded once a client is created
+if TYPE_CHECKING:
+    from supabase import Client
+    from postgrest import APIResponse
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Load Supabase URL and API key from environment variables for security
@@ -16,6 +27,8 @@ def get_supabase_client() -> Client:
     """
     Initializes and returns a Supabase client.
     """
+    from supabase import create_client
+
     if not SUPABASE_URL or not SUPABASE_KEY:
         raise ValueError("Supabase URL or API key not set in environment variables.")
     supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
@@ -131,7 +144,8 @@ def delete_all_records(client: Client, table_name: str) -> list:
 # --------------------------------------------------------------------------
 #  Function to Upload a DataFrame to a Supabase Table
 # --------------------------------------------------------------------------
-def upload_df_to_supabase(client: Client, df: pd.DataFrame, table_name: str, batch_size: int = 1000) -> bool:
+def upload_df_to_supabase(client: Client, df: pd.DataFrame, table_name: str, batch_size: int = 1000,
+                          clear_table: bool = True, on_conflict: Optional[str] = None) -> bool:
     """
     Deletes all existing data and uploads a DataFrame to a Supabase table in batches.
     This version is more resilient and will proceed with an upload even if the initial delete fails.
@@ -141,6 +155,10 @@ def upload_df_to_supabase(client: Client, df: pd.DataFrame, table_name: str, bat
         df: The pandas DataFrame to upload.
         table_name: The name of the destination table in Supabase.
         batch_size: The number of rows to insert in each batch.
+        clear_table: If False, skip the delete step and append to the existing rows
+            (used by the streaming pipeline, which clears the tables once up front).
+        on_conflict: Comma-separated key columns. If given, rows are upserted:
+            existing rows with the same key are updated instead of failing.
 
     Returns:
         True if the upload was successful, False otherwise.
@@ -150,7 +168,7 @@ def upload_df_to_supabase(client: Client, df: pd.DataFrame, table_name: str, bat
     # 1. Attempt to delete all existing records.
     # This is now a "best-effort" step. If it fails, we log a warning and continue.
     # The subsequent insert will act as the definitive success/fail check.
-    if not delete_all_records(client, table_name):
+    if clear_table and not delete_all_records(client, table_name):
         logger.warning(
             f"Could not clear table '{table_name}' before upload. "
             f"Proceeding with insert anyway. This may fail if there are duplicate primary keys."
@@ -158,11 +176,11 @@ def upload_df_to_supabase(client: Client, df: pd.DataFrame, table_name: str, bat
 
     # 2. Prepare the DataFrame for upload
     # Replace pandas NaN with None for database compatibility
-    df_clean = df.replace({np.nan: None})
+    df_clean = to_object_dtypes(df).replace({np.nan: None})
     
     # Convert date columns to string format 'YYYY-MM-DD' if they exist
     if 'order_date' in df_clean.columns:
-        df_clean['order_date'] = pd.to_datetime(df_clean['order_date']).dt.strftime('%Y-%m-%d')
+        df_clean['order_date'] = format_iso_dates(df['order_date'])
 
     # Convert DataFrame to a list of dictionaries
     records = df_clean.to_dict(orient='records')
@@ -175,10 +193,16 @@ def upload_df_to_supabase(client: Client, df: pd.DataFrame, table_name: str, bat
     total_rows = len(records)
     for i in range(0, total_rows, batch_size):
         batch = records[i:i + batch_size]
-        logger.info(f"Uploading batch {i//batch_size + 1}: rows {i+1} to {min(i+batch_size, total_rows)} for '{table_name}'.")
+        logger.info("Uploading batch %d: rows %d to %d for '%s'.", i//batch_size + 1, i+1,
+                    min(i+batch_size, total_rows), table_name, extra=progress(table_name))
         
         try:
-            response: APIResponse = client.from_(table_name).insert(batch).execute()
+            start = time.perf_counter()
+            table = client.from_(table_name)
+            request = table.upsert(batch, on_conflict=on_conflict) if on_conflict else table.insert(batch)
+            response: APIResponse = request.execute()
+            get_run_metrics().add_counter(f"upload.{table_name}", rows=len(batch),
+                                          seconds=time.perf_counter() - start)
             
             # The API response for an insert should contain a list of the inserted records.
             # If the length of the response data doesn't match the batch size, it's an error.
@@ -194,6 +218,7 @@ def upload_df_to_supabase(client: Client, df: pd.DataFrame, table_name: str, bat
     return True
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
     try:
         supabase_client = get_supabase_client()
         print("Successfully connected to Supabase!")
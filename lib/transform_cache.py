@@ -0,0 +1,256 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from lib import data_transform, file_load
+from lib.profiling import file_content_hash
+
+logger = logging.getLogger(__name__)
+
+# Modules whose code determines the content of the transformed tables. Any
+# change to them invalidates every cached table.
+TRANSFORM_MODULES = ('data_transform.py', 'date_parsing.py', 'schema.py', 'validation.py')
+
+# Raw columns each table is built from. A table is rebuilt when the content
+# of these columns (or of the tables it depends on) changes.
+TABLE_INPUT_COLUMNS: Dict[str, List[str]] = {
+    'dim_date': ['ORDERDATE'],
+    'dim_product': ['PRODUCTCODE', 'PRODUCTLINE', 'MSRP'],
+    'dim_customer': [
+        'CUSTOMERNAME', 'CONTACTFIRSTNAME', 'CONTACTLASTNAME', 'PHONE',
+        'ADDRESSLINE1', 'ADDRESSLINE2', 'CITY', 'STATE', 'POSTALCODE',
+        'COUNTRY', 'TERRITORY'
+    ],
+    'dim_order': ['ORDERNUMBER', 'STATUS'],
+    'fact_sales': [
+        'ORDERNUMBER', 'PRODUCTCODE', 'CUSTOMERNAME', 'ORDERDATE', 'SALES',
+        'QUANTITYORDERED', 'PRICEEACH', 'DEALSIZE', 'ORDERLINENUMBER'
+    ],
+}
+TABLE_DEPENDENCIES: Dict[str, List[str]] = {
+    'fact_sales': ['dim_date', 'dim_product', 'dim_customer', 'dim_order'],
+}
+
+INDEX_FILE = 'index.json'
+DEFAULT_MAX_BYTES = 2 * 1024**3
+DEFAULT_MAX_ENTRIES = 50
+
+
+def transform_code_version() -> str:
+    """Hash of the source of TRANSFORM_MODULES."""
+    digest = hashlib.sha256()
+    lib_dir = Path(__file__).parent
+    for module in TRANSFORM_MODULES:
+        digest.update(module.encode())
+        digest.update((lib_dir / module).read_bytes())
+    return digest.hexdigest()[:16]
+
+def fingerprint_file(file_path: str, full_hash: bool = False,
+                     sample_blocks: int = 16, block_size: int = 64 * 1024) -> str:
+    """
+    Fingerprints an input file.
+
+    The fast fingerprint hashes the size, the modification time and
+    `sample_blocks` blocks spread evenly over the file (always including the
+    first and the last block), so it costs the same for a 10 MB and a 10 GB
+    file. `full_hash` hashes the whole content instead, which also catches
+    edits that keep size and mtime and miss every sampled block.
+    """
+    file_path = Path(file_path)
+    if full_hash:
+        return f"full-{file_content_hash(str(file_path))}"
+
+    stat = file_path.stat()
+    digest = hashlib.sha256(f"{stat.st_size}:{stat.st_mtime_ns}".encode())
+    with open(file_path, 'rb') as f:
+        if stat.st_size <= sample_blocks * block_size:
+            digest.update(f.read())
+        else:
+            step = (stat.st_size - block_size) // (sample_blocks - 1)
+            for i in range(sample_blocks):
+                f.seek(i * step)
+                digest.update(f.read(block_size))
+    return f"fast-{digest.hexdigest()}"
+
+def fingerprint_files(file_paths: List[str], full_hash: bool = False) -> str:
+    """Fingerprint of a set of input files (see `fingerprint_file`)."""
+    if len(file_paths) == 1:
+        return fingerprint_file(file_paths[0], full_hash=full_hash)
+    digest = hashlib.sha256()
+    for file_path in file_paths:
+        digest.update(Path(file_path).name.encode())
+        digest.update(fingerprint_file(file_path, full_hash=full_hash).encode())
+    return f"{'full' if full_hash else 'fast'}-{len(file_paths)}files-{digest.hexdigest()}"
+
+def hash_columns(df: pd.DataFrame, columns: List[str]) -> str:
+    """Order-sensitive hash of the content of `columns`."""
+    row_hashes = pd.util.hash_pandas_object(df[columns], index=False)
+    return hashlib.sha256(row_hashes.to_numpy().tobytes()).hexdigest()
+
+
+class TransformCache:
+    """
+    Size-bounded cache of transformed tables, stored as Arrow IPC files.
+
+    Two levels of keys are used:
+
+    - an input file fingerprint (plus the code version) maps to the keys of
+      all five tables built from it, so an unchanged file skips both the load
+      and the transform stages;
+    - every table is stored under a key derived from the content of its input
+      columns, its dependencies and the code version, so for a changed file
+      only the tables whose inputs changed are rebuilt.
+
+    The least recently used tables are evicted once the cache holds more
+    than `max_bytes` or `max_entries` tables.
+    """
+
+    def __init__(self, cache_dir: str = 'state/transform_cache',
+                 max_bytes: int = DEFAULT_MAX_BYTES,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.code_version = transform_code_version()
+        self.hits: List[str] = []
+        self.misses: List[str] = []
+        self._lock = threading.Lock()
+
+    # --- index of input files -------------------------------------------
+    def _load_index(self) -> Dict[str, Dict[str, str]]:
+        index_path = self.cache_dir / INDEX_FILE
+        if not index_path.exists():
+            return {}
+        try:
+            with open(index_path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable transform cache index '{index_path}': {e}")
+            return {}
+
+    def _save_index(self, index: Dict[str, Dict[str, str]]):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        index_path = self.cache_dir / INDEX_FILE
+        tmp_path = index_path.with_suffix('.json.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f, indent=2)
+        os.replace(tmp_path, index_path)
+
+    def _file_key(self, fingerprint: str) -> str:
+        return f"{fingerprint}:{self.code_version}"
+
+    def lookup_file(self, fingerprint: str) -> Optional[Dict[str, pd.DataFrame]]:
+        """
+        Returns every table built from the input file with `fingerprint`, or
+        None unless all of them are cached.
+        """
+        table_keys = self._load_index().get(self._file_key(fingerprint))
+        if not table_keys:
+            return None
+        tables = {}
+        for table_name, key in table_keys.items():
+            df = self.get(key)
+            if df is None:
+                return None
+            tables[table_name] = df
+        logger.info(f"Transform cache hit for input file {fingerprint[:21]}: {list(tables)}")
+        return tables
+
+    def record_file(self, fingerprint: str, table_keys: Dict[str, str]):
+        """Maps the input file `fingerprint` to the keys of its tables."""
+        index = self._load_index()
+        index[self._file_key(fingerprint)] = table_keys
+        # Forget input files whose tables have been evicted
+        index = {file_key: keys for file_key, keys in index.items()
+                 if all(self._path(key).exists() for key in keys.values())}
+        self._save_index(index)
+
+    # --- tables -----------------------------------------------------------
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.arrow"
+
+    def table_keys(self, raw_df: pd.DataFrame) -> Dict[str, str]:
+        """Content key of every table in TABLE_INPUT_COLUMNS, for `raw_df`."""
+        keys = {}
+        for table_name, columns in TABLE_INPUT_COLUMNS.items():
+            digest = hashlib.sha256(f"{table_name}:{self.code_version}".encode())
+            digest.update(hash_columns(raw_df, columns).encode())
+            for dependency in TABLE_DEPENDENCIES.get(table_name, []):
+                digest.update(keys[dependency].encode())
+            keys[table_name] = f"{table_name}-{digest.hexdigest()[:32]}"
+        return keys
+
+    def get(self, key: str) -> Optional[pd.DataFrame]:
+        """Returns the cached table, or None."""
+        path = self._path(key)
+        if not path.exists():
+            return None
+        try:
+            df = file_load.read_columnar(str(self.cache_dir), path.name)
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable cached table '{path}': {e}")
+            return None
+        path.touch()
+        return df
+
+    def put(self, key: str, df: pd.DataFrame):
+        """Stores a table and evicts the least recently used ones if needed. Thread-safe."""
+        data_transform.save_df_to_arrow(df, str(self.cache_dir), self._path(key).name)
+        with self._lock:
+            self._evict()
+
+    def _evict(self):
+        tables = sorted(self.cache_dir.glob('*.arrow'), key=lambda p: p.stat().st_mtime, reverse=True)
+        total_bytes = 0
+        for i, path in enumerate(tables):
+            total_bytes += path.stat().st_size
+            if i >= self.max_entries or total_bytes > self.max_bytes:
+                logger.info(f"Evicting cached table '{path.name}'")
+                path.unlink(missing_ok=True)
+
+    def get_or_build(self, table_name: str, key: str, build: Callable[[], pd.DataFrame]) -> pd.DataFrame:
+        """Returns the table cached under `key`, or builds and caches it."""
+        df = self.get(key)
+        if df is None:
+            with self._lock:
+                self.misses.append(table_name)
+            df = build()
+            self.put(key, df)
+        else:
+            with self._lock:
+                self.hits.append(table_name)
+        return df
+
+    def build_tables(self, raw_df: pd.DataFrame,
+                     builders: Dict[str, Callable[[pd.DataFrame, Dict[str, pd.DataFrame]], pd.DataFrame]]
+                     ) -> Tuple[Dict[str, pd.DataFrame], Dict[str, str]]:
+        """
+        Builds the tables of `raw_df`, reusing cached tables whose inputs are unchanged.
+
+        Parameters:
+        -----------
+        raw_df : pd.DataFrame
+            The loaded extract.
+        builders : Dict[str, Callable]
+            Table name -> function(raw_df, tables built so far) returning the
+            table. Dependencies must come before the tables that use them.
+
+        Returns:
+        --------
+        Tuple[Dict[str, pd.DataFrame], Dict[str, str]]
+            The tables and their cache keys (for `record_file`).
+        """
+        keys = self.table_keys(raw_df)
+        tables = {}
+        for table_name, build in builders.items():
+            tables[table_name] = self.get_or_build(table_name, keys[table_name],
+                                                   lambda: build(raw_df, tables))
+
+        logger.info(f"Transform cache: reused {self.hits or 'no tables'}, rebuilt {self.misses or 'no tables'}")
+        return tables, {name: keys[name] for name in builders}
@@ -0,0 +1,189 @@
+import bisect
+import hashlib
+import logging
+import sqlite3
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import List, Sequence, Tuple
+
+import pandas as pd
+
+from lib.transform_cache import hash_columns
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_JOURNAL_PATH = 'state/upload_journal.sqlite'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    fingerprint TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    started_at TEXT NOT NULL,
+    finished_at TEXT
+);
+CREATE TABLE IF NOT EXISTS batches (
+    fingerprint TEXT NOT NULL,
+    table_name TEXT NOT NULL,
+    first_row INTEGER NOT NULL,
+    rows INTEGER NOT NULL,
+    batch_id TEXT NOT NULL,
+    committed_at TEXT NOT NULL,
+    PRIMARY KEY (fingerprint, table_name, first_row)
+);
+"""
+
+
+def fingerprint_tables(tables: Sequence[Tuple[str, pd.DataFrame]]) -> str:
+    """Order-sensitive fingerprint of the content of a set of tables, used as the run key."""
+    digest = hashlib.sha256()
+    for table_name, df in tables:
+        digest.update(table_name.encode())
+        digest.update(hash_columns(df, list(df.columns)).encode())
+    return digest.hexdigest()
+
+
+@dataclass
+class TableCheckpoint:
+    """
+    The committed batches of one table within a journal run.
+
+    Passed to `ConcurrentUploader.upload`, which skips the committed row
+    ranges and records every batch once the server has accepted it.
+    """
+    journal: 'UploadJournal'
+    fingerprint: str
+    table_name: str
+    committed: List[Tuple[int, int]] = field(default_factory=list)
+
+    @property
+    def resumed(self) -> bool:
+        """True if part of the table was already uploaded by an earlier attempt."""
+        return bool(self.committed)
+
+    @property
+    def committed_rows(self) -> int:
+        return sum(rows for _, rows in self.committed)
+
+    def batch_id(self, first_row: int, rows: int) -> str:
+        """Deterministic ID of a batch: the same rows of the same data always get the same ID."""
+        return f"{self.table_name}:{self.fingerprint[:16]}:{first_row}+{rows}"
+
+    def next_pending(self, offset: int, total_rows: int) -> Tuple[int, int]:
+        """
+        Returns (first_row, max_rows) of the next uncommitted range at or after
+        `offset`. max_rows stops at the next committed range; it is 0 when
+        every remaining row is committed.
+        """
+        index = max(bisect.bisect_right(self.committed, (offset, float('inf'))) - 1, 0)
+        for start, rows in self.committed[index:]:
+            if start + rows <= offset:
+                continue
+            if start <= offset:
+                # Inside a committed range, continue after it
+                offset = start + rows
+                continue
+            return offset, min(start, total_rows) - offset
+        return offset, max(0, total_rows - offset)
+
+    def record(self, first_row: int, rows: int):
+        """Marks a batch as committed."""
+        self.journal.record_batch(self.fingerprint, self.table_name, first_row, rows,
+                                  self.batch_id(first_row, rows))
+
+
+class UploadJournal:
+    """
+    Crash-safe checkpoint journal of the batches uploaded to Supabase.
+
+    Every accepted batch is recorded in a local SQLite database (table, run
+    fingerprint, first row, row count, batch ID), committed before the next
+    batch is recorded. A run is keyed by the fingerprint of the content of
+    all tables being uploaded: when a run fails, the next run with the same
+    data resumes it, skipping the committed batches, instead of clearing the
+    tables and starting over. A run with different data starts from scratch.
+
+    Usage:
+        journal = UploadJournal()
+        resumed = journal.begin_run(fingerprint)
+        checkpoint = journal.table(fingerprint, 'cg_fact_sales')
+        uploader.upload(df, 'cg_fact_sales', checkpoint=checkpoint, resumed=resumed)
+        journal.finish_run(fingerprint)
+    """
+
+    def __init__(self, path: str = DEFAULT_JOURNAL_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Batches are recorded from the uploader threads, one connection behind a lock
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=FULL")
+            self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def begin_run(self, fingerprint: str) -> bool:
+        """
+        Starts or resumes the run for `fingerprint`.
+
+        Returns:
+            True if an unfinished run with the same fingerprint exists, i.e.
+            the tables must not be cleared and the committed batches are
+            skipped. False if a fresh run was started.
+        """
+        now = datetime.now().isoformat(timespec='seconds')
+        with self._lock:
+            row = self._conn.execute("SELECT status FROM runs WHERE fingerprint = ?", (fingerprint,)).fetchone()
+            if row is not None and row[0] == 'running':
+                return True
+
+            # Only the current run is kept, older runs can never be resumed
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.execute("DELETE FROM batches")
+            self._conn.execute("DELETE FROM runs")
+            self._conn.execute(
+                "INSERT INTO runs (fingerprint, status, started_at) VALUES (?, 'running', ?)", (fingerprint, now)
+            )
+            self._conn.execute("COMMIT")
+        return False
+
+    def finish_run(self, fingerprint: str):
+        """Marks a run as complete, a later run with the same data starts over."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE runs SET status = 'done', finished_at = ? WHERE fingerprint = ?",
+                (datetime.now().isoformat(timespec='seconds'), fingerprint)
+            )
+
+    def committed_ranges(self, fingerprint: str, table_name: str) -> List[Tuple[int, int]]:
+        """The (first_row, rows) ranges of `table_name` committed in the run, sorted."""
+        with self._lock:
+            return [tuple(row) for row in self._conn.execute(
+                "SELECT first_row, rows FROM batches WHERE fingerprint = ? AND table_name = ? ORDER BY first_row",
+                (fingerprint, table_name)
+            )]
+
+    def record_batch(self, fingerprint: str, table_name: str, first_row: int, rows: int, batch_id: str):
+        """Records one committed batch (durably, before returning)."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO batches (fingerprint, table_name, first_row, rows, batch_id, committed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (fingerprint, table_name, first_row, rows, batch_id, datetime.now().isoformat(timespec='seconds'))
+            )
+
+    def table(self, fingerprint: str, table_name: str) -> TableCheckpoint:
+        """Returns the checkpoint of one table in the run, loaded with its committed batches."""
+        checkpoint = TableCheckpoint(self, fingerprint, table_name,
+                                     committed=self.committed_ranges(fingerprint, table_name))
+        if checkpoint.resumed:
+            logger.info(
+                f"Resuming '{table_name}': {checkpoint.committed_rows} rows in "
+                f"{len(checkpoint.committed)} batches already committed."
+            )
+        return checkpoint
@@ -0,0 +1,238 @@
+import logging
+import os
+import re
+from dataclasses import dataclass, field
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from lib.date_parsing import ORDERDATE_FORMAT, parse_order_dates
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_SQL_PATH = Path(__file__).resolve().parent.parent / 'scripts' / 'database_schema.sql'
+
+# Raw extract column -> the database column it is loaded into
+RAW_COLUMN_TARGETS: Dict[str, Tuple[str, str]] = {
+    'ORDERNUMBER': ('cg_fact_sales', 'order_number'),
+    'QUANTITYORDERED': ('cg_fact_sales', 'quantity_ordered'),
+    'PRICEEACH': ('cg_fact_sales', 'price_each'),
+    'ORDERLINENUMBER': ('cg_fact_sales', 'order_line_number'),
+    'SALES': ('cg_fact_sales', 'sales'),
+    'ORDERDATE': ('cg_dim_date', 'order_date'),
+    'STATUS': ('cg_dim_order', 'status'),
+    'PRODUCTLINE': ('cg_dim_product', 'product_line'),
+    'MSRP': ('cg_dim_product', 'msrp'),
+    'PRODUCTCODE': ('cg_fact_sales', 'product_code'),
+    'CUSTOMERNAME': ('cg_fact_sales', 'customer_name'),
+    'PHONE': ('cg_dim_customer', 'phone'),
+    'ADDRESSLINE1': ('cg_dim_customer', 'addressline1'),
+    'ADDRESSLINE2': ('cg_dim_customer', 'addressline2'),
+    'CITY': ('cg_dim_customer', 'city'),
+    'STATE': ('cg_dim_customer', 'state'),
+    'POSTALCODE': ('cg_dim_customer', 'postalcode'),
+    'COUNTRY': ('cg_dim_customer', 'country'),
+    'TERRITORY': ('cg_dim_customer', 'territory'),
+    'CONTACTLASTNAME': ('cg_dim_customer', 'contact_last_name'),
+    'CONTACTFIRSTNAME': ('cg_dim_customer', 'contact_first_name'),
+    'DEALSIZE': ('cg_fact_sales', 'deal_size'),
+}
+
+# Name of the column listing the failed rules in the quarantine file
+ERRORS_COLUMN = 'validation_errors'
+
+INT_RANGE = (-2**31, 2**31 - 1)
+
+_COLUMN_PATTERN = re.compile(
+    r'^\s*(?P<name>\w+)\s+(?P<type>VARCHAR\((?P<length>\d+)\)|DECIMAL\((?P<precision>\d+),\s*(?P<scale>\d+)\)'
+    r'|INT|SERIAL|DATE)(?P<constraints>[^,]*)',
+    re.IGNORECASE
+)
+
+
+@dataclass
+class ColumnRule:
+    """Checks of one raw column, derived from the type of its database column."""
+    column: str
+    target: str
+    kind: str  # 'text', 'int', 'decimal' or 'date'
+    nullable: bool = True
+    max_length: Optional[int] = None
+    max_abs: Optional[float] = None
+
+
+@dataclass
+class ValidationResult:
+    """The rows that passed and the quarantined ones, with the failure count per rule."""
+    clean: pd.DataFrame
+    quarantined: pd.DataFrame
+    failures: Dict[str, int] = field(default_factory=dict)
+
+
+@lru_cache(maxsize=None)
+def parse_schema(sql_path: str = str(SCHEMA_SQL_PATH)) -> Dict[Tuple[str, str], Dict]:
+    """
+    Reads the column types of the CREATE TABLE statements in `sql_path`.
+
+    Returns:
+        (table, column) -> {'type', 'length', 'precision', 'scale', 'not_null'}.
+        Primary keys and foreign keys count as not null: a NULL key cannot
+        be upserted or resolved against its dimension.
+    """
+    with open(sql_path, encoding='utf-8') as f:
+        sql = f.read()
+
+    columns = {}
+    for table, body in re.findall(r'CREATE TABLE\s+(\w+)\s*\((.*?)\);', sql, re.IGNORECASE | re.DOTALL):
+        for line in body.splitlines():
+            match = _COLUMN_PATTERN.match(line.split('--')[0])
+            if match is None:
+                continue
+            constraints = match.group('constraints').upper()
+            columns[(table.lower(), match.group('name').lower())] = {
+                'type': match.group('type').split('(')[0].upper(),
+                'length': int(match.group('length')) if match.group('length') else None,
+                'precision': int(match.group('precision')) if match.group('precision') else None,
+                'scale': int(match.group('scale')) if match.group('scale') else None,
+                'not_null': any(word in constraints for word in ('PRIMARY KEY', 'REFERENCES', 'NOT NULL')),
+            }
+    return columns
+
+def build_rules(sql_path: str = str(SCHEMA_SQL_PATH)) -> List[ColumnRule]:
+    """The validation rules of every raw column in RAW_COLUMN_TARGETS."""
+    schema = parse_schema(sql_path)
+    rules = []
+    for column, (table, target_column) in RAW_COLUMN_TARGETS.items():
+        spec = schema.get((table, target_column))
+        if spec is None:
+            raise ValueError(f"Column '{table}.{target_column}' not found in '{sql_path}'")
+        rule = ColumnRule(column, f"{table}.{target_column}", kind='text', nullable=not spec['not_null'])
+        if column == 'ORDERDATE':
+            # Parsed into date_key, the key of the date dimension
+            rule.kind, rule.nullable = 'date', False
+        elif spec['type'] == 'VARCHAR':
+            rule.max_length = spec['length']
+        elif spec['type'] in ('INT', 'SERIAL'):
+            rule.kind = 'int'
+        elif spec['type'] == 'DECIMAL':
+            rule.kind = 'decimal'
+            rule.max_abs = 10.0 ** (spec['precision'] - spec['scale'])
+        rules.append(rule)
+    return rules
+
+
+def _per_value(values: pd.Series, check) -> np.ndarray:
+    """
+    Applies `check` (distinct values -> boolean array of failures) once per
+    distinct value and maps the result back to the rows.
+    """
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        codes = values.cat.codes.to_numpy()
+        failed = np.asarray(check(values.cat.categories.to_series(index=None)), dtype=bool)
+    else:
+        codes, uniques = pd.factorize(values)
+        failed = np.asarray(check(pd.Series(uniques)), dtype=bool)
+    # Missing values (code -1) are checked separately
+    return np.append(failed, False)[codes]
+
+def _unparseable_dates(values: pd.Series) -> np.ndarray:
+    # The parser of DateKeyCache, so every date that passes parses in the transform
+    return parse_order_dates(values, ORDERDATE_FORMAT, errors='coerce').isna()
+
+def _check_column(values: pd.Series, rule: ColumnRule) -> Dict[str, np.ndarray]:
+    """Failure masks of one column, keyed by rule name."""
+    failures = {}
+    missing = values.isna().to_numpy()
+    if not rule.nullable:
+        failures[f"{rule.column} is missing"] = missing
+
+    if rule.kind == 'text' and rule.max_length is not None:
+        failures[f"{rule.column} longer than {rule.max_length}"] = _per_value(
+            values, lambda uniques: uniques.astype(str).str.len().to_numpy() > rule.max_length
+        )
+    elif rule.kind == 'date':
+        failures[f"{rule.column} is not a date"] = _per_value(values, _unparseable_dates)
+    elif rule.kind in ('int', 'decimal'):
+        numbers = pd.to_numeric(values, errors='coerce').to_numpy(dtype=np.float64)
+        # Text in a numeric column, infinities and values beyond the column type
+        invalid = np.isnan(numbers) & ~missing
+        with np.errstate(invalid='ignore'):
+            if rule.kind == 'int':
+                invalid |= (numbers < INT_RANGE[0]) | (numbers > INT_RANGE[1]) | (np.floor(numbers) != numbers)
+            else:
+                invalid |= ~(np.abs(numbers) < rule.max_abs)
+        failures[f"{rule.column} out of range for {rule.target}"] = invalid & ~missing
+    return failures
+
+def validate_raw(df: pd.DataFrame, rules: Optional[List[ColumnRule]] = None) -> ValidationResult:
+    """
+    Checks every row of the raw extract against the database schema in one
+    vectorized pass per column: VARCHAR lengths, INT/DECIMAL ranges, missing
+    keys, ORDERDATE parseability. Text and categorical columns are checked
+    once per distinct value.
+
+    Every key of a clean row is present, parseable and fits its column, and
+    the dimensions are built from the clean rows only, so every clean fact
+    row resolves against its dimensions.
+
+    Returns:
+        The clean rows (attrs kept, index reset) and the quarantined rows
+        with an ERRORS_COLUMN listing the failed rules.
+    """
+    rules = rules if rules is not None else build_rules()
+    masks: Dict[str, np.ndarray] = {}
+    for rule in rules:
+        if rule.column in df.columns:
+            masks.update(_check_column(df[rule.column], rule))
+
+    bad = np.zeros(len(df), dtype=bool)
+    for mask in masks.values():
+        bad |= mask
+    failures = {name: int(mask.sum()) for name, mask in masks.items() if mask.any()}
+
+    if not bad.any():
+        return ValidationResult(df, df.iloc[0:0].assign(**{ERRORS_COLUMN: []}), failures)
+
+    quarantined = df[bad].copy()
+    reasons = [[] for _ in range(len(quarantined))]
+    for name, mask in masks.items():
+        for position in np.flatnonzero(mask[bad]):
+            reasons[position].append(name)
+    quarantined[ERRORS_COLUMN] = ['; '.join(row_reasons) for row_reasons in reasons]
+
+    clean = df[~bad].reset_index(drop=True)
+    clean.attrs = dict(df.attrs)
+    return ValidationResult(clean, quarantined, failures)
+
+def save_quarantine(quarantined: pd.DataFrame, folder: str, source_name: Optional[str] = None) -> Optional[Path]:
+    """
+    Writes the quarantined rows to `folder`/quarantine_<source>_<timestamp>.csv
+    (atomically). Returns the path, or None if there is nothing to write.
+    """
+    if quarantined.empty:
+        return None
+    output_dir = Path(folder)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    stem = Path(source_name).stem if source_name else 'extract'
+    file_path = output_dir / f"quarantine_{stem}_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.csv"
+    tmp_path = file_path.with_suffix('.csv.tmp')
+    quarantined.to_csv(tmp_path, index=False, encoding='utf-8')
+    os.replace(tmp_path, file_path)
+    return file_path
+
+def validate_and_quarantine(df: pd.DataFrame, folder: str, source_name: Optional[str] = None) -> pd.DataFrame:
+    """Validates `df`, writes the offending rows to the quarantine folder and returns the clean rows."""
+    result = validate_raw(df)
+    if not result.quarantined.empty:
+        path = save_quarantine(result.quarantined, folder, source_name)
+        logger.warning(
+            f"Quarantined {len(result.quarantined)} of {len(df)} rows in '{path}': "
+            + ", ".join(f"{name} ({count})" for name, count in result.failures.items())
+        )
+    else:
+        logger.info(f"Validation passed for all {len(df)} rows.")
+    return result.clean
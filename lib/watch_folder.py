@@ -0,0 +1,193 @@
+import fnmatch
+import logging
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from lib.logger import PROGRESS
+
+logger = logging.getLogger(__name__)
+
+# Editors, copy tools and our own writers use these for files being written
+IGNORED_PREFIXES = ('.', '~')
+IGNORED_SUFFIXES = ('.tmp', '.part', '.partial', '.crdownload')
+
+
+class FolderWatcher:
+    """
+    Watches a folder for new drops and hands the complete ones to a consumer.
+
+    A background thread polls the folder with `os.scandir` every
+    `poll_interval` seconds (one directory read, no per-file open). A file is
+    complete once its size and modification time have not changed for
+    `settle_seconds`, so files still being copied or uploaded are left alone.
+    Temporary names (hidden files, *.tmp, *.part...) are skipped; writers that
+    rename into place are picked up as soon as the rename is seen.
+
+    Complete files are put on a bounded queue (`max_queued`). When the
+    consumer falls behind the queue fills up and the scanner blocks, so the
+    backlog stays on disk instead of in memory (backpressure).
+
+    Usage:
+        watcher = FolderWatcher('data', is_new=lambda files: ledger.filter_new(files))
+        watcher.start()
+        while running:
+            files = watcher.next_batch(max_files=16, timeout=1.0)
+            if files:
+                ok = process(files)
+                watcher.done(files, success=ok)
+        watcher.stop()
+    """
+
+    def __init__(self, folder: str, pattern: str = '*.csv', settle_seconds: float = 5.0,
+                 poll_interval: float = 2.0, max_queued: int = 8, retry_delay: float = 60.0,
+                 is_new: Optional[Callable[[Sequence[Path]], List[Path]]] = None):
+        """
+        Args:
+            folder: Folder to watch.
+            pattern: fnmatch pattern of the files to pick up.
+            settle_seconds: How long a file must stay unchanged before it is handed out.
+            poll_interval: Seconds between two scans.
+            max_queued: Capacity of the work queue.
+            retry_delay: Seconds before a file whose processing failed is handed out again.
+            is_new: Optional filter of the complete files (e.g. IngestionLedger.filter_new),
+                files it drops are never handed out.
+        """
+        self.folder = Path(folder)
+        self.pattern = pattern
+        self.settle_seconds = settle_seconds
+        self.poll_interval = poll_interval
+        self.retry_delay = retry_delay
+        self.is_new = is_new
+        self.queue: "queue.Queue[Path]" = queue.Queue(maxsize=max_queued)
+
+        # path -> ((size, mtime_ns), monotonic time it was first seen with that identity)
+        self._pending: Dict[Path, Tuple[Tuple[int, int], float]] = {}
+        # path -> identity of the files queued or being processed
+        self._handed_out: Dict[Path, Tuple[int, int]] = {}
+        # path -> monotonic time before which a failed file is not retried
+        self._retry_after: Dict[Path, float] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="folder-watcher", daemon=True)
+        self._thread.start()
+        logger.info(f"Watching '{self.folder}' for '{self.pattern}' "
+                    f"(poll {self.poll_interval}s, settle {self.settle_seconds}s)")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.scan()
+            except Exception as e:
+                # A folder that is briefly unavailable must not kill the daemon
+                logger.error(f"Scanning '{self.folder}' failed: {e}")
+            self._stop.wait(self.poll_interval)
+
+    def _list_files(self) -> Dict[Path, Tuple[int, int]]:
+        files = {}
+        try:
+            entries = list(os.scandir(self.folder))
+        except FileNotFoundError:
+            return files
+        for entry in entries:
+            name = entry.name
+            if name.startswith(IGNORED_PREFIXES) or name.lower().endswith(IGNORED_SUFFIXES):
+                continue
+            if not fnmatch.fnmatch(name, self.pattern):
+                continue
+            try:
+                if not entry.is_file():
+                    continue
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue  # removed since the directory was read
+            files[Path(entry.path)] = (int(stat.st_size), int(stat.st_mtime_ns))
+        return files
+
+    def scan(self) -> List[Path]:
+        """One polling pass. Queues and returns the files that became complete."""
+        now = time.monotonic()
+        files = self._list_files()
+        settled = []
+        with self._lock:
+            for path in list(self._pending):
+                if path not in files:
+                    del self._pending[path]
+            for path, identity in files.items():
+                if self._handed_out.get(path) == identity:
+                    continue
+                if self._retry_after.get(path, 0.0) > now:
+                    continue
+                previous = self._pending.get(path)
+                if previous is None or previous[0] != identity:
+                    # New, or still being written: restart the settle clock
+                    self._pending[path] = (identity, now)
+                elif identity[0] > 0 and now - previous[1] >= self.settle_seconds:
+                    settled.append(path)
+
+        if settled and self.is_new is not None:
+            new_files = set(self.is_new(settled))
+            with self._lock:
+                for path in settled:
+                    if path not in new_files:
+                        # Already ingested, only looked at again if it changes
+                        self._pending.pop(path, None)
+                        self._handed_out[path] = files[path]
+            settled = [path for path in settled if path in new_files]
+
+        queued = []
+        for path in sorted(settled, key=lambda p: files[p][1]):
+            with self._lock:
+                self._pending.pop(path, None)
+                self._retry_after.pop(path, None)
+                self._handed_out[path] = files[path]
+            # Blocks while the queue is full: the scanner waits for the consumer
+            while not self._stop.is_set():
+                try:
+                    self.queue.put(path, timeout=self.poll_interval)
+                    break
+                except queue.Full:
+                    logger.info("Work queue full, waiting for the pipeline to catch up.", extra=PROGRESS)
+            queued.append(path)
+        if queued:
+            logger.info(f"New file(s) ready: {[p.name for p in queued]}")
+        return queued
+
+    def next_batch(self, max_files: int = 16, timeout: Optional[float] = None) -> List[Path]:
+        """
+        Waits up to `timeout` seconds for a complete file, then takes every
+        other queued file too (at most `max_files`). Returns [] on timeout.
+        """
+        try:
+            batch = [self.queue.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+        while len(batch) < max_files:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def done(self, files: Sequence[Path], success: bool):
+        """
+        Reports the outcome of a batch. Failed files are handed out again
+        after `retry_delay`; successful ones only if they change.
+        """
+        with self._lock:
+            for path in files:
+                path = Path(path)
+                if not success:
+                    self._handed_out.pop(path, None)
+                    self._retry_after[path] = time.monotonic() + self.retry_delay
@@ -0,0 +1,58 @@
+-- Slowly changing dimension (Type 2) history of the customer and product
+-- dimensions, maintained by lib/dimension_history.py (DIMENSION_HISTORY in app.py).
+-- One row per version: a change to any attribute closes the current version
+-- (valid_to, is_current = FALSE) and inserts a new one. attr_hash is the
+-- 64-bit hash of the tracked attributes the pipeline compares on.
+-- Requires update_updated_at_column() from scripts/Creare_Update_Datetime.sql.
+
+CREATE TABLE IF NOT EXISTS cg_dim_product_history (
+    product_code VARCHAR(20) NOT NULL,
+    product_line VARCHAR(50),
+    msrp DECIMAL(10,2),
+    attr_hash BIGINT NOT NULL,
+    valid_from TIMESTAMPTZ NOT NULL,
+    valid_to TIMESTAMPTZ,
+    is_current BOOLEAN NOT NULL DEFAULT TRUE,
+    created_at TIMESTAMPTZ DEFAULT now(),
+    updated_at TIMESTAMPTZ DEFAULT now(),
+    PRIMARY KEY (product_code, valid_from)
+);
+
+-- At most one current version per product
+CREATE UNIQUE INDEX IF NOT EXISTS uq_dim_product_history_current
+    ON cg_dim_product_history (product_code) WHERE is_current;
+
+CREATE TRIGGER update_cg_dim_product_history_updated_at
+BEFORE UPDATE ON cg_dim_product_history
+FOR EACH ROW
+EXECUTE FUNCTION update_updated_at_column();
+
+CREATE TABLE IF NOT EXISTS cg_dim_customer_history (
+    customer_name VARCHAR(100) NOT NULL,
+    contact_first_name VARCHAR(50),
+    contact_last_name VARCHAR(50),
+    phone VARCHAR(30),
+    addressline1 VARCHAR(100),
+    addressline2 VARCHAR(100),
+    city VARCHAR(50),
+    state VARCHAR(20),
+    postalcode VARCHAR(20),
+    country VARCHAR(50),
+    territory VARCHAR(20),
+    attr_hash BIGINT NOT NULL,
+    valid_from TIMESTAMPTZ NOT NULL,
+    valid_to TIMESTAMPTZ,
+    is_current BOOLEAN NOT NULL DEFAULT TRUE,
+    created_at TIMESTAMPTZ DEFAULT now(),
+    updated_at TIMESTAMPTZ DEFAULT now(),
+    PRIMARY KEY (customer_name, valid_from)
+);
+
+-- At most one current version per customer
+CREATE UNIQUE INDEX IF NOT EXISTS uq_dim_customer_history_current
+    ON cg_dim_customer_history (customer_name) WHERE is_current;
+
+CREATE TRIGGER update_cg_dim_customer_history_updated_at
+BEFORE UPDATE ON cg_dim_customer_history
+FOR EACH ROW
+EXECUTE FUNCTION update_updated_at_column();
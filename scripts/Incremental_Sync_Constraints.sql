@@ -0,0 +1,5 @@
+-- Unique natural key for the fact table, required by the incremental sync.
+-- Upserts on cg_fact_sales use ON CONFLICT (order_number, order_line_number),
+-- which needs a unique constraint on exactly those columns.
+ALTER TABLE cg_fact_sales
+ADD CONSTRAINT uq_fact_sales_order_line UNIQUE (order_number, order_line_number);
@@ -0,0 +1,58 @@
+-- Pre-aggregated sales rollups built by lib/rollups.py.
+-- One row per time grain x product_line x country x territory x deal_size;
+-- missing attributes are stored as 'Unknown' so the keys can be primary keys
+-- (the incremental sync upserts on them, see TABLE_KEYS in lib/incremental_sync.py).
+
+CREATE TABLE IF NOT EXISTS cg_rollup_sales_daily (
+    date_key INT NOT NULL,
+    product_line VARCHAR(50) NOT NULL,
+    country VARCHAR(50) NOT NULL,
+    territory VARCHAR(50) NOT NULL,
+    deal_size VARCHAR(20) NOT NULL,
+    sales DECIMAL(14, 2) NOT NULL,
+    quantity_ordered INT NOT NULL,
+    order_count INT NOT NULL,
+    order_line_count INT NOT NULL,
+    PRIMARY KEY (date_key, product_line, country, territory, deal_size)
+);
+
+CREATE TABLE IF NOT EXISTS cg_rollup_sales_monthly (
+    year INT NOT NULL,
+    month INT NOT NULL,
+    product_line VARCHAR(50) NOT NULL,
+    country VARCHAR(50) NOT NULL,
+    territory VARCHAR(50) NOT NULL,
+    deal_size VARCHAR(20) NOT NULL,
+    sales DECIMAL(14, 2) NOT NULL,
+    quantity_ordered INT NOT NULL,
+    order_count INT NOT NULL,
+    order_line_count INT NOT NULL,
+    PRIMARY KEY (year, month, product_line, country, territory, deal_size)
+);
+
+CREATE TABLE IF NOT EXISTS cg_rollup_sales_quarterly (
+    year INT NOT NULL,
+    quarter INT NOT NULL,
+    product_line VARCHAR(50) NOT NULL,
+    country VARCHAR(50) NOT NULL,
+    territory VARCHAR(50) NOT NULL,
+    deal_size VARCHAR(20) NOT NULL,
+    sales DECIMAL(14, 2) NOT NULL,
+    quantity_ordered INT NOT NULL,
+    order_count INT NOT NULL,
+    order_line_count INT NOT NULL,
+    PRIMARY KEY (year, quarter, product_line, country, territory, deal_size)
+);
+
+CREATE TABLE IF NOT EXISTS cg_rollup_sales_yearly (
+    year INT NOT NULL,
+    product_line VARCHAR(50) NOT NULL,
+    country VARCHAR(50) NOT NULL,
+    territory VARCHAR(50) NOT NULL,
+    deal_size VARCHAR(20) NOT NULL,
+    sales DECIMAL(14, 2) NOT NULL,
+    quantity_ordered INT NOT NULL,
+    order_count INT NOT NULL,
+    order_line_count INT NOT NULL,
+    PRIMARY KEY (year, product_line, country, territory, deal_size)
+);
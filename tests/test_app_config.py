@@ -0,0 +1,101 @@
+import logging
+
+import pytest
+
+import app
+from app import PipelineConfig
+from lib import upload_journal
+
+logger = logging.getLogger('test_app_config')
+
+
+def build(config, **kwargs):
+    """The batch graph of `config` for the latest file, built without running it."""
+    arguments = dict(supabase_client=None, session=None, profiler=None, source_folder='data',
+                     source_file=None, source_files=None, ledger=None, output_folder='transformed_data')
+    arguments.update(kwargs)
+    return app.build_batch_pipeline(config, logger, **arguments)
+
+
+def parents(dag, task_name):
+    return set(dag.tasks[task_name].depends_on)
+
+
+def test_the_defaults_are_valid():
+    PipelineConfig().validate()
+    PipelineConfig(ingest_mode='multi', incremental_sync=True).validate()
+
+
+@pytest.mark.parametrize('settings', [
+    {'ingest_mode': 'all'},
+    {'profile_mode': 'fast'},
+    {'pipeline_workers': 0},
+    {'sink': 'mysql'},
+    {'sink': 'postgres', 'streaming_mode': True},
+    {'daemon_mode': True, 'streaming_mode': True},
+    # The rollups of new files only are refreshed from the incremental sync state
+    {'ingest_mode': 'multi'},
+    {'csv_reader': 'polars'},
+    {'dimension_history': True, 'streaming_mode': True},
+    {'dimension_history': True, 'concurrent_upload': False},
+])
+def test_invalid_settings_are_rejected(settings):
+    with pytest.raises(ValueError):
+        PipelineConfig(**settings).validate()
+
+
+def test_uploads_follow_the_foreign_keys():
+    dag = build(PipelineConfig(transform_cache=False))
+    # Every dependency exists and there is no cycle
+    dag.topological_order()
+
+    dimension_uploads = {f"upload_{table}" for table, output_name in app.TABLE_OUTPUTS if output_name != 'fact_sales'}
+    assert dimension_uploads < parents(dag, 'upload_cg_fact_sales')
+    # Nothing is cleared before every table is built
+    assert set(app.STAR_SCHEMA_BUILDERS) <= parents(dag, 'clear_tables')
+    assert 'record_transform_cache' not in dag.tasks and 'record_ingested_files' not in dag.tasks
+
+
+def test_incremental_sync_replaces_the_clear_and_upload_tasks(tmp_path):
+    dag = build(PipelineConfig(incremental_sync=True, transform_cache_folder=str(tmp_path)))
+
+    assert 'sync_supabase' in dag.tasks and 'clear_tables' not in dag.tasks
+    assert not any(name.startswith('upload_') for name in dag.tasks)
+    assert set(app.STAR_SCHEMA_BUILDERS) <= parents(dag, 'record_transform_cache')
+
+
+def test_postgres_sink_loads_every_table_in_one_task():
+    dag = build(PipelineConfig(sink='postgres', transform_cache=False))
+
+    assert set(app.STAR_SCHEMA_BUILDERS) <= parents(dag, 'load_postgres')
+    assert 'clear_tables' not in dag.tasks and 'sync_supabase' not in dag.tasks
+
+
+def test_journal_run_is_finished_after_every_upload(tmp_path):
+    journal = upload_journal.UploadJournal(str(tmp_path / 'journal.sqlite'))
+    try:
+        dag = build(PipelineConfig(transform_cache=False), session=object(), journal=journal)
+    finally:
+        journal.close()
+
+    uploads = {name for name in dag.tasks if name.startswith('upload_')}
+    assert uploads and uploads < parents(dag, 'finish_upload_journal')
+
+
+def test_rollups_are_built_from_the_fact_table_and_uploaded_with_it():
+    dag = build(PipelineConfig(transform_cache=False))
+
+    assert 'fact_sales' in parents(dag, 'rollups')
+    for table, output_name in app.ROLLUP_OUTPUTS:
+        assert parents(dag, output_name) == {'rollups'}
+        assert output_name in parents(dag, 'clear_tables')
+        assert f"save_{output_name}" in dag.tasks and f"upload_{table}" in dag.tasks
+    assert 'rollups' not in build(PipelineConfig(transform_cache=False, build_rollups=False)).tasks
+
+
+def test_dimension_history_is_planned_from_the_dimensions():
+    dag = build(PipelineConfig(transform_cache=False, dimension_history=True), session=object())
+
+    assert {'dim_customer', 'dim_product'} <= parents(dag, 'history_deltas')
+    assert parents(dag, 'apply_dimension_history') == {'history_deltas'}
+    assert 'history_deltas' not in build(PipelineConfig(transform_cache=False)).tasks
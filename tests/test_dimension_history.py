@@ -0,0 +1,73 @@
+import pandas as pd
+import pytest
+
+from benchmarks.stub_postgrest import start_stub_server
+from lib import concurrent_upload, dimension_history
+
+
+@pytest.fixture
+def stub_server():
+    server = start_stub_server(store_rows=True)
+    yield server
+    server.shutdown()
+
+
+@pytest.fixture
+def uploader(stub_server):
+    url = f"http://127.0.0.1:{stub_server.server_port}"
+    with concurrent_upload.get_rest_session(url, 'stub-key') as session:
+        yield concurrent_upload.ConcurrentUploader(session, max_in_flight=2)
+
+
+def dimensions(product_lines):
+    return {
+        'dim_product': pd.DataFrame({
+            'product_code': ['S10_1678', 'S10_1949'],
+            'product_line': product_lines,
+            'msrp': [95.0, 214.0],
+        }),
+        'dim_customer': pd.DataFrame({
+            'customer_name': ['Land of Toys Inc.'],
+            'country': ['USA'],
+            'territory': ['NA'],
+        }),
+    }
+
+
+def load(uploader, tables, state_dir):
+    deltas = dimension_history.plan_dimension_history(tables, str(state_dir))
+    assert dimension_history.apply_history(uploader, deltas, str(state_dir))
+    return {delta.table_name: delta for delta in deltas}
+
+
+def test_changed_attribute_expires_the_current_version_and_inserts_a_new_one(stub_server, uploader, tmp_path):
+    history = stub_server.state.tables
+
+    load(uploader, dimensions(['Motorcycles', 'Classic Cars']), tmp_path)
+    assert len(history['cg_dim_product_history']) == 2
+    assert all(row['is_current'] and row['valid_to'] is None for row in history['cg_dim_product_history'])
+
+    deltas = load(uploader, dimensions(['Vintage Cars', 'Classic Cars']), tmp_path)
+    valid_from = deltas['cg_dim_product_history'].valid_from
+
+    versions = [row for row in history['cg_dim_product_history'] if row['product_code'] == 'S10_1678']
+    assert len(versions) == 2
+    expired, current = sorted(versions, key=lambda row: row['is_current'])
+    assert (expired['product_line'], expired['is_current'], expired['valid_to']) == ('Motorcycles', False, valid_from)
+    assert (current['product_line'], current['is_current'], current['valid_to']) == ('Vintage Cars', True, None)
+    assert current['valid_from'] == valid_from
+
+    # The unchanged product and customer keep their single current version
+    unchanged = [row for row in history['cg_dim_product_history'] if row['product_code'] == 'S10_1949']
+    assert [(row['is_current'], row['valid_to']) for row in unchanged] == [(True, None)]
+    assert len(history['cg_dim_customer_history']) == 1
+
+
+def test_unchanged_dimensions_send_nothing(stub_server, uploader, tmp_path):
+    load(uploader, dimensions(['Motorcycles', 'Classic Cars']), tmp_path)
+    requests = stub_server.state.requests
+
+    deltas = load(uploader, dimensions(['Motorcycles', 'Classic Cars']), tmp_path)
+    assert all(delta.inserts.empty and delta.expired_keys.empty for delta in deltas.values())
+    assert stub_server.state.requests == requests
+    assert len(stub_server.state.tables['cg_dim_product_history']) == 2
@@ -0,0 +1,33 @@
+import pandas as pd
+import pytest
+
+from benchmarks.generate_sales import generate_sales_csv
+from lib import file_load, schema
+
+CSV_KWARGS = dict(encoding='latin1', dtype=schema.SALES_EXTRACT_DTYPES)
+
+
+@pytest.fixture(scope='module')
+def extract(tmp_path_factory):
+    csv_path = tmp_path_factory.mktemp('data') / 'sales.csv'
+    generate_sales_csv(str(csv_path), 3000)
+    return csv_path
+
+
+def test_arrow_reader_matches_read_latest_csv(extract):
+    pytest.importorskip('pyarrow.csv')
+    expected = file_load.read_latest_csv(str(extract.parent), file_name=extract.name, **CSV_KWARGS)
+
+    df = file_load.read_csv_parallel(str(extract.parent), file_name=extract.name, **CSV_KWARGS)
+
+    pd.testing.assert_frame_equal(df, expected)
+
+
+def test_byte_range_reader_matches_read_latest_csv(extract, monkeypatch):
+    # The fallback without pyarrow, split into several ranges even for a small file
+    monkeypatch.setattr(file_load, 'MIN_RANGE_BYTES', 1)
+    expected = file_load.read_latest_csv(str(extract.parent), file_name=extract.name, **CSV_KWARGS)
+
+    df = file_load._sort_categories(file_load._read_csv_ranges(extract, 3, CSV_KWARGS))
+
+    pd.testing.assert_frame_equal(df, expected)
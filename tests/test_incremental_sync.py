@@ -0,0 +1,70 @@
+import pandas as pd
+import pytest
+
+from lib import incremental_sync
+
+
+def fact_sales(lines):
+    """A cg_fact_sales table from (order_number, order_line_number, quantity_ordered) tuples."""
+    df = pd.DataFrame(lines, columns=['order_number', 'order_line_number', 'quantity_ordered'])
+    df['order_date'] = pd.Timestamp('2004-05-01')
+    return df
+
+
+def sync(df, manifest_dir):
+    """Plans a sync and saves its manifest, as a successful sync_star_schema run does."""
+    plan = incremental_sync.plan_table_sync(df, 'cg_fact_sales', str(manifest_dir))
+    incremental_sync.save_manifest(plan.manifest, str(manifest_dir), 'cg_fact_sales')
+    return plan
+
+
+def test_first_sync_is_a_full_refresh(tmp_path):
+    plan = sync(fact_sales([(10100, 1, 30), (10100, 2, 50)]), tmp_path)
+
+    assert plan.full_refresh
+    assert len(plan.upserts) == 2
+    assert plan.deleted_keys.empty
+
+
+def test_diff_against_the_saved_manifest(tmp_path):
+    sync(fact_sales([(10100, 1, 30), (10100, 2, 50), (10101, 1, 20)]), tmp_path)
+
+    # Line 10100/2 changed, 10101/1 is gone, 10102/1 is new
+    plan = sync(fact_sales([(10100, 1, 30), (10100, 2, 55), (10102, 1, 40)]), tmp_path)
+
+    assert not plan.full_refresh
+    assert (plan.inserted, plan.changed, plan.deleted) == (1, 1, 1)
+    assert plan.upserts[['order_number', 'order_line_number', 'quantity_ordered']].values.tolist() == [
+        [10100, 2, 55], [10102, 1, 40]
+    ]
+    assert plan.deleted_keys.values.tolist() == [[10101, 1]]
+
+
+def test_unchanged_table_sends_nothing(tmp_path):
+    sync(fact_sales([(10100, 1, 30), (10100, 2, 50)]), tmp_path)
+
+    plan = sync(fact_sales([(10100, 1, 30), (10100, 2, 50)]), tmp_path)
+
+    assert plan.upserts.empty and plan.deleted_keys.empty
+    assert plan.summary() == "'cg_fact_sales': 0 inserted, 0 changed, 0 deleted, 2 unchanged"
+
+
+def test_duplicate_natural_key_is_rejected(tmp_path):
+    with pytest.raises(ValueError, match="2 rows sharing a natural key"):
+        sync(fact_sales([(10100, 1, 30), (10100, 1, 31), (10100, 2, 50)]), tmp_path)
+
+
+def test_additive_sync_keeps_the_keys_of_earlier_drops(tmp_path):
+    incremental_sync.save_manifest(
+        incremental_sync.plan_table_sync(fact_sales([(10100, 1, 30), (10100, 2, 50)]), 'cg_fact_sales',
+                                         str(tmp_path)).manifest,
+        str(tmp_path), 'cg_fact_sales'
+    )
+
+    # The next drop only holds a new order and a correction of line 10100/2
+    plan = incremental_sync.plan_table_sync(fact_sales([(10100, 2, 55), (10101, 1, 20)]), 'cg_fact_sales',
+                                            str(tmp_path), additive=True)
+
+    assert (plan.inserted, plan.changed, plan.deleted) == (1, 1, 0)
+    assert plan.new_rows.tolist() == [False, True]
+    assert len(plan.manifest) == 3
@@ -0,0 +1,25 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from lib import json_records
+from lib.concurrent_upload import prepare_df_for_upload
+
+
+def test_batches_match_the_row_by_row_encoding():
+    df = pd.DataFrame({
+        'order_number': pd.array([10100, 10101, None], dtype='Int32'),
+        'sales': [2871.0, np.nan, np.inf],
+        'status': pd.Categorical(['Shipped', None, 'Shipped']),
+        'customer_name': ['Land of Toys Inc.', 'Müller "GmbH"', None],
+        'order_date': pd.to_datetime(['2003-02-24', '2003-05-07', '2003-07-01']),
+    })
+
+    payloads = list(json_records.iter_json_batches(df, batch_rows=2))
+
+    assert [(first_row, rows) for first_row, rows, _ in payloads] == [(0, 2), (2, 1)]
+    records = [record for _, _, payload in payloads for record in json.loads(payload)]
+    expected = json.loads(json.dumps(prepare_df_for_upload(df).to_dict(orient='records'), default=str))
+    expected[2]['sales'] = None  # JSON has no infinity, the encoder sends null
+    assert records == expected
@@ -0,0 +1,64 @@
+import io
+import logging
+import sys
+
+from lib import logger as log_module
+from lib.logger import CustomLogger, LoggerWriter, ProgressRateLimitFilter, progress
+
+
+def record(msg, *args, **extra):
+    record = logging.LogRecord('app', logging.INFO, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_progress_lines_are_rate_limited_per_table():
+    rate_limit = ProgressRateLimitFilter(interval=60)
+    template = "Uploading batch %d for '%s'."
+
+    passed = [
+        rate_limit.filter(record(template, batch, table, **progress(table)))
+        for batch, table in [(1, 'cg_dim_date'), (1, 'cg_fact_sales'), (2, 'cg_dim_date'), (2, 'cg_fact_sales')]
+    ]
+
+    assert passed == [True, True, False, False]
+    assert rate_limit.filter(record("Other line"))
+
+
+class PrintingHandler(logging.Handler):
+    """A handler that prints, as a misbehaving library handler might."""
+
+    def emit(self, record):
+        print(f"handled: {record.getMessage()}")
+
+
+def test_prints_from_inside_logging_go_to_the_original_stdout():
+    stdout = io.StringIO()
+    capture = logging.getLogger('test_logger.stdout')
+    capture.setLevel(logging.INFO)
+    capture.propagate = False
+    capture.addHandler(PrintingHandler())
+    writer = LoggerWriter(capture, stream=stdout)
+
+    original = sys.stdout
+    sys.stdout = writer
+    try:
+        print("hello")
+    finally:
+        sys.stdout = original
+        capture.handlers.clear()
+
+    # The handler's own print() is written once, not fed back into the logger
+    assert stdout.getvalue() == "handled: hello\n"
+
+
+def test_stopped_loggers_are_no_longer_flushed_before_fork(tmp_path):
+    custom_logger = CustomLogger("test_logger.async", log_folder=str(tmp_path), async_mode=True)
+    assert custom_logger in log_module._active_loggers
+    log_module._flush_before_fork()
+
+    custom_logger.stop()
+
+    assert custom_logger not in log_module._active_loggers
+    log_module._flush_before_fork()
+    assert "Logger initialized" in custom_logger.log_filepath.read_text(encoding='utf-8')
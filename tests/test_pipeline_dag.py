@@ -0,0 +1,68 @@
+import threading
+
+import pytest
+
+from lib.pipeline_dag import PipelineDAG
+
+
+def test_tasks_run_after_their_dependencies_with_their_results():
+    dag = PipelineDAG()
+    finished = []
+    lock = threading.Lock()
+
+    def task(name, value):
+        def run(**inputs):
+            with lock:
+                finished.append(name)
+            return value + sum(inputs.values())
+        return run
+
+    # Added out of order on purpose, dependencies can be declared before they exist
+    dag.add('fact', task('fact', 100), depends_on=['dim_a', 'dim_b'])
+    dag.add('dim_a', task('dim_a', 10), depends_on=['raw'])
+    dag.add('dim_b', task('dim_b', 20), depends_on=['raw'])
+    dag.add('raw', task('raw', 1))
+
+    results = dag.run(max_workers=4)
+
+    assert results == {'raw': 1, 'dim_a': 11, 'dim_b': 21, 'fact': 132}
+    assert finished[0] == 'raw' and finished[-1] == 'fact'
+    assert dag.topological_order().index('raw') < dag.topological_order().index('dim_a')
+    assert dag.critical_path()[0] == 'raw' and dag.critical_path()[-1] == 'fact'
+
+
+def test_failure_skips_dependent_tasks_and_is_reraised():
+    dag = PipelineDAG()
+    ran = []
+
+    def fail():
+        raise RuntimeError("load failed")
+
+    dag.add('raw', fail)
+    dag.add('independent', lambda: ran.append('independent'))
+    dag.add('dim', lambda raw: ran.append('dim'), depends_on=['raw'])
+    dag.add('fact', lambda dim: ran.append('fact'), depends_on=['dim'])
+
+    with pytest.raises(RuntimeError, match="load failed"):
+        dag.run(max_workers=1)
+
+    assert 'dim' not in ran and 'fact' not in ran
+    statuses = {name: task['status'] for name, task in dag.report()['tasks'].items()}
+    assert statuses['raw'] == 'failed'
+    assert statuses['dim'] == statuses['fact'] == 'skipped'
+
+
+def test_invalid_graphs_are_rejected():
+    dag = PipelineDAG()
+    dag.add('a', lambda b: b, depends_on=['b'])
+    dag.add('b', lambda a: a, depends_on=['a'])
+    with pytest.raises(ValueError, match="Dependency cycle"):
+        dag.run()
+
+    dag = PipelineDAG()
+    dag.add('a', lambda missing: missing, depends_on=['missing'])
+    with pytest.raises(ValueError, match="unknown task"):
+        dag.run()
+
+    with pytest.raises(ValueError, match="already defined"):
+        dag.add('a', lambda: None)
@@ -0,0 +1,20 @@
+import pandas as pd
+import pytest
+
+from lib import incremental_sync, rollups
+
+
+def test_additive_refresh_without_rollup_state_is_an_error_once_drops_were_synced(tmp_path):
+    fact = pd.DataFrame({'order_number': [10100], 'order_line_number': [1], 'quantity_ordered': [30]})
+    empty = pd.DataFrame()
+
+    # First drop ever: nothing was synced, the rollups are built from it
+    assert rollups.load_rollup_state(fact, empty, empty, str(tmp_path), additive=True) == (None, None)
+
+    plan = incremental_sync.plan_table_sync(fact, 'cg_fact_sales', str(tmp_path))
+    incremental_sync.save_manifest(plan.manifest, str(tmp_path), 'cg_fact_sales')
+
+    # A full refresh rebuilds, a drop cannot
+    assert rollups.load_rollup_state(fact, empty, empty, str(tmp_path)) == (None, None)
+    with pytest.raises(RuntimeError, match="rollup state is missing"):
+        rollups.load_rollup_state(fact, empty, empty, str(tmp_path), additive=True)
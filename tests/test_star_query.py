@@ -0,0 +1,68 @@
+import pandas as pd
+import pytest
+
+from benchmarks.generate_sales import generate_sales_csv
+from lib import data_transform, file_load, schema, star_query
+
+
+@pytest.fixture(scope='module')
+def tables(tmp_path_factory):
+    folder = tmp_path_factory.mktemp('data')
+    generate_sales_csv(str(folder / 'sales.csv'), 2000)
+    raw_df = schema.downcast_integer_columns(file_load.read_latest_csv(
+        str(folder), file_name='sales.csv', encoding='latin1', dtype=schema.SALES_EXTRACT_DTYPES
+    ))
+    dim_date = data_transform.create_dim_date(raw_df)
+    dim_product = data_transform.create_dim_product(raw_df)
+    dim_customer = data_transform.create_dim_customer(raw_df)
+    dim_order = data_transform.create_dim_order(raw_df)
+    fact_sales = data_transform.create_fact_sales(raw_df, dim_date, dim_product, dim_customer, dim_order)
+    return {'dim_date': dim_date, 'dim_product': dim_product, 'dim_customer': dim_customer,
+            'dim_order': dim_order, 'fact_sales': fact_sales}
+
+
+def joined(tables):
+    """The fact table inner-joined to its dimensions, as vw_sales_analysis does."""
+    df = tables['fact_sales']
+    for output_name, dim_key, fact_key in star_query.DIMENSIONS.values():
+        df = df.merge(tables[output_name], left_on=fact_key, right_on=dim_key, how='inner')
+    return df
+
+
+def test_group_by_matches_a_pandas_merge_and_groupby(tables):
+    result = star_query.StarSchema(tables).query(
+        group_by=['year', 'product_line'],
+        filters={'country': ['USA', 'France']},
+        aggregates={'sales': ('sales', 'sum'), 'orders': ('order_number', 'nunique'),
+                    'max_quantity': ('quantity_ordered', 'max')},
+    )
+
+    df = joined(tables)
+    expected = (
+        df[df['country'].isin(['USA', 'France'])]
+        .groupby(['year', 'product_line'], observed=True)
+        .agg(sales=('sales', 'sum'), orders=('order_number', 'nunique'), max_quantity=('quantity_ordered', 'max'))
+        .reset_index()
+    )
+    assert len(result) > 0
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False, check_categorical=False)
+
+
+def test_date_range_and_range_filters(tables):
+    star = star_query.StarSchema(tables)
+
+    result = star.query(date_range=(20040101, 20041231), filters={'quantity_ordered': slice(20, 40)},
+                        aggregates={'sales': ('sales', 'sum'), 'order_lines': ('order_number', 'count')})
+
+    df = joined(tables)
+    df = df[df['date_key'].between(20040101, 20041231) & df['quantity_ordered'].between(20, 40)]
+    assert result['order_lines'].tolist() == [len(df)]
+    assert result['sales'].iloc[0] == pytest.approx(df['sales'].sum())
+
+
+def test_unknown_column_and_aggregation_are_rejected(tables):
+    star = star_query.StarSchema(tables)
+    with pytest.raises(ValueError, match="Unknown column"):
+        star.query(group_by=['no_such_column'])
+    with pytest.raises(ValueError, match="Unknown aggregation"):
+        star.query(aggregates={'sales': ('sales', 'median')})
@@ -0,0 +1,83 @@
+import os
+import time
+
+import pandas as pd
+import pytest
+
+from benchmarks.generate_sales import generate_sales_csv
+from lib import data_transform, file_load, schema, transform_cache
+
+BUILDERS = {
+    'dim_date': lambda raw_df, tables: data_transform.create_dim_date(raw_df),
+    'dim_product': lambda raw_df, tables: data_transform.create_dim_product(raw_df),
+    'dim_customer': lambda raw_df, tables: data_transform.create_dim_customer(raw_df),
+    'dim_order': lambda raw_df, tables: data_transform.create_dim_order(raw_df),
+    'fact_sales': lambda raw_df, tables: data_transform.create_fact_sales(
+        raw_df, tables['dim_date'], tables['dim_product'], tables['dim_customer'], tables['dim_order']
+    ),
+}
+
+
+@pytest.fixture
+def extract(tmp_path):
+    csv_path = tmp_path / 'data' / 'sales.csv'
+    csv_path.parent.mkdir()
+    generate_sales_csv(str(csv_path), 200)
+    return csv_path
+
+
+def read(csv_path):
+    raw_df = file_load.read_latest_csv(str(csv_path.parent), file_name=csv_path.name, encoding='latin1',
+                                       dtype=schema.SALES_EXTRACT_DTYPES)
+    return schema.downcast_integer_columns(raw_df)
+
+
+def test_unchanged_input_is_served_from_the_cache(extract, tmp_path):
+    cache = transform_cache.TransformCache(str(tmp_path / 'cache'))
+    fingerprint = transform_cache.fingerprint_files([str(extract)])
+    assert cache.lookup_file(fingerprint) is None
+
+    tables, table_keys = cache.build_tables(read(extract), BUILDERS)
+    cache.record_file(fingerprint, table_keys)
+    assert cache.misses == list(BUILDERS) and cache.hits == []
+
+    # A new process looks the file up before loading it
+    cached = transform_cache.TransformCache(str(tmp_path / 'cache')).lookup_file(
+        transform_cache.fingerprint_files([str(extract)])
+    )
+    assert set(cached) == set(BUILDERS)
+    for table_name, df in tables.items():
+        pd.testing.assert_frame_equal(cached[table_name], df.reset_index(drop=True), check_dtype=False,
+                                      check_categorical=False)
+
+
+def test_changed_column_rebuilds_only_the_tables_built_from_it(extract, tmp_path):
+    transform_cache.TransformCache(str(tmp_path / 'cache')).build_tables(read(extract), BUILDERS)
+
+    raw_df = read(extract)
+    raw_df['CITY'] = raw_df['CITY'].cat.rename_categories(lambda city: f"{city} (new)")
+    cache = transform_cache.TransformCache(str(tmp_path / 'cache'))
+    cache.build_tables(raw_df, BUILDERS)
+
+    # The fact table depends on every dimension, so it follows dim_customer
+    assert cache.misses == ['dim_customer', 'fact_sales']
+    assert cache.hits == ['dim_date', 'dim_product', 'dim_order']
+
+
+def test_least_recently_used_tables_are_evicted(tmp_path):
+    cache = transform_cache.TransformCache(str(tmp_path / 'cache'), max_entries=2)
+    df = pd.DataFrame({'value': [1, 2, 3]})
+
+    def put(key, age):
+        cache.put(key, df)
+        # Cached tables are ordered by modification time, which a read refreshes
+        timestamp = time.time() - age
+        os.utime(cache._path(key), (timestamp, timestamp))
+
+    put('a', age=100)
+    put('b', age=50)
+    assert cache.get('a') is not None  # 'a' is now the most recently used
+    put('c', age=0)
+
+    assert cache.get('b') is None
+    assert cache.get('a') is not None and cache.get('c') is not None
@@ -0,0 +1,108 @@
+import json
+
+import httpx
+import pandas as pd
+
+from lib import upload_journal
+from lib.concurrent_upload import AdaptiveBatchSizer, ConcurrentUploader, RetryPolicy
+
+KEY = ['order_number', 'order_line_number']
+
+
+class FakeTable:
+    """In-memory PostgREST table with a unique key on (order_number, order_line_number)."""
+
+    def __init__(self, timeout_after_commit=()):
+        self.rows = {}
+        self.requests = []
+        # Batches (by first order_line_number) committed before the response is lost
+        self.timeout_after_commit = set(timeout_after_commit)
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        batch = json.loads(request.content)
+        prefer = request.headers.get('Prefer', '')
+        self.requests.append((batch[0]['order_line_number'], prefer))
+        keys = [tuple(row[column] for column in KEY) for row in batch]
+        if 'ignore-duplicates' in prefer:
+            assert request.url.params['on_conflict'] == ','.join(KEY)
+            batch = [row for row, key in zip(batch, keys) if key not in self.rows]
+            keys = [key for key in keys if key not in self.rows]
+        elif any(key in self.rows for key in keys):
+            return httpx.Response(409, text='duplicate key value violates unique constraint')
+
+        self.rows.update(zip(keys, batch))
+        first_line = keys[0][1] if keys else None
+        if first_line in self.timeout_after_commit:
+            self.timeout_after_commit.discard(first_line)
+            raise httpx.ReadTimeout("response lost", request=request)
+        return httpx.Response(201)
+
+
+def fact_sales(rows):
+    return pd.DataFrame({'order_number': 10100, 'order_line_number': range(1, rows + 1), 'quantity_ordered': 30})
+
+
+def uploader(table, batch_size=10):
+    session = httpx.Client(base_url='http://supabase.test/rest/v1', transport=httpx.MockTransport(table.handle))
+    sizer = AdaptiveBatchSizer(initial_size=batch_size, min_size=batch_size, max_size=batch_size)
+    return ConcurrentUploader(session, max_in_flight=1, sizer=sizer, retry=RetryPolicy(base_delay=0))
+
+
+def test_retry_of_a_committed_batch_does_not_insert_duplicates():
+    # Without a journal too: the retry is sent with the table's natural key
+    table = FakeTable(timeout_after_commit={11})
+
+    assert uploader(table).upload(fact_sales(30), 'cg_fact_sales')
+
+    assert len(table.rows) == 30
+    prefers = [prefer for line, prefer in table.requests if line == 11]
+    assert prefers == ['return=minimal', 'return=minimal,resolution=ignore-duplicates']
+
+
+def test_resumed_run_skips_committed_batches_and_sends_the_rest_idempotently(tmp_path):
+    df = fact_sales(30)
+    journal = upload_journal.UploadJournal(str(tmp_path / 'journal.sqlite'))
+    fingerprint = upload_journal.fingerprint_tables([('cg_fact_sales', df)])
+    assert not journal.begin_run(fingerprint)
+
+    # The first attempt committed one batch before the run failed
+    table = FakeTable()
+    uploader(table).upload(df.head(10), 'cg_fact_sales', checkpoint=journal.table(fingerprint, 'cg_fact_sales'))
+    table.requests.clear()
+
+    resumed = journal.begin_run(fingerprint)
+    checkpoint = journal.table(fingerprint, 'cg_fact_sales')
+    assert resumed and checkpoint.committed == [(0, 10)]
+    assert uploader(table).upload(df, 'cg_fact_sales', checkpoint=checkpoint, resumed=resumed)
+
+    assert len(table.rows) == 30
+    assert [line for line, _ in table.requests] == [11, 21]
+    assert all('ignore-duplicates' in prefer for _, prefer in table.requests)
+
+    journal.finish_run(fingerprint)
+    assert not journal.begin_run(fingerprint)
+    journal.close()
+
+
+def test_resumed_flag_makes_every_table_of_the_run_idempotent():
+    # A table of a resumed run whose own batches were never recorded (e.g. the
+    # process died between the insert and the checkpoint) may still hold rows
+    table = FakeTable()
+    table.rows[(10100, 1)] = {'order_number': 10100, 'order_line_number': 1, 'quantity_ordered': 30}
+
+    assert uploader(table).upload(fact_sales(20), 'cg_fact_sales', resumed=True)
+
+    assert len(table.rows) == 20
+    assert all('ignore-duplicates' in prefer for _, prefer in table.requests)
+
+
+def test_next_pending_stops_at_committed_ranges(tmp_path):
+    journal = upload_journal.UploadJournal(str(tmp_path / 'journal.sqlite'))
+    checkpoint = upload_journal.TableCheckpoint(journal, 'fingerprint', 'cg_fact_sales',
+                                                committed=[(10, 10), (40, 10)])
+
+    assert checkpoint.next_pending(0, 60) == (0, 10)
+    assert checkpoint.next_pending(10, 60) == (20, 20)
+    assert checkpoint.next_pending(45, 60) == (50, 10)
+    assert checkpoint.next_pending(50, 50) == (50, 0)
+    journal.close()
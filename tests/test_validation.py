@@ -0,0 +1,58 @@
+import pandas as pd
+import pytest
+
+from benchmarks.generate_sales import generate_sales_csv
+from lib import data_transform, schema, validation
+from lib.date_parsing import DateKeyCache
+
+
+@pytest.fixture
+def raw_extract(tmp_path):
+    """
+    A small extract read like app.load() reads it, with one row per problem:
+    a quantity beyond INT, a blank customer, a date in another format (valid)
+    and a date that is not a date.
+    """
+    csv_path = tmp_path / 'sales.csv'
+    generate_sales_csv(str(csv_path), 6)
+    df = pd.read_csv(csv_path, encoding='latin1', dtype=str)
+    df.loc[1, 'QUANTITYORDERED'] = '3000000000'
+    df.loc[2, 'CUSTOMERNAME'] = ''
+    df.loc[3, 'ORDERDATE'] = '2003-02-25'
+    df.loc[4, 'ORDERDATE'] = 'not a date'
+    df.to_csv(csv_path, index=False, encoding='latin1')
+    return pd.read_csv(csv_path, encoding='latin1', dtype=schema.SALES_EXTRACT_DTYPES)
+
+
+def test_quarantines_out_of_range_blank_and_unparseable_rows(raw_extract, tmp_path):
+    quarantine_folder = tmp_path / 'quarantine'
+    clean = validation.validate_and_quarantine(raw_extract, str(quarantine_folder), 'sales.csv')
+
+    quarantine_files = list(quarantine_folder.glob('quarantine_sales_*.csv'))
+    assert len(quarantine_files) == 1
+    quarantined = pd.read_csv(quarantine_files[0], dtype=str, keep_default_na=False)
+    line_keys = lambda df: list(zip(df['ORDERNUMBER'].astype(str), df['ORDERLINENUMBER'].astype(str)))
+    errors = dict(zip(line_keys(quarantined), quarantined['validation_errors']))
+    raw_lines = line_keys(raw_extract)
+
+    assert set(errors) == {raw_lines[1], raw_lines[2], raw_lines[4]}
+    assert errors[raw_lines[1]] == 'QUANTITYORDERED out of range for cg_fact_sales.quantity_ordered'
+    assert errors[raw_lines[2]] == 'CUSTOMERNAME is missing'
+    assert errors[raw_lines[4]] == 'ORDERDATE is not a date'
+    # The quarantined rows keep their raw values
+    assert quarantined['QUANTITYORDERED'][line_keys(quarantined).index(raw_lines[1])] == '3000000000'
+
+    assert line_keys(clean) == [raw_lines[0], raw_lines[3], raw_lines[5]]
+
+
+def test_clean_rows_with_mixed_date_formats_go_through_the_transform(raw_extract, tmp_path):
+    clean = validation.validate_and_quarantine(raw_extract, str(tmp_path / 'quarantine'), 'sales.csv')
+    clean = schema.downcast_integer_columns(clean)
+
+    date_cache = DateKeyCache()
+    dim_date = data_transform.create_dim_date(clean, date_cache)
+    fact = data_transform.create_fact_sales(clean, dim_date, date_cache=date_cache)
+
+    assert 20030225 in dim_date['date_key'].tolist()
+    assert len(fact) == len(clean)
+    assert fact['quantity_ordered'].dtype == 'int32'
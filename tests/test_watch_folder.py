@@ -0,0 +1,62 @@
+import os
+
+from lib.watch_folder import FolderWatcher
+
+
+def write(path, text, mtime=None):
+    path.write_text(text)
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+
+
+def test_files_are_handed_out_once_they_stop_changing(tmp_path):
+    watcher = FolderWatcher(str(tmp_path), settle_seconds=0)
+    write(tmp_path / 'sales_2004-05-01.csv', 'a')
+    write(tmp_path / 'sales_2004-05-02.csv.part', 'a')
+    write(tmp_path / '.sales_2004-05-03.csv', 'a')
+    write(tmp_path / 'notes.txt', 'a')
+
+    # The first scan only starts the settle clock
+    assert watcher.scan() == []
+    # Still being written: the clock restarts
+    write(tmp_path / 'sales_2004-05-01.csv', 'ab', mtime=1_000_000)
+    assert watcher.scan() == []
+
+    assert [path.name for path in watcher.scan()] == ['sales_2004-05-01.csv']
+    assert [path.name for path in watcher.next_batch(timeout=0)] == ['sales_2004-05-01.csv']
+    assert watcher.scan() == [] and watcher.next_batch(timeout=0) == []
+
+
+def test_failed_files_are_retried_and_ingested_files_are_not(tmp_path):
+    ingested = {'sales_2004-05-01.csv'}
+    watcher = FolderWatcher(str(tmp_path), settle_seconds=0, retry_delay=0,
+                            is_new=lambda files: [f for f in files if f.name not in ingested])
+    for day in ('01', '02'):
+        write(tmp_path / f'sales_2004-05-{day}.csv', day)
+    watcher.scan()
+
+    batch = watcher.scan()
+    assert [path.name for path in batch] == ['sales_2004-05-02.csv']
+    watcher.next_batch(timeout=0)
+
+    watcher.done(batch, success=False)
+    watcher.scan()
+    assert watcher.scan() == batch
+
+    watcher.next_batch(timeout=0)
+    watcher.done(batch, success=True)
+    watcher.scan()
+    assert watcher.scan() == []
+
+
+def test_batches_take_every_queued_file_up_to_the_limit(tmp_path):
+    watcher = FolderWatcher(str(tmp_path), settle_seconds=0)
+    for day in range(1, 6):
+        write(tmp_path / f'sales_2004-05-0{day}.csv', 'a', mtime=1_000_000 + day)
+    watcher.scan()
+    watcher.scan()
+
+    assert [path.name for path in watcher.next_batch(max_files=3, timeout=0)] == [
+        'sales_2004-05-01.csv', 'sales_2004-05-02.csv', 'sales_2004-05-03.csv'
+    ]
+    assert len(watcher.next_batch(max_files=3, timeout=0)) == 2